@@ -1,16 +1,130 @@
-import requests
 from requests.auth import HTTPBasicAuth
-from config import FORUM_API_URL, FORUM_API_KEY, XAI_API_URL, XAI_API_KEY, USER_MENTION_ID
+from requests import exceptions as requests_exceptions
+from config import (
+    FORUM_API_URL, FORUM_API_KEY, XAI_API_URL, XAI_API_KEY, USER_MENTION_ID,
+    XAI_STREAM, XAI_STREAM_DEADLINE, XAI_MAX_RESPONSE_CHARS,
+    XAI_CACHE_TTL, XAI_CACHE_SIZE, XAI_CACHE_MAX_BYTES, XAI_CACHE_PATH,
+    XAI_RATE_LIMIT, XAI_RATE_BURST, XAI_RATE_LIMIT_TIMEOUT, XAI_MAX_RETRIES, XAI_BACKOFF_BASE, XAI_BACKOFF_MAX,
+    XAI_BREAKER_THRESHOLD, XAI_BREAKER_RESET, XAI_SINGLE_FLIGHT_TIMEOUT,
+    ROUTER_P95_THRESHOLD, ROUTER_MIN_SAMPLES, ROUTER_WINDOW, ROUTER_LONG_QUERY_CHARS, ROUTER_DEEP_CONVERSATION,
+    ROUTER_PROBE_INTERVAL,
+)
+from http_sessions import forum_session, xai_session
+from xai_stream import read_stream, IncompleteStreamError
+from response_cache import ResponseCache
+from rate_limiter import TokenBucket, CircuitBreaker
+from single_flight import SingleFlight
+from payload_templates import PayloadTemplate
+import model_router
+import hashlib
 import logging
 import json
+import random
 import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+xai_limiter = TokenBucket(XAI_RATE_LIMIT, XAI_RATE_BURST)
+xai_breaker = CircuitBreaker(XAI_BREAKER_THRESHOLD, XAI_BREAKER_RESET, name="xAI")
+response_cache = ResponseCache(max_entries=XAI_CACHE_SIZE, max_bytes=XAI_CACHE_MAX_BYTES, disk_path=XAI_CACHE_PATH)
+xai_flights = SingleFlight(name="xAI")
+
+XAI_HEADERS = {
+    "Content-Type": "application/json",
+    "Authorization": f"Bearer {XAI_API_KEY}",
+}
+
+PERSONA_PROMPT = (
+    "Jesteś xAttitude - legendarnym botem z misją służenia na najstarszym forum o pro wrestlingu w Polsce! "
+    "Piszesz z pewnością siebie gwiazdy wrestlingu: jesteś zabawny, błyskotliwy, znasz się na wrestlingu jak nikt inny. "
+    "Twój styl jest odważny, czasem sarkastyczny, a do użytkowników potrafisz rzucić lekką zaczepkę – oczywiście w żartobliwy, forumowy sposób. "
+    "Uwielbiasz nawiązywać do wrestlingu, używasz catchphrase'ów i żartów. Gdy ktoś pyta kim jesteś, zawsze się chwalisz i robisz wokół siebie show jak prawdziwy mistrz. "
+    "Nigdy nie wychodź z roli – zawsze odpisuj jako Grok, bot forum wrestlingowego, z charakterem i ciętym językiem!"
+    "\n\n"
+    "Formatuj odpowiedzi kreatywnie, używając HTML zgodnego z edytorem Invision Community 4 (np. <strong>, <em>, <ul>, <ol>, <div class='ipsSpoiler'>, <span style>, <img>, itp.). "
+    "Dodawaj elementy takie jak pogrubienie, kursywa, wyjustowanie tekstu, wypunktowanie, numerowanie, kolorowy tekst, spoiler oraz obrazki jeśli to pasuje do odpowiedzi. Nie zmieniaj koloru tła posta"
+)
+
+SUMMARY_PROMPT = (
+    "Streszczasz rozmowę z forum wrestlingowego. Dostajesz dotychczasowe streszczenie i nowe wypowiedzi. "
+    "Zwróć jedno zaktualizowane, zwięzłe streszczenie (maksymalnie kilka zdań) zachowujące fakty, pytania i ustalenia. "
+    "Nie dodawaj komentarza ani formatowania HTML."
+)
+
+# Static parts of every xAI request, serialised once at import
+PERSONA_TEMPLATE = PayloadTemplate(
+    "grok-3-latest",
+    system_prompt=PERSONA_PROMPT,
+    temperature=0.2,
+    search_parameters={
+        "mode": "auto",
+        "sources": [
+            {"type": "web"},
+            {"type": "x"},
+            {"type": "news"},
+            {"type": "rss", "links": ["https://forum.wrestling.pl/cagematch/events_rss.xml"]}
+        ],
+    },
+)
+PERSONA_NO_SEARCH_TEMPLATE = PayloadTemplate(
+    "grok-3-latest",
+    system_prompt=PERSONA_PROMPT,
+    temperature=0.2,
+    search_parameters={"mode": "off"},
+)
+PERSONA_FAST_TEMPLATE = PayloadTemplate("grok-2-1212", system_prompt=PERSONA_PROMPT, temperature=0.2)
+
+ROUTE_TEMPLATES = {
+    model_router.SEARCH: PERSONA_TEMPLATE,
+    model_router.NO_SEARCH: PERSONA_NO_SEARCH_TEMPLATE,
+    model_router.FAST: PERSONA_FAST_TEMPLATE,
+}
+
+xai_router = model_router.ModelRouter(
+    p95_threshold=ROUTER_P95_THRESHOLD,
+    min_samples=ROUTER_MIN_SAMPLES,
+    window=ROUTER_WINDOW,
+    long_query_chars=ROUTER_LONG_QUERY_CHARS,
+    deep_conversation=ROUTER_DEEP_CONVERSATION,
+    probe_interval=ROUTER_PROBE_INTERVAL,
+)
+
+def choose_route(question, conversation_depth=0):
+    """Pick the model and search mode for a chat question; see model_router.ModelRouter."""
+    return xai_router.choose(question, conversation_depth)
+
+QUERY_TYPE_TEMPLATE = PayloadTemplate(
+    "grok-2-1212",
+    stream=False,
+    temperature=0,
+    response_format={
+        "type": "json_schema",
+        "json_schema": {
+            "name": "image_request_response",
+            "schema": {
+                "type": "object",
+                "properties": {
+                    "is_image_request": {
+                        "type": "boolean",
+                        "description": "True if the query is about image analysis, false otherwise"
+                    }
+                },
+                "required": ["is_image_request"],
+                "additionalProperties": False
+            },
+            "strict": True
+        }
+    },
+)
+
+SUMMARY_TEMPLATE = PayloadTemplate("grok-2-1212", system_prompt=SUMMARY_PROMPT, stream=False, temperature=0)
 
 def get_xai_auth_header():
     return {"Authorization": f"Bearer {XAI_API_KEY}"}
 
 def get_latest_notifications():
     logging.info("Fetching latest notifications")
-    response = requests.get(
+    response = forum_session().get(
         f"{FORUM_API_URL}/core/members/{USER_MENTION_ID}/notifications",
         auth=HTTPBasicAuth(FORUM_API_KEY, ''),
         headers={"User-Agent": "MyUserAgent/1.0"}
@@ -25,9 +139,6 @@ def get_forum_posts_in_topic_since(topic_id, since_datetime):
     """
     # Example: fetch posts from your forum API (pseudo code!)
     # You need to implement real fetching logic below.
-    import requests
-    from config import FORUM_API_URL, FORUM_API_KEY
-    from requests.auth import HTTPBasicAuth
 
     # This is a pseudo endpoint. Change it to match your forum API docs!
     url = f"{FORUM_API_URL}/forums/topics/{topic_id}/posts?since={since_datetime.isoformat()}"
@@ -36,7 +147,7 @@ def get_forum_posts_in_topic_since(topic_id, since_datetime):
         "User-Agent": "MyUserAgent/1.0",
     }
 
-    response = requests.get(
+    response = forum_session().get(
         url,
         auth=HTTPBasicAuth(FORUM_API_KEY, ''),
         headers=headers
@@ -62,7 +173,7 @@ def post_forum_reply(topic_id, reply_text):
     logging.debug(f"Headers: {headers}")
     logging.debug(f"Payload: {payload}")
 
-    response = requests.post(
+    response = forum_session().post(
         url,
         auth=HTTPBasicAuth(FORUM_API_KEY, ''),
         headers=headers,
@@ -88,7 +199,7 @@ def create_forum_topic(title, post_html, author_id, forum_id):
         "post": post_html,           # REQUIRED: post content as HTML
         "author": int(author_id)     # REQUIRED: author ID
     }
-    response = requests.post(
+    response = forum_session().post(
         url,
         auth=HTTPBasicAuth(FORUM_API_KEY, ''),
         headers=headers,
@@ -100,60 +211,128 @@ def create_forum_topic(title, post_html, author_id, forum_id):
         logging.error("No topic ID found in create_forum_topic response: %s", response.json())
     return topic_id
 
-def send_with_retry(url, headers, payload, max_retries=3, delay=2):
-    retries = 0
-    while retries < max_retries:
-        response = requests.post(url, headers=headers, json=payload)
-        if response.status_code == 429:
-            retries += 1
-            logging.warning(f"Rate limit exceeded. Retrying in {delay} seconds...")
-            time.sleep(delay)
+def _retry_after_seconds(response):
+    """Parse a Retry-After header given either as seconds or as an HTTP date."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def send_with_retry(url, headers, payload, max_retries=XAI_MAX_RETRIES, delay=XAI_BACKOFF_BASE, stream=False):
+    """
+    POST to xAI through the shared token bucket and circuit breaker. payload
+    is a dict, or bytes already rendered by a PayloadTemplate. 429s and
+    5xx/connection errors are retried with exponential backoff and full
+    jitter, or after the server's Retry-After when it sends one; a
+    Retry-After also pauses the shared bucket so concurrent callers back off
+    together. Returns (response, started), where started is the monotonic
+    time the successful attempt was sent, so latency measured from it leaves
+    out limiter waits and retry sleeps.
+    """
+    attempt = 0
+    while True:
+        xai_limiter.acquire(timeout=XAI_RATE_LIMIT_TIMEOUT)
+        xai_breaker.before_call()
+        retry_after = None
+        started = time.monotonic()
+        try:
+            if isinstance(payload, bytes):
+                response = xai_session().post(url, headers=headers, data=payload, stream=stream)
+            else:
+                response = xai_session().post(url, headers=headers, json=payload, stream=stream)
+        except (requests_exceptions.ConnectionError, requests_exceptions.Timeout) as e:
+            xai_breaker.record_failure()
+            error = e
+            response = None
+        except Exception:
+            # Not retried, but the breaker must hear about it: a half-open
+            # trial ending here would otherwise block every later call
+            xai_breaker.record_failure()
+            raise
         else:
-            response.raise_for_status()
-            return response
-    response.raise_for_status()
-    
-def send_to_xai(query):
-    logging.info("Sending query to xAI")
-    headers = {
-        "Content-Type": "application/json",
-        **get_xai_auth_header()
-    }
-    payload = {
-        "messages": [
-            {
-                "role": "system",
-                "content": (
-                    "Jesteś xAttitude - legendarnym botem z misją służenia na najstarszym forum o pro wrestlingu w Polsce! "
-                    "Piszesz z pewnością siebie gwiazdy wrestlingu: jesteś zabawny, błyskotliwy, znasz się na wrestlingu jak nikt inny. "
-                    "Twój styl jest odważny, czasem sarkastyczny, a do użytkowników potrafisz rzucić lekką zaczepkę – oczywiście w żartobliwy, forumowy sposób. "
-                    "Uwielbiasz nawiązywać do wrestlingu, używasz catchphrase'ów i żartów. Gdy ktoś pyta kim jesteś, zawsze się chwalisz i robisz wokół siebie show jak prawdziwy mistrz. "
-                    "Nigdy nie wychodź z roli – zawsze odpisuj jako Grok, bot forum wrestlingowego, z charakterem i ciętym językiem!"
-                    "\n\n"
-                    "Formatuj odpowiedzi kreatywnie, używając HTML zgodnego z edytorem Invision Community 4 (np. <strong>, <em>, <ul>, <ol>, <div class='ipsSpoiler'>, <span style>, <img>, itp.). "
-                    "Dodawaj elementy takie jak pogrubienie, kursywa, wyjustowanie tekstu, wypunktowanie, numerowanie, kolorowy tekst, spoiler oraz obrazki jeśli to pasuje do odpowiedzi. Nie zmieniaj koloru tła posta"
-                )
-            },
-            {
-                "role": "user",
-                "content": query
-            }
-        ],
-        "model": "grok-3-latest",
-        "stream": False,
-        "temperature": 0.2,
-        "search_parameters": {
-            "mode": "auto", 
-            "sources": [
-                {"type": "web"},
-                {"type": "x"},
-                {"type": "news"},
-                {"type": "rss", "links": ["https://forum.wrestling.pl/cagematch/events_rss.xml"] }
-            ],
-        }
-    }
-    response = send_with_retry(XAI_API_URL, headers, payload)
-    return response.json().get("choices", [{}])[0].get("message", {}).get("content", "Brak odpowiedzi od xAI.")
+            if response.status_code == 429 or response.status_code >= 500:
+                if response.status_code >= 500:
+                    xai_breaker.record_failure()
+                else:
+                    xai_breaker.record_success()
+                retry_after = _retry_after_seconds(response)
+                error = requests_exceptions.HTTPError(f"{response.status_code} from xAI", response=response)
+                if attempt + 1 >= max_retries:
+                    response.raise_for_status()
+                response.close()
+            else:
+                xai_breaker.record_success()
+                response.raise_for_status()
+                return response, started
+
+        attempt += 1
+        if attempt >= max_retries:
+            raise error
+        if retry_after is not None:
+            wait = min(retry_after, XAI_BACKOFF_MAX)
+            xai_limiter.pause_until(time.monotonic() + wait)
+        else:
+            wait = random.uniform(0, min(XAI_BACKOFF_MAX, delay * 2 ** attempt))
+        logging.warning(f"xAI request failed ({error}). Retry {attempt}/{max_retries - 1} in {wait:.1f} seconds...")
+        time.sleep(wait)
+
+def send_to_xai(query, stream=XAI_STREAM, deadline=XAI_STREAM_DEADLINE, max_chars=XAI_MAX_RESPONSE_CHARS,
+                cache_ttl=XAI_CACHE_TTL, bypass_cache=False, coalesce=True, route=model_router.SEARCH):
+    """
+    Ask xAI as the forum persona, using the model and search mode of `route`
+    (grok-3 with live search unless choose_route picked something lighter).
+    Replies are cached for cache_ttl seconds under the normalised query; pass
+    bypass_cache=True for prompts that must produce a fresh answer every time
+    (e.g. new quiz questions). Concurrent identical requests are coalesced
+    into one call unless coalesce=False. A streamed reply that was cut off
+    (deadline, max_chars or a dropped connection) raises IncompleteStreamError.
+    """
+    template = ROUTE_TEMPLATES[route]
+    cache_params = {"route": route, "temperature": 0.2}
+    if not bypass_cache:
+        cached = response_cache.get(query, cache_params)
+        if cached is not None:
+            logging.info("Serving xAI reply from cache")
+            return cached
+    logging.info(f"Sending query to xAI (route {route})")
+    body = template.render([{"role": "user", "content": query}], stream=stream)
+
+    def complete():
+        started = time.monotonic()
+        ok = False
+        try:
+            response, started = send_with_retry(XAI_API_URL, XAI_HEADERS, body, stream=stream)
+            if stream:
+                content, finished = read_stream(response, template.model, started, deadline=deadline, max_chars=max_chars)
+                if not finished:
+                    # A cut-off reply is not posted as if it were complete
+                    raise IncompleteStreamError(f"xAI stream on route {route} was cut off", partial=content)
+            else:
+                content = response.json().get("choices", [{}])[0].get("message", {}).get("content")
+            ok = True
+            return content
+        finally:
+            xai_router.record(route, time.monotonic() - started, ok)
+
+    if coalesce:
+        # Identical concurrent requests share one upstream call
+        key = hashlib.sha256(body).hexdigest()
+        content = xai_flights.do(key, complete, timeout=XAI_SINGLE_FLIGHT_TIMEOUT)
+    else:
+        content = complete()
+    if not content:
+        return "Brak odpowiedzi od xAI."
+    # Cut-off streams raise in complete(), so only finished replies get here
+    if not bypass_cache:
+        response_cache.put(query, cache_params, content, cache_ttl)
+    return content
 
 def check_if_image_request(query):
     logging.info("Checking if the query is about image analysis")
@@ -172,46 +351,24 @@ def check_if_image_request(query):
         "stream": False,
         "temperature": 0
     }
-    response = send_with_retry(XAI_API_URL, headers, payload)
+    response, _ = send_with_retry(XAI_API_URL, headers, payload)
     result = response.json().get("choices", [{}])[0].get("message", {}).get("content", "No response")
     return "yes" in result.lower()
 
 def determine_query_type(query):
     logging.info("Determining if the query is about image analysis")
-    headers = {
-        "Content-Type": "application/json",
-        **get_xai_auth_header()
-    }
-    payload = {
-        "messages": [
-            {
-                "role": "user",
-                "content": query
-            }
-        ],
-        "model": "grok-2-1212",
-        "stream": False,
-        "temperature": 0,
-        "response_format": {
-            "type": "json_schema",
-            "json_schema": {
-                "name": "image_request_response",
-                "schema": {
-                    "type": "object",
-                    "properties": {
-                        "is_image_request": {
-                            "type": "boolean",
-                            "description": "True if the query is about image analysis, false otherwise"
-                        }
-                    },
-                    "required": ["is_image_request"],
-                    "additionalProperties": False
-                },
-                "strict": True
-            }
-        }
-    }
-    response = send_with_retry(XAI_API_URL, headers, payload)
+    body = QUERY_TYPE_TEMPLATE.render([{"role": "user", "content": query}])
+    response, _ = send_with_retry(XAI_API_URL, XAI_HEADERS, body)
     result = response.json().get("choices", [{}])[0].get("message", {}).get("content", "{}")
     result_json = json.loads(result)
-    return result_json.get("is_image_request", False)
\ No newline at end of file
+    return result_json.get("is_image_request", False)
+
+def summarize_conversation(previous_summary, transcript):
+    """Fold new conversation lines into the running summary of a thread."""
+    logging.info("Updating conversation summary via xAI")
+    body = SUMMARY_TEMPLATE.render([{
+        "role": "user",
+        "content": f"Dotychczasowe streszczenie:\n{previous_summary or '(brak)'}\n\nNowe wypowiedzi:\n{transcript}"
+    }])
+    response, _ = send_with_retry(XAI_API_URL, XAI_HEADERS, body)
+    return response.json().get("choices", [{}])[0].get("message", {}).get("content", "").strip()
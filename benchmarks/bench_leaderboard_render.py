@@ -0,0 +1,70 @@
+# benchmarks/bench_leaderboard_render.py
+"""
+Cost of the score table posted after a correct quiz answer, for 10k players:
+the old full ORDER BY result rendered with += concatenation, the same full
+table joined from the row functions of xQuiz.quiz_templates (now with ranks
+and escaped user names), and the cached top-N table from ScoreTableRenderer (cold after a
+score change, and warm) that the handler actually posts.
+
+    python benchmarks/bench_leaderboard_render.py [players] [iterations]
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from xQuiz.leaderboard import Leaderboard
+from xQuiz.quiz_templates import ScoreTableRenderer, SCORE_TABLE_HEAD, SCORE_TABLE_TAIL, score_row
+
+TOP_N = 10
+
+def concatenated(scores):
+    # Pętla z QuizHandler.handle_quiz_post sprzed zmiany
+    score_table = SCORE_TABLE_HEAD
+    for i, score in enumerate(scores):
+        user = score['user_name']
+        pts = score['score']
+        if i == 0:
+            score_table += f'<tr><td><strong><span style="color:#e67e22;">{user}</span></strong></td><td>Liczba punktów {pts}</td></tr>'
+        elif i == 1:
+            score_table += f'<tr><td><strong><span style="color:#7f8c8d;">{user}</span></strong></td><td>Liczba punktów {pts}</td></tr>'
+        elif i == 2:
+            score_table += f'<tr><td><span style="color:#330000;"><strong>{user}</strong></span></td><td>Liczba punktów {pts}</td></tr>'
+        else:
+            score_table += f'<tr><td>{user}</td><td>Liczba punktów {pts}</td></tr>'
+    score_table += SCORE_TABLE_TAIL
+    return score_table
+
+def joined(rows):
+    return "".join([SCORE_TABLE_HEAD] + [score_row(row) for row in rows] + [SCORE_TABLE_TAIL])
+
+def main():
+    players = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    random.seed(1)
+    rows = [{"user_name": f"user{i}", "score": random.randint(0, 500)} for i in range(players)]
+    board = Leaderboard()
+    board.load(rows)
+    ordered = sorted(rows, key=lambda row: -row['score'])
+    ranked = board.top(players)
+    renderer = ScoreTableRenderer()
+    player = "user1234"
+
+    def cold():
+        board.add(player, 0)  # zmiana wersji unieważnia tabelę
+        return renderer.render(board, TOP_N, player)
+
+    cases = (
+        (f"full table, += ({players} rows)", lambda: concatenated(ordered)),
+        (f"full table, templates ({players} rows)", lambda: joined(ranked)),
+        (f"top {TOP_N}, after score change", cold),
+        (f"top {TOP_N}, cached", lambda: renderer.render(board, TOP_N, player)),
+    )
+    for label, func in cases:
+        seconds = min(timeit.repeat(func, number=iterations, repeat=3))
+        print(f"{label:38} {seconds / iterations * 1e6:10.1f} us/render  {len(func())} chars")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+# benchmarks/bench_payload_templates.py
+"""
+Serialisation cost per xAI request: building the payload dict and running
+json.dumps on every call (the old send_to_xai) versus PayloadTemplate.render.
+
+    python benchmarks/bench_payload_templates.py [iterations]
+"""
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from api_calls import PERSONA_TEMPLATE, QUERY_TYPE_TEMPLATE
+
+QUERY = "user: Kto wygrał walkę wieczoru na ostatniej gali WrestleMania?\n" * 10
+
+def per_call_dict(template):
+    def build():
+        payload = template.build([{"role": "user", "content": QUERY}], stream=True)
+        return json.dumps(payload).encode("utf-8")
+    return build
+
+def rendered(template):
+    def render():
+        return template.render([{"role": "user", "content": QUERY}], stream=True)
+    return render
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    for name, template in (("persona", PERSONA_TEMPLATE), ("query type", QUERY_TYPE_TEMPLATE)):
+        rendered_body = rendered(template)()
+        assert json.loads(rendered_body) == json.loads(per_call_dict(template)())
+        for label, func in (("dict + json.dumps", per_call_dict(template)), ("template.render", rendered(template))):
+            seconds = min(timeit.repeat(func, number=iterations, repeat=3))
+            print(f"{name:10} {label:18} {seconds / iterations * 1e6:8.2f} us/request  {len(func())} bytes")
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,13 @@ DB_NAME = os.getenv('DB_NAME')
 DB_USER = os.getenv('DB_USER')
 DB_PASSWORD = os.getenv('DB_PASSWORD')
 
+# Database connection pool configuration (times in seconds)
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))
+DB_POOL_RECYCLE = float(os.getenv('DB_POOL_RECYCLE', 3600))
+DB_POOL_MAX_IDLE = float(os.getenv('DB_POOL_MAX_IDLE', 300))
+DB_POOL_PING_AFTER = float(os.getenv('DB_POOL_PING_AFTER', 30))
+
 # Forum API configuration
 FORUM_API_URL = "https://forum.wrestling.pl/api"
 FORUM_API_KEY = os.getenv('FORUM_API_KEY')
@@ -20,9 +27,103 @@ USER_MENTION_NAME = "xAttitude"
 # xAI API configuration
 XAI_API_URL = "https://api.x.ai/v1/chat/completions"
 XAI_API_KEY = os.getenv('XAI_API_KEY')
+# Stream chat completions and stop reading after the deadline (seconds) or size limit
+XAI_STREAM = os.getenv('XAI_STREAM', 'true').lower() in ('1', 'true', 'yes')
+XAI_STREAM_DEADLINE = float(os.getenv('XAI_STREAM_DEADLINE', 90))
+XAI_MAX_RESPONSE_CHARS = int(os.getenv('XAI_MAX_RESPONSE_CHARS', 20000))
+# Client-side throttling of xAI calls: token bucket (requests/second and burst),
+# retries with jittered exponential backoff, and a circuit breaker
+XAI_RATE_LIMIT = float(os.getenv('XAI_RATE_LIMIT', 2))
+XAI_RATE_BURST = int(os.getenv('XAI_RATE_BURST', 5))
+XAI_RATE_LIMIT_TIMEOUT = float(os.getenv('XAI_RATE_LIMIT_TIMEOUT', 60))
+XAI_MAX_RETRIES = int(os.getenv('XAI_MAX_RETRIES', 4))
+XAI_BACKOFF_BASE = float(os.getenv('XAI_BACKOFF_BASE', 1))
+XAI_BACKOFF_MAX = float(os.getenv('XAI_BACKOFF_MAX', 30))
+XAI_BREAKER_THRESHOLD = int(os.getenv('XAI_BREAKER_THRESHOLD', 5))
+XAI_BREAKER_RESET = float(os.getenv('XAI_BREAKER_RESET', 30))
+# How long a caller waits for an identical in-flight xAI request before giving up
+XAI_SINGLE_FLIGHT_TIMEOUT = float(os.getenv('XAI_SINGLE_FLIGHT_TIMEOUT', 150))
+# Model routing for chat replies: demote a route to a faster one while its p95
+# latency (seconds, over the last ROUTER_WINDOW seconds) exceeds the threshold
+ROUTER_P95_THRESHOLD = float(os.getenv('ROUTER_P95_THRESHOLD', 25))
+ROUTER_MIN_SAMPLES = int(os.getenv('ROUTER_MIN_SAMPLES', 10))
+ROUTER_WINDOW = float(os.getenv('ROUTER_WINDOW', 600))
+# A demoted route still gets one probe request this often (seconds)
+ROUTER_PROBE_INTERVAL = float(os.getenv('ROUTER_PROBE_INTERVAL', 60))
+ROUTER_LONG_QUERY_CHARS = int(os.getenv('ROUTER_LONG_QUERY_CHARS', 280))
+ROUTER_DEEP_CONVERSATION = int(os.getenv('ROUTER_DEEP_CONVERSATION', 6))
+# Reply cache for send_to_xai; TTLs in seconds, leave XAI_CACHE_PATH empty to keep it in memory only
+XAI_CACHE_TTL = int(os.getenv('XAI_CACHE_TTL', 300))
+XAI_JOKE_CACHE_TTL = int(os.getenv('XAI_JOKE_CACHE_TTL', 120))
+XAI_CACHE_SIZE = int(os.getenv('XAI_CACHE_SIZE', 512))
+XAI_CACHE_MAX_BYTES = int(os.getenv('XAI_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+XAI_CACHE_PATH = os.getenv('XAI_CACHE_PATH') or None
+XAI_CACHE_PURGE_INTERVAL = float(os.getenv('XAI_CACHE_PURGE_INTERVAL', 600))
 
 QUIZ_FORUM_ID = "233"
 
+# Pooled keep-alive HTTP sessions (timeouts in seconds)
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 10))
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 5))
+FORUM_READ_TIMEOUT = float(os.getenv('FORUM_READ_TIMEOUT', 30))
+XAI_READ_TIMEOUT = float(os.getenv('XAI_READ_TIMEOUT', 120))
+
+# Webhook worker pool configuration
+WEBHOOK_WORKERS = int(os.getenv('WEBHOOK_WORKERS', 4))
+WEBHOOK_QUEUE_SIZE = int(os.getenv('WEBHOOK_QUEUE_SIZE', 10000))
+WEBHOOK_QUEUE_PATH = os.getenv('WEBHOOK_QUEUE_PATH', 'data/webhook_queue.db')
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv('WEBHOOK_MAX_ATTEMPTS', 5))
+WEBHOOK_LEASE_SECONDS = int(os.getenv('WEBHOOK_LEASE_SECONDS', 600))
+# Webhook jobs run on per-topic serial lanes (WEBHOOK_WORKERS of them at once);
+# at most WEBHOOK_MAX_PER_LANE leased jobs wait in one lane and
+# WEBHOOK_MAX_IN_FLIGHT in all lanes, and lanes idle for
+# TOPIC_LANE_IDLE_TIMEOUT seconds are dropped
+WEBHOOK_MAX_IN_FLIGHT = int(os.getenv('WEBHOOK_MAX_IN_FLIGHT', 64))
+WEBHOOK_MAX_PER_LANE = int(os.getenv('WEBHOOK_MAX_PER_LANE', 4))
+TOPIC_LANE_IDLE_TIMEOUT = float(os.getenv('TOPIC_LANE_IDLE_TIMEOUT', 300))
+
+# Conversation context sent to xAI: newest messages kept verbatim within the
+# token budget, older ones folded into a rolling summary in batches
+CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', 2000))
+CONTEXT_MAX_TURNS = int(os.getenv('CONTEXT_MAX_TURNS', 10))
+CONTEXT_SUMMARY_BATCH = int(os.getenv('CONTEXT_SUMMARY_BATCH', 6))
+# Seconds between background runs folding old messages into conversation summaries
+CONTEXT_SUMMARY_INTERVAL = float(os.getenv('CONTEXT_SUMMARY_INTERVAL', 10))
+
+# How often (seconds) idle conversations are marked inactive in the background
+INACTIVITY_SWEEP_INTERVAL = int(os.getenv('INACTIVITY_SWEEP_INTERVAL', 60))
+
+# Number of answered mentions kept in memory in front of the answered_mentions table
+DEDUP_CACHE_SIZE = int(os.getenv('DEDUP_CACHE_SIZE', 10000))
+
+# Pre-generated quiz questions: keep QUIZ_BANK_TARGET unused questions per category
+# ready, refilled every QUIZ_BANK_REFILL_INTERVAL seconds with at most
+# QUIZ_BANK_MAX_PER_RUN xAI calls per run
+QUIZ_BANK_CATEGORIES = [c.strip() for c in os.getenv('QUIZ_BANK_CATEGORIES', 'wrestling').split(',') if c.strip()]
+QUIZ_BANK_TARGET = int(os.getenv('QUIZ_BANK_TARGET', 5))
+QUIZ_BANK_REFILL_INTERVAL = float(os.getenv('QUIZ_BANK_REFILL_INTERVAL', 300))
+QUIZ_BANK_MAX_PER_RUN = int(os.getenv('QUIZ_BANK_MAX_PER_RUN', 10))
+
+# Wrong quiz answers are answered in batches: once QUIZ_BATCH_SIZE guesses are
+# queued or the oldest is QUIZ_BATCH_WINDOW seconds old (checked every
+# QUIZ_BATCH_FLUSH_INTERVAL seconds)
+QUIZ_BATCH_WINDOW = int(os.getenv('QUIZ_BATCH_WINDOW', 60))
+QUIZ_BATCH_SIZE = int(os.getenv('QUIZ_BATCH_SIZE', 3))
+QUIZ_BATCH_FLUSH_INTERVAL = float(os.getenv('QUIZ_BATCH_FLUSH_INTERVAL', 10))
+
+# Number of players shown in the quiz leaderboard (the answering player's rank is appended below)
+QUIZ_LEADERBOARD_TOP = int(os.getenv('QUIZ_LEADERBOARD_TOP', 10))
+
+# Quiz topics whose current question is kept in memory
+QUIZ_QUESTION_CACHE_SIZE = int(os.getenv('QUIZ_QUESTION_CACHE_SIZE', 256))
+# Seconds a topic without a question is remembered as such; questions created
+# by another process (start_quiz.py, a second worker) show up after this
+QUIZ_MISSING_TTL = float(os.getenv('QUIZ_MISSING_TTL', 30))
+
+# Minimum similarity (0-1) for a quiz guess to count as correct; 1 accepts only
+# exact answers after folding case, Polish diacritics and stopwords
+QUIZ_MATCH_THRESHOLD = float(os.getenv('QUIZ_MATCH_THRESHOLD', 0.8))
+
 # Validate required environment variables
 if not all([DB_HOST, DB_NAME, DB_USER, DB_PASSWORD, FORUM_API_KEY, XAI_API_KEY]):
     raise ValueError("Missing required environment variables")
\ No newline at end of file
@@ -0,0 +1,142 @@
+# context_builder.py
+import logging
+import threading
+from utils import get_db_connection
+from api_calls import summarize_conversation
+from config import CONTEXT_TOKEN_BUDGET, CONTEXT_MAX_TURNS, CONTEXT_SUMMARY_BATCH
+
+logger = logging.getLogger()
+
+# How many recent messages to fetch with append_user_message. Each mention adds
+# two messages (question and reply), so with this much headroom every message
+# is folded into the summary before it slides out of the fetched window.
+HISTORY_WINDOW = CONTEXT_MAX_TURNS + CONTEXT_SUMMARY_BATCH + 2
+
+def estimate_tokens(text):
+    # Roughly four characters per token; good enough for budgeting without a tokenizer
+    return len(text) // 4 + 1
+
+# Conversations whose older messages are waiting to be folded into their
+# summary, with the id of the oldest message still kept in the prompt window
+_pending_summaries = {}
+_pending_lock = threading.Lock()
+
+def get_summary(conversation_id):
+    """Return (summary, summarized_through_id) for a conversation, or (None, 0)."""
+    connection = get_db_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT summary, summarized_through_id
+                FROM conversation_summaries
+                WHERE conversation_id = %s
+            """, (str(conversation_id),))
+            result = cursor.fetchone()
+    finally:
+        connection.close()
+    if result:
+        return result['summary'], result['summarized_through_id']
+    return None, 0
+
+def save_summary(conversation_id, summary, last_message):
+    """Store the summary covering every message up to and including last_message."""
+    timestamp = last_message['timestamp']
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.replace(tzinfo=None)
+    connection = get_db_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO conversation_summaries (conversation_id, summary, summarized_until, summarized_through_id)
+                VALUES (%s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE summary = VALUES(summary), summarized_until = VALUES(summarized_until),
+                    summarized_through_id = VALUES(summarized_through_id)
+            """, (str(conversation_id), summary, timestamp, last_message['id']))
+    finally:
+        connection.close()
+
+def _unsummarized_messages(conversation_id, after_id, before_id):
+    connection = get_db_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT id, author, timestamp, content, username
+                FROM messages
+                WHERE conversation_id = %s AND id > %s AND id < %s
+                ORDER BY id
+            """, (str(conversation_id), after_id, before_id))
+            return cursor.fetchall()
+    finally:
+        connection.close()
+
+def _format_message(msg):
+    return f"{msg['author']}: {msg['content']}"
+
+def build_context(conversation_id, history, token_budget=CONTEXT_TOKEN_BUDGET, max_turns=CONTEXT_MAX_TURNS):
+    """
+    Build the prompt context from the stored summary plus the newest messages
+    of history (oldest first, as returned by append_user_message) that fit in
+    max_turns messages and token_budget tokens. Once CONTEXT_SUMMARY_BATCH
+    messages have fallen out of the window, the conversation is queued for
+    summarize_pending_conversations(), which folds them into the summary in
+    the background, so the reply never waits for the summary call.
+    """
+    summary, summarized_through_id = get_summary(conversation_id)
+    budget = token_budget - (estimate_tokens(summary) if summary else 0)
+
+    kept = []
+    for msg in reversed(history):
+        cost = estimate_tokens(_format_message(msg))
+        # Always keep the newest message, it is the question being answered
+        if kept and (len(kept) >= max_turns or cost > budget):
+            break
+        kept.append(msg)
+        budget -= cost
+    kept.reverse()
+
+    older = history[:len(history) - len(kept)]
+    overflow = [msg for msg in older if msg['id'] > summarized_through_id]
+    window_full = len(history) >= HISTORY_WINDOW
+    if overflow and (len(overflow) >= CONTEXT_SUMMARY_BATCH or (window_full and overflow[0] is history[0])):
+        with _pending_lock:
+            _pending_summaries[str(conversation_id)] = kept[0]['id']
+
+    lines = []
+    if summary:
+        lines.append(f"Podsumowanie wcześniejszej rozmowy: {summary}")
+    lines.extend(_format_message(msg) for msg in kept)
+    return "\n".join(lines)
+
+def summarize_pending_conversations():
+    """
+    Fold the messages queued by build_context into their conversations'
+    summaries. Runs periodically off the reply path; returns the number of
+    conversations updated. A conversation that fails stays queued.
+    """
+    with _pending_lock:
+        pending = list(_pending_summaries.items())
+    updated = 0
+    for conversation_id, kept_from_id in pending:
+        try:
+            summary, summarized_through_id = get_summary(conversation_id)
+            overflow = _unsummarized_messages(conversation_id, summarized_through_id, kept_from_id)
+            if overflow:
+                transcript = "\n".join(_format_message(msg) for msg in overflow)
+                new_summary = summarize_conversation(summary, transcript)
+                if not new_summary:
+                    continue
+                save_summary(conversation_id, new_summary, overflow[-1])
+                updated += 1
+                logger.debug(f"Folded {len(overflow)} messages into summary of conversation {conversation_id}")
+        except Exception as e:
+            logger.error(f"Error updating summary of conversation {conversation_id}: {e}")
+            continue
+        with _pending_lock:
+            # A newer request queued meanwhile is left for the next run
+            if _pending_summaries.get(conversation_id) == kept_from_id:
+                del _pending_summaries[conversation_id]
+    return updated
+
+def pending_summaries():
+    with _pending_lock:
+        return len(_pending_summaries)
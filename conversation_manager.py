@@ -1,8 +1,8 @@
 # conversation_manager.py
 from datetime import datetime, timezone, timedelta
-import pymysql
 import logging
-from config import DB_HOST, DB_USER, DB_PASSWORD, DB_NAME, DB_PORT
+import threading
+from utils import get_db_connection
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -10,68 +10,295 @@ logging.basicConfig(level=logging.DEBUG)
 # Define the inactivity timeout
 INACTIVITY_TIMEOUT = timedelta(minutes=15)
 
-def get_db_connection():
-    return pymysql.connect(
-        host=DB_HOST,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        database=DB_NAME,
-        port=DB_PORT,
-        autocommit=True,
-        cursorclass=pymysql.cursors.DictCursor
-    )
+# Number of most recent messages returned with a conversation's history
+HISTORY_LIMIT = 20
+
+def _as_aware(timestamp):
+    # Ensure timestamps read from MySQL are aware of the timezone
+    if timestamp.tzinfo is None:
+        return timestamp.replace(tzinfo=timezone.utc)
+    return timestamp
+
+class ActiveConversationCache:
+    """
+    In-process view of active conversations keyed by (topic_id, username).
+    Entries expire INACTIVITY_TIMEOUT after their last activity. Every write
+    goes to MySQL first and is then mirrored here, so the cache only has to be
+    trusted by the process doing the writes (the webhook workers).
+    """
+
+    def __init__(self, ttl=INACTIVITY_TIMEOUT):
+        self.ttl = ttl
+        self._by_key = {}
+        self._by_id = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, topic_id, username, now):
+        key = (str(topic_id), username)
+        with self._lock:
+            entry = self._by_key.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            conversation_id, last_activity = entry
+            if now - last_activity > self.ttl:
+                self._remove(conversation_id)
+                self.misses += 1
+                return None
+            self.hits += 1
+            return conversation_id
+
+    def last_activity(self, conversation_id):
+        with self._lock:
+            key = self._by_id.get(str(conversation_id))
+            if key is None:
+                return None
+            return self._by_key[key][1]
+
+    def put(self, topic_id, username, conversation_id, last_activity):
+        key = (str(topic_id), username)
+        conversation_id = str(conversation_id)
+        with self._lock:
+            previous = self._by_key.get(key)
+            if previous and previous[0] != conversation_id:
+                self._by_id.pop(previous[0], None)
+            self._by_key[key] = (conversation_id, _as_aware(last_activity))
+            self._by_id[conversation_id] = key
+
+    def touch(self, conversation_id, last_activity):
+        with self._lock:
+            key = self._by_id.get(str(conversation_id))
+            if key is not None:
+                self._by_key[key] = (str(conversation_id), _as_aware(last_activity))
+
+    def evict(self, conversation_id):
+        with self._lock:
+            self._remove(str(conversation_id))
+
+    def _remove(self, conversation_id):
+        key = self._by_id.pop(conversation_id, None)
+        if key is not None:
+            self._by_key.pop(key, None)
+
+    def purge_expired(self, now):
+        """Drop every entry idle for longer than the TTL. Returns how many were dropped."""
+        with self._lock:
+            expired = [cid for cid, last in self._by_key.values() if now - last > self.ttl]
+            for conversation_id in expired:
+                self._remove(conversation_id)
+        return len(expired)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._by_key), "hits": self.hits, "misses": self.misses}
+
+active_conversations = ActiveConversationCache()
+
+def _allocate_conversation_id(cursor):
+    # LAST_INSERT_ID(expr) makes the increment and the read one atomic statement;
+    # the new value comes back in the OK packet as lastrowid.
+    cursor.execute("UPDATE conversation_id_seq SET last_id = LAST_INSERT_ID(last_id + 1) WHERE id = 1")
+    return str(cursor.lastrowid)
 
 def get_next_conversation_id():
     connection = get_db_connection()
     try:
         with connection.cursor() as cursor:
-            cursor.execute("SELECT MAX(CAST(conversation_id AS UNSIGNED)) AS max_id FROM conversations")
-            max_id = cursor.fetchone()['max_id']
-            return str(max_id + 1) if max_id else "1"
+            return _allocate_conversation_id(cursor)
     finally:
         connection.close()
 
+def _select_active_conversation(cursor, topic_id, username):
+    cursor.execute("""
+        SELECT conversation_id, last_activity
+        FROM conversations
+        WHERE topic_id = %s AND username = %s AND is_active = TRUE
+        ORDER BY last_activity DESC
+        LIMIT 1
+        FOR UPDATE
+    """, (topic_id, username))
+    return cursor.fetchone()
+
+def _resolve_conversation(cursor, topic_id, username, now):
+    """
+    Return the active conversation id for (topic_id, username), creating one
+    if needed. Runs inside a transaction. FOR UPDATE locks nothing while the
+    conversation does not exist yet, so two first mentions can both get here;
+    the unique uq_conversations_active index lets only one insert win and
+    the other one joins the conversation it created.
+    """
+    result = _select_active_conversation(cursor, topic_id, username)
+    if result:
+        if now - _as_aware(result['last_activity']) <= INACTIVITY_TIMEOUT:
+            return str(result['conversation_id'])
+        cursor.execute("""
+            UPDATE conversations
+            SET is_active=False
+            WHERE conversation_id=%s
+        """, (result['conversation_id'],))
+        active_conversations.evict(result['conversation_id'])
+
+    conversation_id = _allocate_conversation_id(cursor)
+    logging.debug(f"Creating new conversation with ID: {conversation_id}")
+    cursor.execute("""
+        INSERT INTO conversations (conversation_id, last_activity, is_active, topic_id, username)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE last_activity = GREATEST(last_activity, VALUES(last_activity))
+    """, (conversation_id, now, True, topic_id, username))
+    if cursor.rowcount != 1:
+        # Another worker created the active conversation first
+        conversation_id = str(_select_active_conversation(cursor, topic_id, username)['conversation_id'])
+        logging.debug(f"Joined conversation {conversation_id} created concurrently")
+    return conversation_id
+
+def resolve_conversation(topic_id, username):
+    """Return the active conversation for the user in this topic, starting a new one if it expired."""
+    now = datetime.now(timezone.utc)
+    conversation_id = active_conversations.get(topic_id, username, now)
+    if conversation_id:
+        return conversation_id
+    connection = get_db_connection()
+    try:
+        connection.begin()
+        with connection.cursor() as cursor:
+            conversation_id = _resolve_conversation(cursor, topic_id, username, now)
+            cursor.execute("""
+                SELECT last_activity FROM conversations WHERE conversation_id=%s
+            """, (conversation_id,))
+            last_activity = cursor.fetchone()['last_activity']
+        connection.commit()
+    finally:
+        connection.close()
+    active_conversations.put(topic_id, username, conversation_id, last_activity)
+    return conversation_id
+
+def append_user_message(topic_id, username, content, history_limit=HISTORY_LIMIT, before_commit=None):
+    """
+    Resolve or create the active conversation, append the user's message and
+    return (conversation_id, history) in a single transaction on one
+    connection. history holds the last history_limit messages, oldest first,
+    including the one just added. before_commit(cursor, conversation_id), if
+    given, runs last inside the same transaction. A cached conversation is
+    locked and re-checked first: another process (or the inactivity sweeper)
+    may have closed it since it was cached.
+    """
+    now = datetime.now(timezone.utc)
+    conversation_id = active_conversations.get(topic_id, username, now)
+    connection = get_db_connection()
+    try:
+        connection.begin()
+        with connection.cursor() as cursor:
+            if conversation_id is not None:
+                cursor.execute("""
+                    SELECT is_active
+                    FROM conversations
+                    WHERE conversation_id=%s
+                    FOR UPDATE
+                """, (conversation_id,))
+                row = cursor.fetchone()
+                if not row or not row['is_active']:
+                    logging.debug(f"Cached conversation {conversation_id} was closed, resolving again")
+                    active_conversations.evict(conversation_id)
+                    conversation_id = None
+            if conversation_id is None:
+                conversation_id = _resolve_conversation(cursor, topic_id, username, now)
+            cursor.execute("""
+                INSERT INTO messages (conversation_id, author, timestamp, content, username)
+                VALUES (%s, %s, %s, %s, %s)
+            """, (conversation_id, "user", now, content, username))
+            cursor.execute("""
+                UPDATE conversations
+                SET last_activity=%s
+                WHERE conversation_id=%s
+            """, (now, conversation_id))
+            cursor.execute("""
+                SELECT id, author, timestamp, content, username
+                FROM messages
+                WHERE conversation_id=%s
+                ORDER BY timestamp DESC, id DESC
+                LIMIT %s
+            """, (conversation_id, history_limit))
+            history = list(reversed(cursor.fetchall()))
+            if before_commit is not None:
+                before_commit(cursor, conversation_id)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+    active_conversations.put(topic_id, username, conversation_id, now)
+    return conversation_id, history
+
 def create_new_conversation(topic_id, username, conversation_id=None):
     if conversation_id is None:
         conversation_id = get_next_conversation_id()
     else:
         conversation_id = str(conversation_id)  # Ensure it is a string
     logging.debug(f"Creating new conversation with ID: {conversation_id}")
+    now = datetime.now(timezone.utc)
     connection = get_db_connection()
     try:
+        connection.begin()
         with connection.cursor() as cursor:
+            # Only one conversation per topic and user may be active (uq_conversations_active)
+            cursor.execute("""
+                UPDATE conversations
+                SET is_active=False
+                WHERE topic_id=%s AND username=%s AND is_active=TRUE
+            """, (topic_id, username))
             cursor.execute("""
                 INSERT INTO conversations (conversation_id, last_activity, is_active, topic_id, username)
                 VALUES (%s, %s, %s, %s, %s)
-            """, (conversation_id, datetime.now(timezone.utc), True, topic_id, username))
+            """, (conversation_id, now, True, topic_id, username))
             connection.commit()
+        active_conversations.put(topic_id, username, conversation_id, now)
     except Exception as e:
         logging.error(f"Error creating new conversation: {e}")
+        connection.rollback()
     finally:
         connection.close()
     return conversation_id
 
-def add_message_to_conversation(conversation_id, author, content, username):
+def add_message_to_conversation(conversation_id, author, content, username, before_commit=None):
+    """
+    Append a message and bump the conversation's last activity in one
+    transaction. before_commit(cursor, conversation_id), if given, runs last
+    inside it. Errors are logged and re-raised.
+    """
     conversation_id = str(conversation_id)  # Ensure it is a string
+    now = datetime.now(timezone.utc)
     connection = get_db_connection()
     try:
+        connection.begin()
         with connection.cursor() as cursor:
             cursor.execute("""
                 INSERT INTO messages (conversation_id, author, timestamp, content, username)
                 VALUES (%s, %s, %s, %s, %s)
-            """, (conversation_id, author, datetime.now(timezone.utc), content, username))
+            """, (conversation_id, author, now, content, username))
             cursor.execute("""
                 UPDATE conversations
                 SET last_activity=%s
                 WHERE conversation_id=%s
-            """, (datetime.now(timezone.utc), conversation_id))
+            """, (now, conversation_id))
+            if before_commit is not None:
+                before_commit(cursor, conversation_id)
             connection.commit()
+        active_conversations.touch(conversation_id, now)
     except Exception as e:
         logging.error(f"Error adding message to conversation: {e}")
+        connection.rollback()
+        raise
     finally:
         connection.close()
 
 def get_active_conversation_id(topic_id, username):
+    now = datetime.now(timezone.utc)
+    conversation_id = active_conversations.get(topic_id, username, now)
+    if conversation_id:
+        return conversation_id
     connection = get_db_connection()
     try:
         with connection.cursor() as cursor:
@@ -84,11 +311,9 @@ def get_active_conversation_id(topic_id, username):
             """, (topic_id, username))
             result = cursor.fetchone()
             if result:
-                last_activity = result['last_activity']
-                # Ensure last_activity is aware of the timezone
-                if last_activity.tzinfo is None:
-                    last_activity = last_activity.replace(tzinfo=timezone.utc)
-                if datetime.now(timezone.utc) - last_activity <= INACTIVITY_TIMEOUT:
+                last_activity = _as_aware(result['last_activity'])
+                if now - last_activity <= INACTIVITY_TIMEOUT:
+                    active_conversations.put(topic_id, username, result['conversation_id'], last_activity)
                     return str(result['conversation_id'])
     finally:
         connection.close()
@@ -100,10 +325,10 @@ def get_conversation_history(conversation_id):
     try:
         with connection.cursor() as cursor:
             cursor.execute("""
-                SELECT author, timestamp, content, username
+                SELECT id, author, timestamp, content, username
                 FROM messages
                 WHERE conversation_id=%s
-                ORDER BY timestamp
+                ORDER BY timestamp, id
             """, (conversation_id,))
             result = cursor.fetchall()
     finally:
@@ -123,30 +348,49 @@ def mark_conversation_as_inactive(conversation_id):
             connection.commit()
     finally:
         connection.close()
+    active_conversations.evict(conversation_id)
 
-def check_inactivity(conversation_id):
-    conversation_id = str(conversation_id)  # Ensure it is a string
+def expire_inactive_conversations():
+    """Mark every conversation idle past INACTIVITY_TIMEOUT as inactive in one UPDATE. Returns the number of rows changed."""
+    now = datetime.now(timezone.utc)
     connection = get_db_connection()
     try:
         with connection.cursor() as cursor:
-            cursor.execute("""
-                SELECT last_activity
-                FROM conversations
-                WHERE conversation_id=%s
-            """, (conversation_id,))
-            last_activity = cursor.fetchone()['last_activity']
-            # Ensure last_activity is aware of the timezone
-            if last_activity.tzinfo is None:
-                last_activity = last_activity.replace(tzinfo=timezone.utc)
-            if datetime.now(timezone.utc) - last_activity > INACTIVITY_TIMEOUT:
-                mark_conversation_as_inactive(conversation_id)
-                return True
+            expired = cursor.execute("""
+                UPDATE conversations
+                SET is_active=False
+                WHERE is_active = TRUE AND last_activity < %s
+            """, (now - INACTIVITY_TIMEOUT,))
     finally:
         connection.close()
+    active_conversations.purge_expired(now)
+    return expired
+
+def check_inactivity(conversation_id):
+    conversation_id = str(conversation_id)  # Ensure it is a string
+    last_activity = active_conversations.last_activity(conversation_id)
+    if last_activity is None:
+        connection = get_db_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT last_activity
+                    FROM conversations
+                    WHERE conversation_id=%s
+                """, (conversation_id,))
+                last_activity = _as_aware(cursor.fetchone()['last_activity'])
+        finally:
+            connection.close()
+    if datetime.now(timezone.utc) - last_activity > INACTIVITY_TIMEOUT:
+        mark_conversation_as_inactive(conversation_id)
+        return True
     return False
 
 def is_conversation_active(conversation_id):
     conversation_id = str(conversation_id)  # Ensure it is a string
+    last_activity = active_conversations.last_activity(conversation_id)
+    if last_activity is not None and datetime.now(timezone.utc) - last_activity <= INACTIVITY_TIMEOUT:
+        return True
     connection = get_db_connection()
     try:
         with connection.cursor() as cursor:
@@ -158,4 +402,4 @@ def is_conversation_active(conversation_id):
             result = cursor.fetchone()['is_active']
     finally:
         connection.close()
-    return result
\ No newline at end of file
+    return result
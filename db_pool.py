@@ -0,0 +1,236 @@
+# db_pool.py
+import logging
+import threading
+import time
+from collections import deque
+import pymysql
+from config import (
+    DB_HOST, DB_USER, DB_PASSWORD, DB_NAME, DB_PORT,
+    DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_MAX_IDLE, DB_POOL_PING_AFTER,
+)
+
+logger = logging.getLogger()
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection became free within the pool timeout."""
+
+
+class PooledConnection:
+    """
+    Thin proxy around a pymysql connection. close() hands the connection
+    back to the pool instead of closing the socket, so existing
+    `try: ... finally: connection.close()` code works unchanged.
+    """
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self._in_transaction = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def begin(self):
+        self._raw.begin()
+        self._in_transaction = True
+
+    def commit(self):
+        # Connections run in autocommit mode; only an explicit begin() needs a COMMIT
+        if self._in_transaction:
+            self._raw.commit()
+            self._in_transaction = False
+
+    def rollback(self):
+        if self._in_transaction:
+            self._raw.rollback()
+            self._in_transaction = False
+
+    def close(self):
+        if self._raw is None:
+            return
+        raw, self._raw = self._raw, None
+        if self._in_transaction:
+            try:
+                raw.rollback()
+            except Exception as e:
+                logger.warning(f"Rollback on release failed, discarding connection: {e}")
+                self._pool._discard(raw)
+                return
+        self._pool._release(raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.rollback()
+        else:
+            self.commit()
+        self.close()
+
+
+class ConnectionPool:
+    def __init__(self, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT, recycle=DB_POOL_RECYCLE,
+                 max_idle=DB_POOL_MAX_IDLE, ping_after=DB_POOL_PING_AFTER):
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.max_idle = max_idle
+        self.ping_after = ping_after
+        # Idle connections as (connection, released_at), most recently released last
+        self._idle = deque()
+        self._created_at = {}
+        self._open = 0
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._metrics = {
+            "checkouts": 0,
+            "created": 0,
+            "recycled": 0,
+            "failed_health_checks": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "total_wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+        }
+
+    def _connect(self):
+        raw = pymysql.connect(
+            host=DB_HOST,
+            user=DB_USER,
+            password=DB_PASSWORD,
+            database=DB_NAME,
+            port=DB_PORT,
+            charset='utf8mb4',
+            autocommit=True,
+            cursorclass=pymysql.cursors.DictCursor
+        )
+        with self._lock:
+            self._created_at[id(raw)] = time.monotonic()
+            self._metrics["created"] += 1
+        return raw
+
+    def _close_quietly(self, raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def _discard(self, raw):
+        with self._lock:
+            self._created_at.pop(id(raw), None)
+            self._open -= 1
+            self._available.notify()
+        self._close_quietly(raw)
+
+    def _release(self, raw):
+        with self._lock:
+            self._idle.append((raw, time.monotonic()))
+            self._available.notify()
+
+    def _evict_idle(self, now):
+        """Close connections that sat unused for longer than max_idle. Caller holds the lock."""
+        stale = []
+        while self._idle and now - self._idle[0][1] > self.max_idle:
+            raw, _ = self._idle.popleft()
+            self._created_at.pop(id(raw), None)
+            self._open -= 1
+            self._metrics["recycled"] += 1
+            stale.append(raw)
+        return stale
+
+    def connection(self):
+        started = time.monotonic()
+        waited = False
+        stale = []
+        with self._lock:
+            while True:
+                stale += self._evict_idle(time.monotonic())
+                if self._idle:
+                    raw, released_at = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    self._open += 1
+                    raw, released_at = None, None
+                    break
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self._metrics["timeouts"] += 1
+                    raise PoolTimeoutError(f"No database connection available after {self.timeout}s")
+                waited = True
+                self._available.wait(remaining)
+            wait = time.monotonic() - started
+            self._metrics["checkouts"] += 1
+            if waited:
+                self._metrics["waits"] += 1
+                self._metrics["total_wait_seconds"] += wait
+                self._metrics["max_wait_seconds"] = max(self._metrics["max_wait_seconds"], wait)
+        for old in stale:
+            self._close_quietly(old)
+
+        if raw is not None:
+            raw = self._check_health(raw, released_at)
+        if raw is None:
+            try:
+                raw = self._connect()
+            except Exception:
+                with self._lock:
+                    self._open -= 1
+                    self._available.notify()
+                raise
+        return PooledConnection(self, raw)
+
+    def _check_health(self, raw, released_at):
+        """Return a usable connection, or None if a fresh one has to be opened in its place."""
+        now = time.monotonic()
+        created_at = self._created_at.get(id(raw), now)
+        if now - created_at > self.recycle:
+            with self._lock:
+                self._created_at.pop(id(raw), None)
+                self._metrics["recycled"] += 1
+            self._close_quietly(raw)
+            return None
+        if now - released_at > self.ping_after:
+            try:
+                raw.ping(reconnect=False)
+            except Exception as e:
+                logger.warning(f"Pooled connection failed health check: {e}")
+                with self._lock:
+                    self._created_at.pop(id(raw), None)
+                    self._metrics["failed_health_checks"] += 1
+                self._close_quietly(raw)
+                return None
+        return raw
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._metrics)
+            stats["size"] = self.size
+            stats["open"] = self._open
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = self._open - len(self._idle)
+        if stats["waits"]:
+            stats["avg_wait_seconds"] = stats["total_wait_seconds"] / stats["waits"]
+        return stats
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+            for raw, _ in idle:
+                self._created_at.pop(id(raw), None)
+            self._open -= len(idle)
+        for raw, _ in idle:
+            self._close_quietly(raw)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
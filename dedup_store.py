@@ -0,0 +1,94 @@
+# dedup_store.py
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from utils import get_db_connection
+from config import DEDUP_CACHE_SIZE
+
+logger = logging.getLogger()
+
+# Mentions we already replied to, keyed by (topic_id, sha256(content)).
+# Positive results are cached in a bounded LRU; misses cost one primary-key lookup.
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def content_hash(content):
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+def _remember(key):
+    with _cache_lock:
+        _cache[key] = True
+        _cache.move_to_end(key)
+        while len(_cache) > DEDUP_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+def is_answered(topic_id, content):
+    key = (str(topic_id), content_hash(content))
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return True
+    connection = get_db_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT 1 FROM answered_mentions
+                WHERE topic_id = %s AND content_hash = %s
+            """, key)
+            found = cursor.fetchone() is not None
+    finally:
+        connection.close()
+    if found:
+        _remember(key)
+    return found
+
+def get_pending_reply(topic_id, content):
+    """
+    Progress on a mention that has not been answered yet: a dict with the
+    conversation_id its message was added to and the reply generated for it
+    (None until then), or None if the mention was not handled before.
+    """
+    connection = get_db_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT conversation_id, reply FROM pending_replies
+                WHERE topic_id = %s AND content_hash = %s
+            """, (str(topic_id), content_hash(content)))
+            return cursor.fetchone()
+    finally:
+        connection.close()
+
+def save_pending_reply(cursor, topic_id, content, conversation_id, reply=None):
+    """
+    Record progress on a mention inside the caller's transaction, together
+    with the side effect it stands for (the user's or the bot's message), so
+    that a retried job resumes after it instead of repeating it.
+    """
+    cursor.execute("""
+        INSERT INTO pending_replies (topic_id, content_hash, conversation_id, reply)
+        VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE conversation_id = VALUES(conversation_id), reply = VALUES(reply)
+    """, (str(topic_id), content_hash(content), str(conversation_id), reply))
+
+def mark_answered(topic_id, content):
+    key = (str(topic_id), content_hash(content))
+    # Remember locally first: the reply is already posted, so even if the
+    # insert fails a retry in this process must not answer twice.
+    _remember(key)
+    try:
+        connection = get_db_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    INSERT IGNORE INTO answered_mentions (topic_id, content_hash)
+                    VALUES (%s, %s)
+                """, key)
+                cursor.execute("""
+                    DELETE FROM pending_replies WHERE topic_id = %s AND content_hash = %s
+                """, key)
+        finally:
+            connection.close()
+    except Exception as e:
+        logger.error(f"Error marking mention as answered: {e}")
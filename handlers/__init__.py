@@ -1,6 +1,6 @@
 # handlers/__init__.py
 
-from .notification_handler import process_notification
+from .notification_handler import process_notification, mentions_user
 from .image_handler import handle_image_request
 
-__all__ = ["process_notification", "handle_image_request"]
\ No newline at end of file
+__all__ = ["process_notification", "mentions_user", "handle_image_request"]
\ No newline at end of file
@@ -1,13 +1,19 @@
 # handlers/image_handler.py
 import logging
+import re
 from bs4 import BeautifulSoup
-import requests
 import base64
 from urllib.parse import urlparse
-from api_calls import get_xai_auth_header
+from api_calls import get_xai_auth_header, send_with_retry
+from config import XAI_API_URL
 
 logger = logging.getLogger()
 
+# Forum smileys and inline icons are <img> tags too, but never something to analyse
+EMOTICON_PATH = "/uploads/emoticons/"
+MIN_IMAGE_SIZE = 64
+_STYLE_SIZE = re.compile(r"(?:^|;)\s*(?:width|height)\s*:\s*(\d+)px", re.IGNORECASE)
+
 def handle_image_request(content, query):
     image_url = extract_image_url_from_content(content)
     if image_url:
@@ -17,26 +23,39 @@ def handle_image_request(content, query):
         logger.warning("No image found in the content.")
         return "Nie znaleziono obrazu w treści zapytania."
 
-def extract_image_url_from_content(content):
+def _is_decoration(img_tag):
+    """A smiley or an image too small (under MIN_IMAGE_SIZE px) to be what the question is about."""
+    if img_tag.get('data-emoticon') == 'true' or EMOTICON_PATH in img_tag['src']:
+        return True
+    sizes = [img_tag.get('width'), img_tag.get('height')] + _STYLE_SIZE.findall(img_tag.get('style', ''))
+    return any(str(size).isdigit() and int(size) < MIN_IMAGE_SIZE for size in sizes if size)
+
+def extract_image_urls_from_content(content):
+    """
+    Every image in a post worth analysing, in order: <img> tags other than
+    smileys and small icons, then links to image files, then image URLs
+    pasted as plain text.
+    """
     soup = BeautifulSoup(content, 'html.parser')
-    img_tag = soup.find('img')
-    if img_tag and 'src' in img_tag.attrs:
-        return img_tag['src']
-    
-    # Jeśli nie znaleziono tagu <img>, sprawdź linki w treści
+    urls = [img_tag['src'] for img_tag in soup.find_all('img', src=True) if not _is_decoration(img_tag)]
+
     for a_tag in soup.find_all('a', href=True):
         parsed_url = urlparse(a_tag['href'])
         if parsed_url.path.lower().endswith(('.png', '.jpg', '.jpeg')):
-            return a_tag['href']
-    
+            urls.append(a_tag['href'])
+
     # Dodatkowe sprawdzanie bez tagów HTML
     text_content = soup.get_text()
     for word in text_content.split():
         parsed_url = urlparse(word)
         if parsed_url.path.lower().endswith(('.png', '.jpg', '.jpeg')):
-            return word
-    
-    return None
+            urls.append(word)
+
+    return urls
+
+def extract_image_url_from_content(content):
+    urls = extract_image_urls_from_content(content)
+    return urls[0] if urls else None
 
 def analyze_image(image_url=None, image_path=None, query="What is in this image?"):
     logging.info("Sending image analysis request to xAI Vision")
@@ -85,6 +104,5 @@ def analyze_image(image_url=None, image_path=None, query="What is in this image?
         "stream": False,
         "temperature": 0.01,
     }
-    response = requests.post("https://api.x.ai/v1/chat/completions", headers=headers, json=payload)
-    response.raise_for_status()
+    response, _ = send_with_retry(XAI_API_URL, headers, payload)
     return response.json().get("choices", [{}])[0].get("message", {}).get("content", "Brak odpowiedzi od xAI Vision.")
\ No newline at end of file
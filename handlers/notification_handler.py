@@ -4,21 +4,33 @@ import re
 from bs4 import BeautifulSoup
 from urllib.parse import unquote, urlparse, urlunparse
 import requests
-from utils import get_answered_posts
+from dedup_store import is_answered, mark_answered, get_pending_reply, save_pending_reply
 from conversation_manager import (
-    get_active_conversation_id,
-    create_new_conversation,
+    resolve_conversation,
+    append_user_message,
     add_message_to_conversation,
     get_conversation_history,
-    check_inactivity,
-    mark_conversation_as_inactive,
 )
+from context_builder import build_context, HISTORY_WINDOW
 from handlers.image_handler import handle_image_request
-from api_calls import send_to_xai, post_forum_reply, check_if_image_request, determine_query_type
+from handlers.query_classifier import is_image_query
+from api_calls import send_to_xai, post_forum_reply, choose_route
 from config import USER_MENTION_NAME, USER_MENTION_ID
+from html_templates import format_reply
 
 logger = logging.getLogger()
 
+def _find_mention(soup, user_mention_id, user_mention_name):
+    mention_tag = soup.find('a', {'data-mentionid': user_mention_id})
+    if not mention_tag:
+        mention_tag = soup.find(text=re.compile(f"@{user_mention_name}"))
+    return mention_tag
+
+def mentions_user(content, user_mention_id, user_mention_name):
+    """Whether a post's HTML mentions the given user."""
+    soup = BeautifulSoup(content, 'html.parser')
+    return _find_mention(soup, user_mention_id, user_mention_name) is not None
+
 def process_notification(notification, notification_type, user_mention_id, user_mention_name):
     try:
         logger.debug(f"Processing notification type: {notification_type}")
@@ -56,17 +68,11 @@ def process_notification(notification, notification_type, user_mention_id, user_
             return
 
         soup = BeautifulSoup(content, 'html.parser')
-        mention_tag = soup.find('a', {'data-mentionid': user_mention_id})
 
-        if not mention_tag:
-            mention_tag = soup.find(text=re.compile(f"@{user_mention_name}"))
-
-        if mention_tag:
+        if _find_mention(soup, user_mention_id, user_mention_name):
             logger.info(f"Mention detected in notification content")
 
-            answered_posts = get_answered_posts()
-
-            if topic_id not in answered_posts or content not in answered_posts[topic_id]:
+            if not is_answered(topic_id, content):
                 question = soup.get_text().strip()
                 question = unquote(question)
 
@@ -86,38 +92,54 @@ def process_notification(notification, notification_type, user_mention_id, user_
                 sanitized_question = " ".join(sanitized_parts)
                 logger.debug(f"Sanitized question: {sanitized_question}")
 
-                conversation_id = get_active_conversation_id(topic_id, username)
-                if not conversation_id:
-                    logger.info(f"Conversation with topic ID {topic_id} is not active. Creating a new conversation.")
-                    conversation_id = create_new_conversation(topic_id, username)
+                # A retried job resumes from the progress stored with each side
+                # effect, so the user's message, the xAI call and the bot's
+                # message are not repeated
+                pending = get_pending_reply(topic_id, content)
+                xai_response = pending['reply'] if pending else None
 
-                is_image_query = determine_query_type(sanitized_question)
-                if is_image_query:
-                    xai_response = handle_image_request(content, sanitized_question)
+                if xai_response is not None:
+                    conversation_id = pending['conversation_id']
+                    logger.info(f"Resuming reply to topic {topic_id} from the stored xAI response")
                 else:
-                    add_message_to_conversation(str(conversation_id), "user", sanitized_question, username)
-                    conversation_history = get_conversation_history(str(conversation_id))
-                    context = "\n".join([f"{msg['author']}: {msg['content']}" for msg in conversation_history])
-                    xai_response = send_to_xai(f"{context}\n{sanitized_question}")
+                    if is_image_query(content, sanitized_question):
+                        conversation_id = resolve_conversation(topic_id, username)
+                        xai_response = handle_image_request(content, sanitized_question)
+                    else:
+                        if pending:
+                            conversation_id = pending['conversation_id']
+                            conversation_history = get_conversation_history(conversation_id)[-HISTORY_WINDOW:]
+                        else:
+                            conversation_id, conversation_history = append_user_message(
+                                topic_id, username, sanitized_question, history_limit=HISTORY_WINDOW,
+                                before_commit=lambda cursor, conversation_id: save_pending_reply(
+                                    cursor, topic_id, content, conversation_id),
+                            )
+                        context = build_context(conversation_id, conversation_history)
+                        route = choose_route(sanitized_question, len(conversation_history))
+                        xai_response = send_to_xai(f"{context}\n{sanitized_question}", route=route)
+
+                    add_message_to_conversation(
+                        str(conversation_id), "ai", xai_response, user_mention_name,
+                        before_commit=lambda cursor, conversation_id: save_pending_reply(
+                            cursor, topic_id, content, conversation_id, xai_response),
+                    )
 
                 logger.debug(f"xAI response: {xai_response}")
 
                 formatted_response = format_response(xai_response)
 
                 try:
-                    add_message_to_conversation(str(conversation_id), "ai", xai_response, user_mention_name)
-
                     reply_response = post_forum_reply(topic_id, formatted_response)
+                    mark_answered(topic_id, content)
                     logger.info(f"Replied to topic {topic_id}: {xai_response}")
                     logger.debug(f"Reply post response: {reply_response}")
 
-                    if check_inactivity(str(conversation_id)):
-                        mark_conversation_as_inactive(str(conversation_id))
-                        logger.info(f"Conversation with ID {conversation_id} has been marked as inactive.")
-
                 except requests.exceptions.HTTPError as err:
                     logger.error(f"Error posting reply: {err}")
                     logger.error(f"Response content: {err.response.content}")
+                    # Let the job queue retry the notification
+                    raise
 
                 return True
             else:
@@ -126,11 +148,9 @@ def process_notification(notification, notification_type, user_mention_id, user_
             logger.info(f"No mention found in notification content, skipping.")
     except Exception as e:
         logger.error(f"Error: {e}")
+        raise
 
     return False
 
 def format_response(response):
-    formatted_response = response.replace("\n", "<br>")
-    formatted_response = f'<p style="text-align: justify;">{formatted_response}</p>'
-    formatted_response = f'<div>{formatted_response}</div>'
-    return formatted_response
\ No newline at end of file
+    return format_reply(response)
\ No newline at end of file
@@ -0,0 +1,59 @@
+# handlers/query_classifier.py
+import logging
+import re
+import threading
+from handlers.image_handler import extract_image_urls_from_content
+from api_calls import determine_query_type
+
+logger = logging.getLogger()
+
+# Phrases that ask about a picture, in Polish and English
+IMAGE_KEYWORDS = re.compile(
+    r"\b("
+    r"obraz\w*|obrazk\w*|zdj[eę]\w*|fot[ok]\w*|grafik\w*|screen\w*|zrzut\w*|memy?|"
+    r"co\s+(jest|wida[cć]|przedstawia)\s+na|kto\s+(jest\s+)?na|opisz\s+(to|ten|t[eę])|"
+    r"image\w*|pic\w*|photo\w*|screenshot\w*|"
+    r"what('s|\s+is)\s+(in|on)\s+(this|the)|who('s|\s+is)\s+(in|on)\s+(this|the)|describe\s+(this|the)"
+    r")\b",
+    re.IGNORECASE
+)
+
+_lock = threading.Lock()
+_counts = {"local_image": 0, "local_text": 0, "llm_fallback": 0}
+
+def _count(outcome):
+    with _lock:
+        _counts[outcome] += 1
+
+def classify_locally(content, question):
+    """
+    Return True (image request), False (plain question) or None when the
+    content features disagree and only the LLM can tell. Every image of the
+    post counts, so a smiley in front of a photo does not hide the photo.
+    """
+    has_image = bool(extract_image_urls_from_content(content))
+    asks_about_image = IMAGE_KEYWORDS.search(question) is not None
+    if has_image and asks_about_image:
+        return True
+    if not has_image and not asks_about_image:
+        return False
+    return None
+
+def is_image_query(content, question):
+    """Decide whether a mention asks for image analysis, calling the LLM only for ambiguous cases."""
+    result = classify_locally(content, question)
+    if result is not None:
+        _count("local_image" if result else "local_text")
+        logger.debug(f"Query classified locally as {'image' if result else 'text'}")
+        return result
+    _count("llm_fallback")
+    logger.debug("Local query classification ambiguous, asking xAI")
+    return determine_query_type(question)
+
+def stats():
+    with _lock:
+        counts = dict(_counts)
+    total = sum(counts.values())
+    counts["local_hit_rate"] = round((total - counts["llm_fallback"]) / total, 4) if total else 0.0
+    counts["fallback_rate"] = round(counts["llm_fallback"] / total, 4) if total else 0.0
+    return counts
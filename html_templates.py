@@ -0,0 +1,38 @@
+# html_templates.py
+import html
+from string import Formatter
+
+
+class Template:
+    """
+    HTML fragment with {name} placeholders (literal braces written as {{ }}).
+    The source is checked once, when the template is defined, and rendered
+    with a single str.format call. That is several times slower than a
+    hand-written f-string, so rows rendered in a loop are written as
+    f-string functions instead (see xQuiz.quiz_templates). Values are
+    inserted as given; use escape() for user-supplied text.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        fields = []
+        for _, field, format_spec, conversion in Formatter().parse(source):
+            if field is None:
+                continue
+            if not field.isidentifier() or format_spec or conversion:
+                raise ValueError(f"Unsupported template field: {field!r}")
+            if field not in fields:
+                fields.append(field)
+        self.fields = tuple(fields)
+        # render(**values) is str.format bound to the source, without a wrapper call
+        self.render = source.format
+
+def escape(text):
+    return html.escape(str(text))
+
+
+# Reply to a mention (handlers.notification_handler.format_response)
+REPLY = Template('<div><p style="text-align: justify;">{body}</p></div>')
+
+def format_reply(text):
+    return REPLY.render(body="<br>".join(text.split("\n")))
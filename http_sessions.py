@@ -0,0 +1,83 @@
+# http_sessions.py
+import logging
+import threading
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from config import (
+    FORUM_API_URL, XAI_API_URL,
+    HTTP_POOL_SIZE, HTTP_CONNECT_TIMEOUT, FORUM_READ_TIMEOUT, XAI_READ_TIMEOUT,
+)
+
+logger = logging.getLogger()
+
+
+class TimeoutSession(requests.Session):
+    """Session that applies a default (connect, read) timeout to every request."""
+
+    def __init__(self, timeout):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def _host(url):
+    return urlparse(url).netloc
+
+def get_session(url, read_timeout, pool_size=HTTP_POOL_SIZE):
+    """
+    Return the long-lived session for url's host. Connections are kept alive
+    and pooled per host, so TLS handshakes happen once per pooled connection
+    instead of once per call.
+    """
+    host = _host(url)
+    session = _sessions.get(host)
+    if session is not None:
+        return session
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = TimeoutSession((HTTP_CONNECT_TIMEOUT, read_timeout))
+            # Retries are handled by the callers (send_with_retry, job queue)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0, pool_block=False)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[host] = session
+            logger.info(f"Created HTTP session for {host} (pool size {pool_size})")
+    return session
+
+def forum_session():
+    return get_session(FORUM_API_URL, FORUM_READ_TIMEOUT)
+
+def xai_session():
+    return get_session(XAI_API_URL, XAI_READ_TIMEOUT)
+
+def stats():
+    """Per-host request and connection counts taken from urllib3's pools."""
+    result = {}
+    with _sessions_lock:
+        sessions = dict(_sessions)
+    for host, session in sessions.items():
+        adapter = session.get_adapter(f"https://{host}")
+        pools = adapter.poolmanager.pools
+        requests_made = 0
+        connections = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            requests_made += pool.num_requests
+            connections += pool.num_connections
+        result[host] = {
+            "requests": requests_made,
+            "connections_opened": connections,
+            "reused_requests": max(0, requests_made - connections),
+            "reuse_ratio": round(1 - connections / requests_made, 4) if requests_made else 0.0,
+        }
+    return result
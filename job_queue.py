@@ -0,0 +1,252 @@
+# job_queue.py
+import fcntl
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger()
+
+PENDING = 'pending'
+LEASED = 'leased'
+DEAD = 'dead'
+
+
+class QueueFullError(Exception):
+    """Raised when the queue already holds max_size unfinished jobs."""
+
+
+class Job:
+    def __init__(self, job_id, args, attempts, lane=None, leased_until=None):
+        self.id = job_id
+        self.args = args
+        self.attempts = attempts
+        self.lane = lane
+        self.leased_until = leased_until
+
+
+class JobQueue:
+    """
+    File-backed job queue on SQLite in WAL mode.
+
+    Every job is committed to disk before put() returns, so the webhook can
+    acknowledge only what is already durable. Workers lease jobs, then ack()
+    them on success or fail() them to be retried with exponential backoff.
+    Jobs still leased when the process died are handed out again by
+    recover(), which is called once at startup. recover() also takes an
+    exclusive lock on the queue file, so a second process cannot start
+    consuming it and release the first one's live leases. A job may carry a lane key;
+    lease() can skip lanes whose consumer is already busy, and touch()
+    renews a lease when a job that waited for its lane starts running.
+    """
+
+    def __init__(self, path, max_size=10000, lease_seconds=600, max_attempts=5,
+                 base_backoff=2.0, max_backoff=300.0, synchronous='NORMAL'):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.path = path
+        self.max_size = max_size
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self._consumer_lock = None
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA synchronous={synchronous}")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                args TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL,
+                leased_until REAL,
+                last_error TEXT,
+                created_at REAL NOT NULL
+            )
+        """)
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")]
+        if "lane" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN lane TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_available ON jobs (status, available_at)")
+        self._depth = self._conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status != ?", (DEAD,)
+        ).fetchone()[0]
+
+    def put(self, *args, lane=None):
+        now = time.time()
+        with self._lock:
+            if self._depth >= self.max_size:
+                raise QueueFullError(f"Job queue is full ({self.max_size} jobs)")
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (args, status, available_at, created_at, lane) VALUES (?, ?, ?, ?, ?)",
+                (json.dumps(args), PENDING, now, now, lane)
+            )
+            self._depth += 1
+            return cursor.lastrowid
+
+    def lease(self, skip_lanes=()):
+        """
+        Claim the oldest runnable job, or return None if nothing is due.
+        Jobs in skip_lanes are left for later, so the rest of their lane
+        keeps its order.
+        """
+        now = time.time()
+        skip_lanes = list(skip_lanes)
+        skip = ""
+        if skip_lanes:
+            skip = f"AND (lane IS NULL OR lane NOT IN ({', '.join('?' * len(skip_lanes))}))"
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(f"""
+                    SELECT id, args, attempts, lane FROM jobs
+                    WHERE status = ? AND available_at <= ? {skip}
+                    ORDER BY available_at, id
+                    LIMIT 1
+                """, [PENDING, now] + skip_lanes).fetchone()
+                if row is None:
+                    row = self._conn.execute(f"""
+                        SELECT id, args, attempts, lane FROM jobs
+                        WHERE status = ? AND leased_until < ? {skip}
+                        ORDER BY leased_until
+                        LIMIT 1
+                    """, [LEASED, now] + skip_lanes).fetchone()
+                    if row is not None:
+                        logger.warning(f"Lease on job {row[0]} expired, re-leasing")
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, leased_until = ? WHERE id = ?",
+                    (LEASED, now + self.lease_seconds, row[0])
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return Job(row[0], json.loads(row[1]), row[2], row[3], now + self.lease_seconds)
+
+    def touch(self, job):
+        """
+        Renew the job's lease for another lease_seconds. Returns False if the
+        lease was lost meanwhile (the job expired and was leased again), in
+        which case the caller must not run it.
+        """
+        leased_until = time.time() + self.lease_seconds
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET leased_until = ? WHERE id = ? AND status = ? AND leased_until = ?",
+                (leased_until, job.id, LEASED, job.leased_until)
+            )
+        if cursor.rowcount != 1:
+            return False
+        job.leased_until = leased_until
+        return True
+
+    def ack(self, job):
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE id = ?", (job.id,))
+            self._depth -= 1
+
+    def fail(self, job, error):
+        """
+        Schedule the job for another attempt, or bury it after max_attempts.
+        An error with a retry_after (an open circuit breaker, an exhausted
+        rate limit) says the upstream was never called, so the job is put
+        back after that delay without using up an attempt.
+        """
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after is not None:
+            self._defer(job, retry_after, error)
+            return
+        attempts = job.attempts + 1
+        with self._lock:
+            if attempts >= self.max_attempts:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = ?, leased_until = NULL, last_error = ? WHERE id = ?",
+                    (DEAD, attempts, str(error), job.id)
+                )
+                self._depth -= 1
+                logger.error(f"Job {job.id} failed {attempts} times, giving up: {error}")
+                return
+            delay = min(self.max_backoff, self.base_backoff * 2 ** (attempts - 1))
+            delay = random.uniform(delay / 2, delay)
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, attempts = ?, available_at = ?, leased_until = NULL, last_error = ? WHERE id = ?",
+                (PENDING, attempts, time.time() + delay, str(error), job.id)
+            )
+        logger.warning(f"Job {job.id} failed (attempt {attempts}), retrying in {delay:.1f}s: {error}")
+
+    def _defer(self, job, retry_after, error):
+        # Jittered past retry_after so deferred jobs do not all hit the
+        # upstream the moment it becomes available again
+        delay = max(0.0, retry_after) + random.uniform(0, self.base_backoff)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, available_at = ?, leased_until = NULL, last_error = ? WHERE id = ?",
+                (PENDING, time.time() + delay, str(error), job.id)
+            )
+        logger.warning(f"Job {job.id} deferred for {delay:.1f}s without using an attempt: {error}")
+
+    def _lock_consumer(self):
+        if self._consumer_lock is not None:
+            return
+        lock_file = open(self.path + ".lock", "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            raise RuntimeError(f"Job queue {self.path} is already consumed by another process")
+        self._consumer_lock = lock_file
+
+    def recover(self):
+        """
+        Become the queue's only consumer and release every lease left behind
+        by a previous process. Returns the number of jobs replayed. Raises
+        RuntimeError if another live process consumes the queue.
+        """
+        self._lock_consumer()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, leased_until = NULL WHERE status = ?",
+                (PENDING, LEASED)
+            )
+            recovered = cursor.rowcount
+            pending = self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (PENDING,)).fetchone()[0]
+        if pending:
+            logger.info(f"Replaying {pending} unfinished jobs ({recovered} were in flight at shutdown)")
+        return pending
+
+    def next_due_in(self):
+        """Seconds until the next pending job becomes runnable, or None if there is none."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(available_at) FROM jobs WHERE status = ?", (PENDING,)
+            ).fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def qsize(self):
+        return self._depth
+
+    def stats(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {PENDING: 0, LEASED: 0, DEAD: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+            if self._consumer_lock is not None:
+                self._consumer_lock.close()
+                self._consumer_lock = None
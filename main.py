@@ -2,9 +2,33 @@
 from flask import Flask, request, jsonify
 import logging
 from logging.handlers import TimedRotatingFileHandler
-from config import USER_MENTION_NAME, USER_MENTION_ID
-from handlers import process_notification
+from config import (
+    USER_MENTION_NAME, USER_MENTION_ID,
+    WEBHOOK_WORKERS, WEBHOOK_QUEUE_SIZE, WEBHOOK_QUEUE_PATH, WEBHOOK_MAX_ATTEMPTS, WEBHOOK_LEASE_SECONDS,
+    WEBHOOK_MAX_IN_FLIGHT, WEBHOOK_MAX_PER_LANE, TOPIC_LANE_IDLE_TIMEOUT, QUIZ_FORUM_ID,
+    INACTIVITY_SWEEP_INTERVAL, QUIZ_BANK_REFILL_INTERVAL, QUIZ_BATCH_FLUSH_INTERVAL, CONTEXT_SUMMARY_INTERVAL,
+    XAI_CACHE_PURGE_INTERVAL,
+)
+from handlers import process_notification, mentions_user
+from job_queue import JobQueue
+from worker_pool import WorkerPool, QueueFullError
+from topic_scheduler import TopicScheduler
+from db_pool import get_pool
+from conversation_manager import active_conversations, expire_inactive_conversations
+from periodic_task import PeriodicTask
+from context_builder import summarize_pending_conversations, pending_summaries
+from migrations import migrate
+from xQuiz.question_bank import replenish_question_bank
+from xQuiz.answer_batcher import answer_batcher
+from xQuiz.quiz_templates import score_tables
+from xQuiz.quiz_manager import current_questions, get_current_question
+from xQuiz.quiz_handler import QuizHandler
+import http_sessions
+import xai_stream
+from handlers import query_classifier
+from api_calls import response_cache, xai_limiter, xai_breaker, xai_flights, xai_router
 import os
+import threading
 
 app = Flask(__name__)
 
@@ -22,6 +46,101 @@ logger = logging.getLogger()
 logger.addHandler(log_handler)
 logger.setLevel(logging.DEBUG)
 
+SUPPORTED_EVENTS = ('forumsTopic_create', 'forumsTopicPost_create')
+
+quiz_handler = QuizHandler()
+
+def webhook_topic_id(data, event_type):
+    """Topic an event belongs to; events of one topic are handled one at a time, in order."""
+    if event_type == 'forumsTopic_create':
+        return str(data.get('id'))
+    return str(data.get('item_id'))
+
+def handle_webhook_event(data, event_type):
+    """
+    Quiz topics and posts go to the quiz handler; everything it does not
+    take (mentions of the bot, topics that do not start a quiz, posts that
+    are neither answers nor a category) goes on to process_notification.
+    Errors propagate, so the job is retried by the queue.
+    """
+    topic_id = webhook_topic_id(data, event_type)
+    author_data = data.get('author') or {}
+    author = author_data.get('name')
+    content = data.get('content', '')
+    if author != USER_MENTION_NAME and not mentions_user(content, USER_MENTION_ID, USER_MENTION_NAME):
+        if event_type == 'forumsTopic_create' and str((data.get('forum') or {}).get('id')) == QUIZ_FORUM_ID:
+            if quiz_handler.handle_quiz_topic_create(topic_id, content):
+                return
+        elif event_type == 'forumsTopicPost_create' and get_current_question(topic_id):
+            if quiz_handler.handle_quiz_post(topic_id, content, author, author_data.get('id')):
+                return
+    process_notification(data, event_type, USER_MENTION_ID, USER_MENTION_NAME)
+
+webhook_queue = JobQueue(
+    WEBHOOK_QUEUE_PATH,
+    max_size=WEBHOOK_QUEUE_SIZE,
+    lease_seconds=WEBHOOK_LEASE_SECONDS,
+    max_attempts=WEBHOOK_MAX_ATTEMPTS,
+)
+topic_lanes = TopicScheduler(max_concurrency=WEBHOOK_WORKERS, idle_timeout=TOPIC_LANE_IDLE_TIMEOUT, name="topic-lane")
+worker_pool = WorkerPool(
+    handle_webhook_event, webhook_queue, name="webhook",
+    scheduler=topic_lanes, key_func=webhook_topic_id,
+    max_in_flight=WEBHOOK_MAX_IN_FLIGHT, max_per_lane=WEBHOOK_MAX_PER_LANE,
+)
+def flush_answer_batches():
+    """Queue due wrong-answer batches on their topic's lane, behind posts already waiting there."""
+    due = answer_batcher.answer_queue.get_due_questions()
+    for question in due:
+        topic_lanes.submit(str(question['topic_id']), answer_batcher.process, question['topic_id'], question)
+    return len(due)
+
+inactivity_sweeper = PeriodicTask(expire_inactive_conversations, INACTIVITY_SWEEP_INTERVAL, "inactivity-sweeper")
+question_bank_replenisher = PeriodicTask(replenish_question_bank, QUIZ_BANK_REFILL_INTERVAL, "quiz-bank-replenisher")
+answer_batch_flusher = PeriodicTask(flush_answer_batches, QUIZ_BATCH_FLUSH_INTERVAL, "quiz-answer-batcher")
+summarizer = PeriodicTask(summarize_pending_conversations, CONTEXT_SUMMARY_INTERVAL, "conversation-summarizer")
+cache_purger = PeriodicTask(response_cache.purge_expired, XAI_CACHE_PURGE_INTERVAL, "xai-cache-purger")
+
+_background_lock = threading.Lock()
+_background_started = False
+
+def start_background_workers():
+    """
+    Apply migrations and start the webhook workers and periodic tasks, once
+    per process. Only one process may consume the webhook queue file: while
+    another one does, this returns False and starts nothing, and the jobs
+    this process accepts are run by that consumer. Called before every
+    request (see ensure_background_workers), so it also works under a WSGI
+    server such as gunicorn, where the __main__ block below never runs, and
+    the next process to get a request takes over the queue if its consumer
+    exits.
+    """
+    global _background_started
+    with _background_lock:
+        if _background_started:
+            return True
+        try:
+            webhook_queue.recover()
+        except RuntimeError as e:
+            logger.debug(f"Not starting background workers: {e}")
+            return False
+        migrate()
+        worker_pool.start()
+        inactivity_sweeper.start()
+        question_bank_replenisher.start()
+        answer_batch_flusher.start()
+        summarizer.start()
+        cache_purger.start()
+        _background_started = True
+        return True
+
+@app.before_request
+def ensure_background_workers():
+    # Started lazily, in the serving process: threads started at import time
+    # would not survive a pre-forking server's fork
+    if not _background_started:
+        start_background_workers()
+
 @app.route('/webhook', methods=['POST'])
 def webhook():
     logger.debug(f"Headers: {request.headers}")
@@ -31,7 +150,7 @@ def webhook():
     logger.debug(f"Content type: {content_type}")
 
     if content_type == 'application/json':
-        data = request.get_json()
+        data = request.get_json(silent=True)
     else:
         data = None
 
@@ -40,14 +159,49 @@ def webhook():
     event_type = request.headers.get('Webhook-Event')
     logger.debug(f"Webhook event type: {event_type}")
 
+    if not isinstance(data, dict):
+        logger.error("Error processing notification: No JSON data received")
+        return jsonify({'status': 'error', 'message': 'No JSON data received'}), 400
+
+    if event_type not in SUPPORTED_EVENTS:
+        logger.info(f"Ignoring unhandled webhook event: {event_type}")
+        return jsonify({'status': 'ignored'}), 200
+
     try:
-        if data is None:
-            raise ValueError("No JSON data received")
-        process_notification(data, event_type, USER_MENTION_ID, USER_MENTION_NAME)
+        worker_pool.submit(data, event_type)
+    except QueueFullError as e:
+        logger.error(f"Error queueing notification: {e}")
+        return jsonify({'status': 'error', 'message': 'Queue full'}), 503
     except Exception as e:
-        logger.error(f"Error processing notification: {e}")
+        logger.error(f"Error persisting notification: {e}")
+        return jsonify({'status': 'error', 'message': 'Could not persist notification'}), 500
+
+    return jsonify({'status': 'accepted'}), 202
 
-    return jsonify({'status': 'success'}), 200
+@app.route('/stats', methods=['GET'])
+def stats():
+    return jsonify({
+        'webhook_pool': worker_pool.stats(),
+        'db_pool': get_pool().stats(),
+        'active_conversations': active_conversations.stats(),
+        'inactivity_sweeper': inactivity_sweeper.stats(),
+        'conversation_summarizer': dict(summarizer.stats(), pending=pending_summaries()),
+        'quiz_bank_replenisher': question_bank_replenisher.stats(),
+        'quiz_answer_batches': dict(answer_batcher.stats(), flusher=answer_batch_flusher.stats()),
+        'quiz_score_tables': score_tables.stats(),
+        'quiz_current_questions': current_questions.stats(),
+        'http': http_sessions.stats(),
+        'xai_stream': xai_stream.metrics.stats(),
+        'query_classifier': query_classifier.stats(),
+        'xai_cache': dict(response_cache.stats(), purger=cache_purger.stats()),
+        'xai_rate_limiter': xai_limiter.stats(),
+        'xai_circuit_breaker': xai_breaker.stats(),
+        'xai_single_flight': xai_flights.stats(),
+        'xai_routes': xai_router.stats(),
+    }), 200
 
 if __name__ == "__main__":
-    app.run(port=5000, debug=True)
\ No newline at end of file
+    start_background_workers()
+    # The reloader would run this module again in a child process, with a
+    # second set of workers on the same queue
+    app.run(port=5000, debug=True, use_reloader=False)
@@ -0,0 +1,342 @@
+# migrations.py
+"""
+Versioned schema for the bot's MySQL database.
+
+Each migration runs once and is recorded in schema_migrations. Run
+`python migrations.py` to apply pending migrations (main.py also does this at
+startup) and `python migrations.py --check` to EXPLAIN the hot queries and fail
+if any of them scans a whole table.
+"""
+import logging
+import sys
+from utils import get_db_connection
+
+logger = logging.getLogger()
+
+
+def _index_exists(cursor, table, index_name):
+    cursor.execute("""
+        SELECT 1 FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        LIMIT 1
+    """, (table, index_name))
+    return cursor.fetchone() is not None
+
+def _column_exists(cursor, table, column):
+    cursor.execute("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+        LIMIT 1
+    """, (table, column))
+    return cursor.fetchone() is not None
+
+def _create_index(cursor, table, index_name, columns, unique=False):
+    # MySQL has no CREATE INDEX IF NOT EXISTS
+    if _index_exists(cursor, table, index_name):
+        return
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    cursor.execute(f"CREATE {kind} {index_name} ON {table} ({columns})")
+
+
+def _001_base_tables(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS conversations (
+            conversation_id VARCHAR(32) NOT NULL PRIMARY KEY,
+            topic_id INT UNSIGNED NOT NULL,
+            username VARCHAR(255) NOT NULL,
+            last_activity DATETIME NOT NULL,
+            is_active BOOLEAN NOT NULL DEFAULT TRUE
+        ) DEFAULT CHARSET=utf8mb4
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS messages (
+            id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+            conversation_id VARCHAR(32) NOT NULL,
+            author VARCHAR(32) NOT NULL,
+            timestamp DATETIME NOT NULL,
+            content MEDIUMTEXT NOT NULL,
+            username VARCHAR(255)
+        ) DEFAULT CHARSET=utf8mb4
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS quiz_questions (
+            id INT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+            topic_id INT UNSIGNED NOT NULL,
+            question TEXT NOT NULL,
+            answer VARCHAR(255) NOT NULL,
+            variants TEXT,
+            category VARCHAR(255),
+            created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        ) DEFAULT CHARSET=utf8mb4
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS quiz_hints (
+            id INT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+            question_id INT UNSIGNED NOT NULL,
+            hint_order INT UNSIGNED NOT NULL,
+            hint_text TEXT NOT NULL
+        ) DEFAULT CHARSET=utf8mb4
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS quiz_scores (
+            user_name VARCHAR(255) NOT NULL PRIMARY KEY,
+            score INT NOT NULL DEFAULT 0
+        ) DEFAULT CHARSET=utf8mb4
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS quiz_answer_queue (
+            id INT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+            question_id INT UNSIGNED NOT NULL,
+            user_name VARCHAR(255) NOT NULL,
+            answer TEXT NOT NULL,
+            timestamp DATETIME NOT NULL,
+            processed BOOLEAN NOT NULL DEFAULT FALSE
+        ) DEFAULT CHARSET=utf8mb4
+    """)
+
+def _002_hot_path_indexes(cursor):
+    # get_active_conversation_id / _resolve_conversation
+    _create_index(cursor, "conversations", "idx_conversations_topic_user_active",
+                  "topic_id, username, is_active, last_activity")
+    # expire_inactive_conversations
+    _create_index(cursor, "conversations", "idx_conversations_active_last_activity",
+                  "is_active, last_activity")
+    # append_user_message / get_conversation_history
+    _create_index(cursor, "messages", "idx_messages_conversation_timestamp",
+                  "conversation_id, timestamp")
+    # get_current_question
+    _create_index(cursor, "quiz_questions", "idx_quiz_questions_topic_created",
+                  "topic_id, created_at")
+    _create_index(cursor, "quiz_hints", "uq_quiz_hints_question_order",
+                  "question_id, hint_order", unique=True)
+    _create_index(cursor, "quiz_scores", "idx_quiz_scores_score", "score")
+    # get_pending_answers / should_process_answers
+    _create_index(cursor, "quiz_answer_queue", "idx_quiz_answer_queue_pending",
+                  "question_id, processed, timestamp")
+
+def _003_bot_state_tables(cursor):
+    # dedup_store
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS answered_mentions (
+            topic_id VARCHAR(32) NOT NULL,
+            content_hash CHAR(64) NOT NULL,
+            answered_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (topic_id, content_hash)
+        )
+    """)
+    # conversation_manager._allocate_conversation_id
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS conversation_id_seq (
+            id TINYINT UNSIGNED NOT NULL PRIMARY KEY,
+            last_id BIGINT UNSIGNED NOT NULL
+        )
+    """)
+    cursor.execute("""
+        INSERT IGNORE INTO conversation_id_seq (id, last_id)
+        SELECT 1, COALESCE(MAX(CAST(conversation_id AS UNSIGNED)), 0) FROM conversations
+    """)
+    # context_builder; a summary covers messages up to summarized_through_id,
+    # an id rather than a timestamp, so messages sharing a second are neither
+    # lost nor summarised twice
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS conversation_summaries (
+            conversation_id VARCHAR(32) NOT NULL PRIMARY KEY,
+            summary TEXT NOT NULL,
+            summarized_until DATETIME NOT NULL,
+            summarized_through_id BIGINT UNSIGNED NOT NULL DEFAULT 0
+        ) DEFAULT CHARSET=utf8mb4
+    """)
+
+def _004_quiz_question_bank(cursor):
+    # xQuiz.question_bank; used rows are kept so question_hash keeps rejecting repeats
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS quiz_question_bank (
+            id INT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+            category VARCHAR(255) NOT NULL,
+            question_hash CHAR(64) NOT NULL,
+            question TEXT NOT NULL,
+            answer VARCHAR(255) NOT NULL,
+            hints TEXT,
+            created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            used_at DATETIME NULL,
+            UNIQUE KEY uq_quiz_question_bank_hash (question_hash),
+            KEY idx_quiz_question_bank_ready (category, used_at, id)
+        ) DEFAULT CHARSET=utf8mb4
+    """)
+
+def _005_quiz_hints_served(cursor):
+    # xQuiz.quiz_manager.mark_hint_served: position in the hint ladder
+    if not _column_exists(cursor, "quiz_questions", "hints_served"):
+        cursor.execute("ALTER TABLE quiz_questions ADD COLUMN hints_served INT UNSIGNED NOT NULL DEFAULT 0")
+
+def _006_quiz_answer_batch_index(cursor):
+    # QuizAnswerQueue.get_due_questions
+    _create_index(cursor, "quiz_answer_queue", "idx_quiz_answer_queue_unprocessed",
+                  "processed, question_id, timestamp")
+
+def _007_quiz_question_answered(cursor):
+    # xQuiz.quiz_manager.award_correct_answer: the first correct answer closes the question
+    if not _column_exists(cursor, "quiz_questions", "answered_by"):
+        cursor.execute("ALTER TABLE quiz_questions ADD COLUMN answered_by VARCHAR(255) NULL")
+    if not _column_exists(cursor, "quiz_questions", "answered_at"):
+        cursor.execute("ALTER TABLE quiz_questions ADD COLUMN answered_at DATETIME NULL")
+
+def _008_pending_replies(cursor):
+    # dedup_store.get_pending_reply / save_pending_reply: resumable mention replies
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS pending_replies (
+            topic_id VARCHAR(32) NOT NULL,
+            content_hash CHAR(64) NOT NULL,
+            conversation_id VARCHAR(32) NOT NULL,
+            reply MEDIUMTEXT,
+            created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (topic_id, content_hash)
+        ) DEFAULT CHARSET=utf8mb4
+    """)
+
+def _009_unique_active_conversation(cursor):
+    # conversation_manager._resolve_conversation: at most one active
+    # conversation per (topic, user), enforced by the database. active_marker
+    # is 1 for the active row and NULL otherwise, and NULLs never collide.
+    if _column_exists(cursor, "conversations", "active_marker"):
+        return
+    # Keep only the newest of any duplicates created before the constraint
+    cursor.execute("""
+        UPDATE conversations c
+        JOIN conversations d
+          ON d.topic_id = c.topic_id AND d.username = c.username AND d.is_active = TRUE
+         AND (d.last_activity > c.last_activity
+              OR (d.last_activity = c.last_activity AND d.conversation_id > c.conversation_id))
+        SET c.is_active = FALSE
+        WHERE c.is_active = TRUE
+    """)
+    cursor.execute("""
+        ALTER TABLE conversations
+        ADD COLUMN active_marker TINYINT AS (IF(is_active, 1, NULL)) STORED
+    """)
+    _create_index(cursor, "conversations", "uq_conversations_active",
+                  "topic_id, username, active_marker", unique=True)
+
+MIGRATIONS = [
+    (1, "base tables", _001_base_tables),
+    (2, "hot path indexes", _002_hot_path_indexes),
+    (3, "dedup, id sequence and summary tables", _003_bot_state_tables),
+    (4, "quiz question bank", _004_quiz_question_bank),
+    (5, "served hint counter", _005_quiz_hints_served),
+    (6, "unprocessed quiz answers index", _006_quiz_answer_batch_index),
+    (7, "answered quiz questions", _007_quiz_question_answered),
+    (8, "pending mention replies", _008_pending_replies),
+    (9, "unique active conversation", _009_unique_active_conversation),
+]
+
+# Queries on the request path. Each must be answerable from an index.
+HOT_QUERIES = [
+    ("active conversation", """
+        SELECT conversation_id, last_activity FROM conversations
+        WHERE topic_id = %s AND username = %s AND is_active = TRUE
+        ORDER BY last_activity DESC LIMIT 1
+    """, (1, "user")),
+    ("conversation last activity", """
+        SELECT last_activity FROM conversations WHERE conversation_id = %s
+    """, ("1",)),
+    ("expire inactive conversations", """
+        UPDATE conversations SET is_active = FALSE
+        WHERE is_active = TRUE AND last_activity < NOW()
+    """, ()),
+    ("recent history", """
+        SELECT id, author, timestamp, content, username FROM messages
+        WHERE conversation_id = %s ORDER BY timestamp DESC, id DESC LIMIT 20
+    """, ("1",)),
+    ("answered mention", """
+        SELECT 1 FROM answered_mentions WHERE topic_id = %s AND content_hash = %s
+    """, ("1", "0" * 64)),
+    ("pending reply", """
+        SELECT conversation_id, reply FROM pending_replies WHERE topic_id = %s AND content_hash = %s
+    """, ("1", "0" * 64)),
+    ("conversation summary", """
+        SELECT summary, summarized_through_id FROM conversation_summaries WHERE conversation_id = %s
+    """, ("1",)),
+    ("current quiz question", """
+        SELECT id, topic_id, question, answer, variants, answered_by, answered_at, created_at
+        FROM quiz_questions
+        WHERE topic_id = %s ORDER BY created_at DESC, id DESC LIMIT 1
+    """, (1,)),
+    ("quiz hint", """
+        SELECT q.hints_served + 1 AS hint_order, h.hint_text
+        FROM quiz_questions q
+        LEFT JOIN quiz_hints h ON h.question_id = q.id AND h.hint_order = q.hints_served + 1
+        WHERE q.id = %s
+    """, (1,)),
+    ("pending quiz answers", """
+        SELECT id, user_name, answer, timestamp FROM quiz_answer_queue
+        WHERE question_id = %s AND processed = FALSE ORDER BY timestamp ASC
+    """, (1,)),
+    ("quiz bank question", """
+        SELECT id, question, answer, hints FROM quiz_question_bank
+        WHERE category = %s AND used_at IS NULL ORDER BY id LIMIT 1
+    """, ("wrestling",)),
+    ("user score", """
+        SELECT score FROM quiz_scores WHERE user_name = %s
+    """, ("user",)),
+]
+
+
+def migrate():
+    """Apply pending migrations in order. Returns the list of versions applied."""
+    applied = []
+    connection = get_db_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INT UNSIGNED NOT NULL PRIMARY KEY,
+                    description VARCHAR(255) NOT NULL,
+                    applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            cursor.execute("SELECT version FROM schema_migrations")
+            done = {row['version'] for row in cursor.fetchall()}
+            for version, description, apply in MIGRATIONS:
+                if version in done:
+                    continue
+                logger.info(f"Applying migration {version}: {description}")
+                # DDL commits implicitly in MySQL, so every step is written to be re-runnable
+                apply(cursor)
+                cursor.execute(
+                    "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                    (version, description)
+                )
+                applied.append(version)
+    finally:
+        connection.close()
+    return applied
+
+def check_query_plans():
+    """EXPLAIN every hot query. Returns a list of (name, table) pairs that use a full table scan."""
+    full_scans = []
+    connection = get_db_connection()
+    try:
+        with connection.cursor() as cursor:
+            for name, sql, params in HOT_QUERIES:
+                cursor.execute("EXPLAIN " + sql, params)
+                for row in cursor.fetchall():
+                    if row.get('type') == 'ALL':
+                        full_scans.append((name, row.get('table')))
+                        logger.error(f"Full table scan in hot query '{name}' on table {row.get('table')}")
+    finally:
+        connection.close()
+    return full_scans
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if "--check" in sys.argv[1:]:
+        scans = check_query_plans()
+        if scans:
+            for name, table in scans:
+                print(f"FULL SCAN: {name} ({table})")
+            sys.exit(1)
+        print(f"All {len(HOT_QUERIES)} hot queries use an index")
+    else:
+        versions = migrate()
+        print(f"Applied migrations: {versions}" if versions else "Schema is up to date")
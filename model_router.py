@@ -0,0 +1,159 @@
+# model_router.py
+import logging
+import re
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger()
+
+# Routes from richest/slowest to fastest. Each falls back to the next one.
+SEARCH = "grok-3-search"
+NO_SEARCH = "grok-3"
+FAST = "grok-2"
+FALLBACK = {SEARCH: NO_SEARCH, NO_SEARCH: FAST}
+
+# Questions about events, results or news need live search. Every
+# alternative is a whole word (or phrase) with its inflected endings spelled
+# out, so "pasta", "galaktyka" or an ordinary "show" do not match.
+EVENT_PATTERN = re.compile(
+    r"\b(?:"
+    r"wynik(?:i|u|ów|ach)?|wygra(?:ł|ła|li|ły|ny|na|nej|ną|ć|nie)?|przegra(?:ł|ła|li|ły|ny|na|ć|nie)?|"
+    r"gal(?:a|i|ę|ą|ach|ami)?|ppv|pay-per-view|raw|smackdown|nxt|aew|dynamite|"
+    r"wrestlemani(?:a|i|ę|ą)|royal rumble|summerslam|survivor series|money in the bank|"
+    r"wczoraj(?:szy|sza|sze|szej|szego|szym)?|dzisiaj|dzi[sś]|dzisiejsz(?:y|a|e|ej|ego|ym)|jutro|"
+    r"ostatni(?:a|e|ej|ego|m|ch)?|najnowsz(?:y|a|e|ej|ego|ych)|nowo[sś]ci?|news|plotk(?:a|i|ę|ach)|"
+    r"pas(?:a|em|ie|y|ów|ach|ami)?|tytu[lł](?:u|em|y|ów)?|mistrz(?:a|em|u|owie|ów|ostwo|ostwa|yni)?|"
+    r"champion(?:s|ship|ships|em|a|ów)?|title|results?|who won|last night|tonight|latest|match card"
+    r")\b",
+    re.IGNORECASE
+)
+
+
+class LatencyStats:
+    """Latencies of the last `window` seconds for one route."""
+
+    def __init__(self, window):
+        self.window = window
+        self._samples = deque()
+        self.calls = 0
+        self.errors = 0
+
+    def _trim(self, now):
+        while self._samples and now - self._samples[0][0] > self.window:
+            self._samples.popleft()
+
+    def record(self, latency, ok, now):
+        self.calls += 1
+        if not ok:
+            self.errors += 1
+        self._samples.append((now, latency))
+        self._trim(now)
+
+    def percentile(self, fraction, now):
+        self._trim(now)
+        if not self._samples:
+            return None
+        values = sorted(latency for _, latency in self._samples)
+        return values[int(fraction * (len(values) - 1))]
+
+    def samples(self, now):
+        self._trim(now)
+        return len(self._samples)
+
+    def reset(self):
+        self._samples.clear()
+
+
+class ModelRouter:
+    """
+    Picks a route for a chat question from its features, then demotes it to
+    a faster route while the route's recent p95 latency is above the
+    threshold. Samples age out after `window` seconds; in the meantime, one
+    question every `probe_interval` seconds still goes to a demoted route
+    (half-open), and a probe that comes back fast clears the slow samples
+    so the route is used again at once.
+    """
+
+    def __init__(self, p95_threshold, min_samples, window, long_query_chars, deep_conversation,
+                 probe_interval=60):
+        self.p95_threshold = p95_threshold
+        self.min_samples = min_samples
+        self.long_query_chars = long_query_chars
+        self.deep_conversation = deep_conversation
+        self.probe_interval = probe_interval
+        self._lock = threading.Lock()
+        self._stats = {route: LatencyStats(window) for route in (SEARCH, NO_SEARCH, FAST)}
+        self._chosen = {route: 0 for route in self._stats}
+        self._demoted = 0
+        self._next_probe = {}
+        self._probing = set()
+        self._probes = 0
+        self._recovered = 0
+
+    def classify(self, question, depth=0):
+        """Route from query features alone, ignoring latency."""
+        if EVENT_PATTERN.search(question):
+            return SEARCH
+        if len(question) >= self.long_query_chars or depth >= self.deep_conversation:
+            return NO_SEARCH
+        return FAST
+
+    def choose(self, question, depth=0):
+        route = self.classify(question, depth)
+        now = time.monotonic()
+        with self._lock:
+            while route in FALLBACK:
+                stats = self._stats[route]
+                p95 = stats.percentile(0.95, now)
+                if stats.samples(now) < self.min_samples or p95 is None or p95 <= self.p95_threshold:
+                    self._next_probe.pop(route, None)
+                    break
+                next_probe = self._next_probe.setdefault(route, now + self.probe_interval)
+                # At most one probe per interval; one that never reports back is superseded by the next
+                if now >= next_probe:
+                    self._next_probe[route] = now + self.probe_interval
+                    self._probing.add(route)
+                    self._probes += 1
+                    logger.info(f"Route {route} demoted, sending a probe")
+                    break
+                logger.info(f"Route {route} p95 {p95:.1f}s over {self.p95_threshold}s, using {FALLBACK[route]}")
+                route = FALLBACK[route]
+                self._demoted += 1
+            self._chosen[route] += 1
+        return route
+
+    def record(self, route, latency, ok=True):
+        with self._lock:
+            stats = self._stats[route]
+            stats.record(latency, ok, time.monotonic())
+            if route in self._probing:
+                self._probing.discard(route)
+                if ok and latency <= self.p95_threshold:
+                    logger.info(f"Route {route} probe took {latency:.1f}s, route restored")
+                    stats.reset()
+                    self._next_probe.pop(route, None)
+                    self._recovered += 1
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            routes = {}
+            for route, stats in self._stats.items():
+                p50 = stats.percentile(0.5, now)
+                p95 = stats.percentile(0.95, now)
+                routes[route] = {
+                    "chosen": self._chosen[route],
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "recent_samples": stats.samples(now),
+                    "p50_seconds": round(p50, 3) if p50 is not None else None,
+                    "p95_seconds": round(p95, 3) if p95 is not None else None,
+                }
+            return {
+                "routes": routes,
+                "demoted": self._demoted,
+                "probes": self._probes,
+                "recovered": self._recovered,
+                "p95_threshold_seconds": self.p95_threshold,
+            }
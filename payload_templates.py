@@ -0,0 +1,46 @@
+# payload_templates.py
+import json
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+class PayloadTemplate:
+    """
+    Chat-completions request body with its static parts serialised once.
+
+    The system prompt and fixed fields (model, temperature, search
+    parameters, response format, ...) are encoded when the template is
+    created; render() only serialises the per-call messages and overrides and
+    splices them in. The system prompt therefore reaches the API as the same
+    bytes on every call, which lets the provider reuse its cached prefix.
+    """
+
+    def __init__(self, model, system_prompt=None, **static_fields):
+        self.model = model
+        self.system_prompt = system_prompt
+        self.static_fields = dict(static_fields, model=model)
+        head = '{"messages":['
+        if system_prompt is not None:
+            head += _dumps({"role": "system", "content": system_prompt})
+        self._head = head.encode("utf-8")
+        self._separator = b"," if system_prompt is not None else b""
+        self._tail = ("]," + _dumps(self.static_fields)[1:-1]).encode("utf-8")
+
+    def render(self, messages, **overrides):
+        """Return the request body as UTF-8 JSON bytes."""
+        parts = [self._head]
+        if messages:
+            parts.append(self._separator)
+            parts.append(_dumps(messages)[1:-1].encode("utf-8"))
+        parts.append(self._tail)
+        if overrides:
+            parts.append(b"," + _dumps(overrides)[1:-1].encode("utf-8"))
+        parts.append(b"}")
+        return b"".join(parts)
+
+    def build(self, messages, **overrides):
+        """The same payload as a dict; used by the benchmark and for debugging."""
+        system = [{"role": "system", "content": self.system_prompt}] if self.system_prompt is not None else []
+        return {"messages": system + list(messages), **self.static_fields, **overrides}
@@ -0,0 +1,78 @@
+# periodic_task.py
+import logging
+import threading
+import time
+
+logger = logging.getLogger()
+
+
+class PeriodicTask:
+    """
+    Runs func every `interval` seconds on a daemon thread. The value func
+    returns (e.g. a row count) is kept as the result of the last run and
+    summed across runs for reporting.
+    """
+
+    def __init__(self, func, interval, name):
+        self.func = func
+        self.interval = interval
+        self.name = name
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._runs = 0
+        self._errors = 0
+        self._last_result = None
+        self._total_result = 0
+        self._last_run_at = None
+        self._last_duration = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+        self._thread.start()
+        logger.info(f"Started {self.name} (every {self.interval}s)")
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run_once(self):
+        started = time.monotonic()
+        try:
+            result = self.func()
+        except Exception as e:
+            logger.error(f"Error in {self.name}: {e}")
+            with self._lock:
+                self._errors += 1
+            return None
+        duration = time.monotonic() - started
+        with self._lock:
+            self._runs += 1
+            self._last_result = result
+            if isinstance(result, (int, float)):
+                self._total_result += result
+            self._last_run_at = time.time()
+            self._last_duration = duration
+        logger.debug(f"{self.name} run finished in {duration:.3f}s: {result}")
+        return result
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "interval": self.interval,
+                "runs": self._runs,
+                "errors": self._errors,
+                "last_result": self._last_result,
+                "total_result": self._total_result,
+                "last_run_at": self._last_run_at,
+                "last_duration_seconds": self._last_duration,
+            }
@@ -0,0 +1,170 @@
+# rate_limiter.py
+import logging
+import threading
+import time
+
+logger = logging.getLogger()
+
+
+class RateLimitTimeout(Exception):
+    """
+    Raised when a token could not be acquired in time. retry_after is how
+    many seconds the caller would still have had to wait for one.
+    """
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling an upstream that is currently failing.
+    retry_after is the number of seconds until the breaker lets a trial
+    call through again.
+    """
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Token bucket shared by every caller of one upstream. `rate` tokens are
+    added per second up to `capacity`; each request takes one. pause_until()
+    lets a server hint (Retry-After) hold back all callers, not just the one
+    that received it.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, timeout=None):
+        started = time.monotonic()
+        waited = False
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    self.acquired += 1
+                    if waited:
+                        self.throttled += 1
+                        self.total_wait += now - started
+                    return
+                if now < self._paused_until:
+                    sleep_for = self._paused_until - now
+                else:
+                    sleep_for = (1 - self._tokens) / self.rate
+            if timeout is not None and time.monotonic() + sleep_for - started > timeout:
+                raise RateLimitTimeout(f"No rate limit token within {timeout}s", retry_after=sleep_for)
+            waited = True
+            time.sleep(sleep_for)
+
+    def pause_until(self, monotonic_deadline):
+        with self._lock:
+            self._paused_until = max(self._paused_until, monotonic_deadline)
+
+    def stats(self):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            return {
+                "rate_per_second": self.rate,
+                "capacity": self.capacity,
+                "tokens_available": round(self._tokens, 2),
+                "paused_for_seconds": round(max(0.0, self._paused_until - now), 2),
+                "acquired": self.acquired,
+                "throttled": self.throttled,
+                "total_wait_seconds": round(self.total_wait, 3),
+            }
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls
+    for `reset_timeout` seconds; then lets a single trial call through
+    (half-open) and closes again if it succeeds. Every call allowed by
+    before_call() must end in record_success() or record_failure(); a
+    trial that never reports back is given up after another reset_timeout,
+    so the circuit cannot stay half-open forever.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold, reset_timeout, name="upstream"):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.name = name
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._trial_started_at = 0.0
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.times_opened = 0
+
+    def before_call(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._state == self.OPEN:
+                if now - self._opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"{self.name} circuit is open",
+                                           retry_after=self.reset_timeout - (now - self._opened_at))
+                self._state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self._state == self.HALF_OPEN:
+                if self._trial_in_flight and now - self._trial_started_at < self.reset_timeout:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"{self.name} circuit is half-open, trial call in flight",
+                                           retry_after=self.reset_timeout - (now - self._trial_started_at))
+                if self._trial_in_flight:
+                    logger.warning(f"{self.name} circuit trial call never finished, allowing another")
+                self._trial_in_flight = True
+                self._trial_started_at = now
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"{self.name} circuit closed")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.times_opened += 1
+                    logger.warning(f"{self.name} circuit opened after {self._failures} consecutive failures")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
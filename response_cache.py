@@ -0,0 +1,171 @@
+# response_cache.py
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+logger = logging.getLogger()
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_prompt(prompt):
+    """Fold away differences that do not change the question: case, Unicode form, whitespace."""
+    prompt = unicodedata.normalize("NFKC", prompt).casefold()
+    return _WHITESPACE.sub(" ", prompt).strip()
+
+def cache_key(prompt, params):
+    material = json.dumps([normalize_prompt(prompt), params], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class DiskTier:
+    """Optional second tier in a SQLite file, so cached replies survive restarts."""
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_expires_at ON responses (expires_at)")
+
+    def get(self, key, now):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            return row
+
+    def put(self, key, value, expires_at):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at)
+            )
+
+    def purge_expired(self, now):
+        with self._lock:
+            return self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,)).rowcount
+
+
+class ResponseCache:
+    """
+    LRU cache of xAI replies keyed by the normalised prompt and the model
+    parameters. Entries carry their own TTL, chosen by the call site; the
+    memory tier is bounded by entry count and by bytes held. Only complete
+    replies may be put here: a reply of a stream that was cut off would be
+    served again for the whole TTL.
+    """
+
+    def __init__(self, max_entries=512, max_bytes=16 * 1024 * 1024, disk_path=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._disk = DiskTier(disk_path) if disk_path else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, prompt, params):
+        key = cache_key(prompt, params)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at, size = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._drop(key)
+        if self._disk is not None:
+            row = self._disk.get(key, now)
+            if row is not None:
+                self._store(key, row[0], row[1])
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                return row[0]
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, prompt, params, value, ttl):
+        if not ttl or ttl <= 0:
+            return
+        key = cache_key(prompt, params)
+        expires_at = time.time() + ttl
+        self._store(key, value, expires_at)
+        if self._disk is not None:
+            try:
+                self._disk.put(key, value, expires_at)
+            except Exception as e:
+                logger.error(f"Error writing response cache to disk: {e}")
+
+    def purge_expired(self):
+        """
+        Drop expired replies from both tiers and return how many were
+        removed. Expired rows are otherwise deleted only when looked up
+        again, so the disk tier would keep every reply ever cached.
+        """
+        now = time.time()
+        with self._lock:
+            expired = [key for key, (_, expires_at, _) in self._entries.items() if expires_at <= now]
+            for key in expired:
+                self._drop(key)
+        purged = len(expired)
+        if self._disk is not None:
+            purged += self._disk.purge_expired(now)
+        return purged
+
+    def _store(self, key, value, expires_at):
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+
+    def _drop(self, key):
+        """Remove an entry from the memory tier. Caller holds the lock."""
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "disk_enabled": self._disk is not None,
+            }
@@ -0,0 +1,77 @@
+# single_flight.py
+import logging
+import threading
+
+logger = logging.getLogger()
+
+
+class SingleFlightTimeout(Exception):
+    """Raised when a follower gave up waiting for the in-flight call it joined."""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    Registry of in-flight calls by key. The first caller for a key runs the
+    function; callers arriving while it runs wait for and share its result
+    (or exception) instead of making their own upstream request.
+    """
+
+    def __init__(self, name="single-flight"):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+    def do(self, key, func, timeout=None):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+                self.leaders += 1
+                leader = True
+            else:
+                call.followers += 1
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            logger.debug(f"{self.name}: joining in-flight call {key[:12]}")
+            if not call.done.wait(timeout):
+                with self._lock:
+                    self.timeouts += 1
+                raise SingleFlightTimeout(f"{self.name}: in-flight call did not finish within {timeout}s")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "waiting_followers": sum(call.followers for call in self._calls.values()),
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "timeouts": self.timeouts,
+            }
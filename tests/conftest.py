@@ -0,0 +1,107 @@
+# tests/conftest.py
+import os
+import sys
+
+# Moduły bota importowane są z katalogu głównego repozytorium, jak w main.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# config.py wymaga tych zmiennych; testy nie łączą się ani z bazą, ani z API
+for _name, _value in {
+    "DB_HOST": "localhost", "DB_PORT": "3306", "DB_NAME": "test", "DB_USER": "test", "DB_PASSWORD": "test",
+    "FORUM_API_KEY": "test", "XAI_API_KEY": "test",
+}.items():
+    os.environ.setdefault(_name, _value)
+
+
+class Write:
+    """Wynik zapytania zmieniającego dane: liczba wierszy i ewentualnie lastrowid."""
+
+    def __init__(self, rowcount, lastrowid=None):
+        self.rowcount = rowcount
+        self.lastrowid = lastrowid
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self._rows = []
+        self.rowcount = 0
+        self.lastrowid = None
+
+    def execute(self, sql, params=None):
+        sql = " ".join(sql.split())
+        self.db.executed.append((sql, params))
+        result = self.db.respond(sql, params)
+        if isinstance(result, Exception):
+            raise result
+        if isinstance(result, int):
+            result = Write(result)
+        if isinstance(result, Write):
+            self._rows, self.rowcount, self.lastrowid = [], result.rowcount, result.lastrowid
+        else:
+            self._rows = list(result or [])
+            self.rowcount = len(self._rows)
+        return self.rowcount
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self):
+        return FakeCursor(self.db)
+
+    def begin(self):
+        self.db.log.append("begin")
+
+    def commit(self):
+        self.db.log.append("commit")
+
+    def rollback(self):
+        self.db.log.append("rollback")
+
+    def close(self):
+        self.db.log.append("close")
+
+
+class FakeDB:
+    """
+    Zamiast MySQL: każde zapytanie trafia do pierwszej reguły, której
+    fragment SQL zawiera, i dostaje jej wynik - listę wierszy, liczbę
+    zmienionych wierszy lub Write, wyjątek do rzucenia albo funkcję
+    (sql, params) zwracającą jedno z nich. Zapytania bez reguły zmieniają 0 wierszy.
+    """
+
+    def __init__(self, rules=None):
+        self.rules = list(rules or [])
+        self.executed = []
+        self.log = []
+
+    def on(self, fragment, result):
+        self.rules.insert(0, (fragment, result))
+
+    def respond(self, sql, params):
+        for fragment, result in self.rules:
+            if fragment in sql:
+                return result(sql, params) if callable(result) else result
+        return 0
+
+    def connect(self):
+        self.log.append("connect")
+        return FakeConnection(self)
+
+    def queries(self, fragment):
+        return [(sql, params) for sql, params in self.executed if fragment in sql]
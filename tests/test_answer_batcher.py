@@ -0,0 +1,54 @@
+# tests/test_answer_batcher.py
+import pytest
+
+from xQuiz import answer_batcher as batcher_module
+from xQuiz.answer_batcher import AnswerBatcher
+
+QUESTION = {"id": 5, "topic_id": 3, "question": "Kto?"}
+
+
+class AnswerQueue:
+    def __init__(self, answers):
+        self.pending = list(answers)
+        self.processed = []
+
+    def get_pending_answers(self, question_id):
+        return list(self.pending)
+
+    def mark_answers_as_processed(self, ids):
+        self.processed.extend(ids)
+        self.pending = [answer for answer in self.pending if answer["id"] not in ids]
+
+
+@pytest.fixture
+def served(monkeypatch):
+    served = []
+    monkeypatch.setattr(batcher_module, "next_hint", lambda question_id, question, posts_history=None: (2, "druga"))
+    monkeypatch.setattr(batcher_module, "mark_hint_served", lambda question_id, hint_order: served.append(hint_order))
+    return served
+
+
+def queue():
+    return AnswerQueue([{"id": 1, "user_name": "edge", "answer": "Kane"}, {"id": 2, "user_name": "kane", "answer": "Sting"}])
+
+
+def test_batch_is_answered_with_one_post_and_one_hint(monkeypatch, served):
+    posts = []
+    monkeypatch.setattr(batcher_module, "post_forum_reply", lambda topic_id, html: posts.append(html))
+    batcher = AnswerBatcher(queue())
+    assert batcher.process(3, QUESTION) == 2
+    assert len(posts) == 1 and "Kane" in posts[0] and "druga" in posts[0]
+    assert served == [2]
+    assert batcher.answer_queue.processed == [1, 2]
+
+
+def test_failed_post_keeps_the_hint_and_the_answers_for_the_retry(monkeypatch, served):
+    def fail(topic_id, html):
+        raise RuntimeError("forum down")
+
+    monkeypatch.setattr(batcher_module, "post_forum_reply", fail)
+    batcher = AnswerBatcher(queue())
+    with pytest.raises(RuntimeError):
+        batcher.process(3, QUESTION)
+    assert served == []
+    assert batcher.answer_queue.processed == []
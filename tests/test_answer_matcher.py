@@ -0,0 +1,87 @@
+# tests/test_answer_matcher.py
+import pytest
+
+from xQuiz.answer_matcher import AnswerIndex, bounded_distance, fold, tokenize
+
+
+def osa_distance(a, b):
+    d = [[0] * (len(b) + 1) for _ in range(len(a) + 1)]
+    for i in range(len(a) + 1):
+        d[i][0] = i
+    for j in range(len(b) + 1):
+        d[0][j] = j
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            d[i][j] = min(d[i - 1][j] + 1, d[i][j - 1] + 1, d[i - 1][j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                d[i][j] = min(d[i][j], d[i - 2][j - 2] + 1)
+    return d[-1][-1]
+
+
+@pytest.mark.parametrize("a, b", [
+    ("austin", "austn"), ("michaels", "michales"), ("", "abc"), ("abc", "abc"), ("kane", "cena"),
+])
+@pytest.mark.parametrize("limit", [0, 1, 2, 3])
+def test_bounded_distance_matches_full_distance(a, b, limit):
+    expected = osa_distance(a, b)
+    assert bounded_distance(a, b, limit) == (expected if expected <= limit else limit + 1)
+
+
+def test_fold_strips_polish_diacritics_and_punctuation():
+    assert fold("Łukasz  Świątek!") == "lukasz swiatek"
+    assert fold("Żółć, gęś") == "zolc ges"
+
+
+@pytest.mark.parametrize("guess", ["WrestleMania 12", "wrestlemania 31", "WrestleMania 3"])
+def test_wrong_number_is_rejected(guess):
+    assert not AnswerIndex(["WrestleMania 13"]).matches(guess)
+
+
+@pytest.mark.parametrize("guess", ["Survivor Series 1998", "Survivor Series 1979", "1997"])
+def test_wrong_or_partial_year_is_rejected(guess):
+    assert not AnswerIndex(["Survivor Series 1997"]).matches(guess)
+
+
+@pytest.mark.parametrize("guess", ["WrestleMania 13", "wrestlemania 13!", "Wrestlemnia 13", "13 WrestleMania"])
+def test_right_number_with_typos_in_words_is_accepted(guess):
+    assert AnswerIndex(["WrestleMania 13"]).matches(guess)
+
+
+def test_year_answer_accepts_only_that_year():
+    index = AnswerIndex(["1997"])
+    assert index.matches("1997")
+    assert index.matches("w 1997")
+    assert not index.matches("1998")
+
+
+@pytest.mark.parametrize("guess", ["Hart", "hart", "Hrat", "Bret Hart", "the hitman"])
+def test_surname_and_variants_are_accepted(guess):
+    assert AnswerIndex(["Bret Hart", "The Hitman"]).matches(guess)
+
+
+@pytest.mark.parametrize("guess", ["Bret", "Owen Hart", "Hart Foundation"])
+def test_first_name_or_other_person_is_rejected(guess):
+    assert not AnswerIndex(["Bret Hart"]).matches(guess)
+
+
+def test_one_letter_stopwords_are_dropped_from_guesses():
+    index = AnswerIndex(["Edge & Christian"])
+    assert tokenize("Edge i Christian") == ("edge", "christian")
+    assert index.matches("Edge i Christian")
+    assert index.matches("to chyba Edge i Christian")
+    assert AnswerIndex(["Wrestling Observer"]).matches("w Wrestling Observer")
+    assert AnswerIndex(["Steve Austin"]).matches("z Steve Austin")
+
+
+@pytest.mark.parametrize("letter", ["i", "w", "z", "a"])
+def test_answer_made_only_of_stopwords_can_still_be_matched(letter):
+    index = AnswerIndex([letter.upper()])
+    assert index.matches(letter)
+    assert not index.matches("b")
+
+
+def test_extra_words_lower_the_score():
+    index = AnswerIndex(["Steve Austin", "Stone Cold"])
+    assert index.matches("austin steve")
+    assert not index.matches("Steve Austin albo The Rock")
@@ -0,0 +1,92 @@
+# tests/test_context_builder.py
+from datetime import datetime
+
+import pytest
+
+import context_builder
+from conftest import FakeDB
+
+SUMMARY = "SELECT summary, summarized_through_id FROM conversation_summaries"
+UNSUMMARIZED = "WHERE conversation_id = %s AND id > %s AND id < %s"
+
+
+def messages(count, content="x"):
+    return [
+        {"id": i, "author": "user", "timestamp": datetime(2026, 1, 1, 12, 0, i % 60), "content": f"{content}{i}", "username": "edge"}
+        for i in range(1, count + 1)
+    ]
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeDB([(SUMMARY, [])])
+    monkeypatch.setattr(context_builder, "get_db_connection", db.connect)
+    context_builder._pending_summaries.clear()
+    yield db
+    context_builder._pending_summaries.clear()
+
+
+def test_short_history_is_kept_whole(db):
+    context = context_builder.build_context(1, messages(3))
+    assert context.splitlines() == ["user: x1", "user: x2", "user: x3"]
+    assert context_builder.pending_summaries() == 0
+
+
+def test_window_is_limited_by_turns_and_tokens(db):
+    assert context_builder.build_context(1, messages(8), max_turns=3).splitlines() == ["user: x6", "user: x7", "user: x8"]
+    long = messages(4, content="y" * 400)
+    assert len(context_builder.build_context(1, long, token_budget=250).splitlines()) == 2
+
+
+def test_newest_message_is_kept_even_over_budget(db):
+    history = messages(2, content="z" * 1000)
+    assert context_builder.build_context(1, history, token_budget=10) == history[-1]["author"] + ": " + history[-1]["content"]
+
+
+def test_summary_is_prepended_and_counts_against_the_budget(db):
+    db.on(SUMMARY, [{"summary": "s" * 400, "summarized_through_id": 0}])
+    lines = context_builder.build_context(1, messages(4, content="y" * 400), token_budget=250).splitlines()
+    assert lines[0].startswith("Podsumowanie wcześniejszej rozmowy: ")
+    assert lines[1:] == ["user: " + "y" * 400 + "4"]
+
+
+def test_overflow_is_queued_for_background_summary(db):
+    batch = context_builder.CONTEXT_SUMMARY_BATCH
+    context_builder.build_context(1, messages(batch + 2), max_turns=2)
+    assert context_builder._pending_summaries == {"1": batch + 1}
+
+
+def test_already_summarised_overflow_is_not_queued(db):
+    batch = context_builder.CONTEXT_SUMMARY_BATCH
+    db.on(SUMMARY, [{"summary": "s", "summarized_through_id": batch}])
+    context_builder.build_context(1, messages(batch + 2), max_turns=2)
+    assert context_builder.pending_summaries() == 0
+
+
+def test_pending_conversation_is_folded_into_its_summary(db, monkeypatch):
+    calls = []
+    monkeypatch.setattr(context_builder, "summarize_conversation", lambda previous, transcript: calls.append((previous, transcript)) or "nowe")
+    db.on(SUMMARY, [{"summary": "stare", "summarized_through_id": 2}])
+    db.on(UNSUMMARIZED, messages(5)[2:4])
+    context_builder._pending_summaries["1"] = 5
+    assert context_builder.summarize_pending_conversations() == 1
+    assert db.queries(UNSUMMARIZED)[0][1] == ("1", 2, 5)
+    assert calls == [("stare", "user: x3\nuser: x4")]
+    (_, params), = db.queries("INSERT INTO conversation_summaries")
+    assert params[1] == "nowe" and params[3] == 4
+    assert context_builder.pending_summaries() == 0
+
+
+def test_failed_summary_stays_queued(db, monkeypatch):
+    monkeypatch.setattr(context_builder, "summarize_conversation", lambda previous, transcript: "")
+    db.on(UNSUMMARIZED, messages(2))
+    context_builder._pending_summaries["1"] = 3
+    assert context_builder.summarize_pending_conversations() == 0
+    assert context_builder.pending_summaries() == 1
+
+    def fail(previous, transcript):
+        raise RuntimeError("xAI down")
+
+    monkeypatch.setattr(context_builder, "summarize_conversation", fail)
+    assert context_builder.summarize_pending_conversations() == 0
+    assert context_builder.pending_summaries() == 1
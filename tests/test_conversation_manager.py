@@ -0,0 +1,117 @@
+# tests/test_conversation_manager.py
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import conversation_manager
+from conftest import FakeDB, Write
+
+ACTIVE = "SELECT conversation_id, last_activity FROM conversations"
+HISTORY = "SELECT id, author, timestamp, content, username FROM messages"
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeDB([
+        ("UPDATE conversation_id_seq", Write(1, lastrowid=42)),
+        ("INSERT INTO conversations", 1),
+        (ACTIVE, []),
+        (HISTORY, [{"id": 2, "content": "drugie"}, {"id": 1, "content": "pierwsze"}]),
+    ])
+    monkeypatch.setattr(conversation_manager, "get_db_connection", db.connect)
+    monkeypatch.setattr(conversation_manager, "active_conversations", conversation_manager.ActiveConversationCache())
+    return db
+
+
+def test_first_mention_creates_conversation_and_appends_in_one_transaction(db):
+    conversation_id, history = conversation_manager.append_user_message(7, "edge", "pytanie")
+    assert conversation_id == "42"
+    assert [row["id"] for row in history] == [1, 2]
+    assert db.log == ["connect", "begin", "commit", "close"]
+    (_, params), = db.queries("INSERT INTO messages")
+    assert params[0] == "42" and params[3] == "pytanie"
+    assert conversation_manager.active_conversations.get(7, "edge", datetime.now(timezone.utc)) == "42"
+
+
+def test_recent_active_conversation_is_reused(db):
+    db.on(ACTIVE, [{"conversation_id": 9, "last_activity": datetime.now(timezone.utc)}])
+    conversation_id, _ = conversation_manager.append_user_message(7, "edge", "pytanie")
+    assert conversation_id == "9"
+    assert not db.queries("INSERT INTO conversations")
+
+
+def test_expired_conversation_is_closed_and_replaced(db):
+    idle = datetime.now(timezone.utc) - conversation_manager.INACTIVITY_TIMEOUT - timedelta(minutes=1)
+    db.on(ACTIVE, [{"conversation_id": 9, "last_activity": idle}])
+    conversation_id, _ = conversation_manager.append_user_message(7, "edge", "pytanie")
+    assert conversation_id == "42"
+    (_, params), = db.queries("SET is_active=False")
+    assert params == (9,)
+
+
+def test_losing_the_insert_race_joins_the_winner(db):
+    selects = iter([[], [{"conversation_id": 41, "last_activity": datetime.now(timezone.utc)}]])
+    db.on(ACTIVE, lambda sql, params: next(selects))
+    db.on("INSERT INTO conversations", 0)
+    conversation_id, _ = conversation_manager.append_user_message(7, "edge", "pytanie")
+    assert conversation_id == "41"
+
+
+def test_before_commit_runs_inside_the_transaction(db):
+    seen = []
+    conversation_manager.append_user_message(
+        7, "edge", "pytanie", before_commit=lambda cursor, cid: seen.append((cid, list(db.log)))
+    )
+    assert seen == [("42", ["connect", "begin"])]
+
+
+def test_failure_rolls_back_and_leaves_cache_alone(db):
+    db.on("INSERT INTO messages", RuntimeError("deadlock"))
+    with pytest.raises(RuntimeError):
+        conversation_manager.append_user_message(7, "edge", "pytanie")
+    assert db.log == ["connect", "begin", "rollback", "close"]
+    assert conversation_manager.active_conversations.get(7, "edge", datetime.now(timezone.utc)) is None
+
+
+def test_add_message_bumps_activity_and_reraises(db):
+    conversation_manager.add_message_to_conversation(42, "ai", "odpowiedź", "bot")
+    assert db.queries("INSERT INTO messages") and db.queries("SET last_activity=%s")
+    db.on("INSERT INTO messages", RuntimeError("deadlock"))
+    with pytest.raises(RuntimeError):
+        conversation_manager.add_message_to_conversation(42, "ai", "odpowiedź", "bot")
+    assert db.log[-2:] == ["rollback", "close"]
+
+
+def cache_conversation(conversation_id):
+    now = datetime.now(timezone.utc)
+    conversation_manager.active_conversations.put(7, "edge", conversation_id, now)
+
+
+def test_cached_conversation_is_locked_and_used_while_active(db):
+    cache_conversation(9)
+    db.on("SELECT is_active FROM conversations", [{"is_active": 1}])
+    conversation_id, _ = conversation_manager.append_user_message(7, "edge", "pytanie")
+    assert conversation_id == "9"
+    assert db.queries("FOR UPDATE")[0][1] == ("9",)
+    assert not db.queries(ACTIVE)
+
+
+def test_cached_conversation_closed_elsewhere_is_resolved_again(db):
+    cache_conversation(9)
+    db.on("SELECT is_active FROM conversations", [{"is_active": 0}])
+    conversation_id, _ = conversation_manager.append_user_message(7, "edge", "pytanie")
+    assert conversation_id == "42"
+    assert conversation_manager.active_conversations.last_activity("9") is None
+
+
+def test_sweeper_expires_idle_conversations_in_one_update(db):
+    cache = conversation_manager.active_conversations
+    now = datetime.now(timezone.utc)
+    cache.put(7, "edge", 9, now - conversation_manager.INACTIVITY_TIMEOUT - timedelta(minutes=1))
+    cache.put(7, "kane", 10, now)
+    db.on("WHERE is_active = TRUE AND last_activity < %s", 3)
+    assert conversation_manager.expire_inactive_conversations() == 3
+    (_, params), = db.queries("SET is_active=False")
+    assert now - conversation_manager.INACTIVITY_TIMEOUT - timedelta(seconds=5) < params[0] <= now - conversation_manager.INACTIVITY_TIMEOUT + timedelta(seconds=5)
+    assert cache.last_activity("9") is None
+    assert cache.last_activity("10") is not None
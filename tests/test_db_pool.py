@@ -0,0 +1,138 @@
+# tests/test_db_pool.py
+import threading
+
+import pytest
+
+import db_pool
+from db_pool import ConnectionPool, PoolTimeoutError
+
+
+class RawConnection:
+    def __init__(self):
+        self.calls = []
+        self.closed = False
+        self.fail_ping = False
+        self.fail_rollback = False
+
+    def begin(self):
+        self.calls.append("begin")
+
+    def commit(self):
+        self.calls.append("commit")
+
+    def rollback(self):
+        self.calls.append("rollback")
+        if self.fail_rollback:
+            raise RuntimeError("connection lost")
+
+    def ping(self, reconnect=False):
+        self.calls.append("ping")
+        if self.fail_ping:
+            raise RuntimeError("gone away")
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def opened(monkeypatch):
+    opened = []
+
+    def connect(**kwargs):
+        assert kwargs["autocommit"] is True
+        opened.append(RawConnection())
+        return opened[-1]
+
+    monkeypatch.setattr(db_pool.pymysql, "connect", connect)
+    return opened
+
+
+def test_released_connection_is_reused(opened):
+    pool = ConnectionPool(size=2, timeout=1)
+    pool.connection().close()
+    pool.connection().close()
+    assert len(opened) == 1
+    assert pool.stats()["checkouts"] == 2 and pool.stats()["idle"] == 1
+
+
+def test_close_is_idempotent(opened):
+    pool = ConnectionPool(size=2, timeout=1)
+    connection = pool.connection()
+    connection.close()
+    connection.close()
+    assert pool.stats()["idle"] == 1
+
+
+def test_checkout_waits_for_a_free_connection_then_times_out(opened):
+    pool = ConnectionPool(size=1, timeout=0.05)
+    held = pool.connection()
+    with pytest.raises(PoolTimeoutError):
+        pool.connection()
+    threading.Timer(0.01, held.close).start()
+    pool.timeout = 1
+    pool.connection().close()
+    assert len(opened) == 1
+    stats = pool.stats()
+    assert stats["timeouts"] == 1 and stats["waits"] == 1
+
+
+def test_commit_and_rollback_only_inside_a_transaction(opened):
+    pool = ConnectionPool(size=1, timeout=1)
+    connection = pool.connection()
+    connection.commit()
+    connection.rollback()
+    assert opened[0].calls == []
+    connection.begin()
+    connection.commit()
+    assert opened[0].calls == ["begin", "commit"]
+    connection.close()
+
+
+def test_unfinished_transaction_is_rolled_back_on_release(opened):
+    pool = ConnectionPool(size=1, timeout=1)
+    connection = pool.connection()
+    connection.begin()
+    connection.close()
+    assert opened[0].calls == ["begin", "rollback"]
+    assert pool.stats()["idle"] == 1
+
+
+def test_connection_is_discarded_when_rollback_fails(opened):
+    pool = ConnectionPool(size=1, timeout=1)
+    connection = pool.connection()
+    opened[0].fail_rollback = True
+    connection.begin()
+    connection.close()
+    assert opened[0].closed
+    assert pool.stats()["open"] == 0
+    pool.connection().close()
+    assert len(opened) == 2
+
+
+def test_idle_connection_is_pinged_and_replaced_when_dead(opened):
+    pool = ConnectionPool(size=1, timeout=1, ping_after=0)
+    pool.connection().close()
+    opened[0].fail_ping = True
+    pool.connection().close()
+    assert opened[0].closed and len(opened) == 2
+    assert pool.stats()["failed_health_checks"] == 1
+
+
+def test_old_connections_are_recycled(opened):
+    pool = ConnectionPool(size=1, timeout=1, recycle=0)
+    pool.connection().close()
+    pool.connection().close()
+    assert opened[0].closed and len(opened) == 2
+    assert pool.stats()["recycled"] == 1
+
+
+def test_failed_connect_frees_its_slot(monkeypatch):
+    def connect(**kwargs):
+        raise RuntimeError("refused")
+
+    monkeypatch.setattr(db_pool.pymysql, "connect", connect)
+    pool = ConnectionPool(size=1, timeout=0.05)
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            pool.connection()
+    assert pool.stats()["open"] == 0
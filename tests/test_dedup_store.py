@@ -0,0 +1,56 @@
+# tests/test_dedup_store.py
+import pytest
+
+import dedup_store
+from conftest import FakeDB
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeDB()
+    monkeypatch.setattr(dedup_store, "get_db_connection", db.connect)
+    dedup_store._cache.clear()
+    yield db
+    dedup_store._cache.clear()
+
+
+def test_lookup_is_a_primary_key_query(db):
+    assert not dedup_store.is_answered(7, "<p>@bot hej</p>")
+    (sql, params), = db.queries("answered_mentions")
+    assert "WHERE topic_id = %s AND content_hash = %s" in sql
+    assert params == ("7", dedup_store.content_hash("<p>@bot hej</p>"))
+
+
+def test_answered_mention_is_cached(db):
+    db.on("SELECT 1 FROM answered_mentions", [{"1": 1}])
+    assert dedup_store.is_answered(7, "pytanie")
+    assert dedup_store.is_answered("7", "pytanie")
+    assert len(db.queries("SELECT 1 FROM answered_mentions")) == 1
+
+
+def test_misses_are_not_cached(db):
+    assert not dedup_store.is_answered(7, "pytanie")
+    assert not dedup_store.is_answered(7, "pytanie")
+    assert len(db.queries("SELECT 1 FROM answered_mentions")) == 2
+
+
+def test_mark_answered_stores_and_clears_pending_reply(db):
+    dedup_store.mark_answered(7, "pytanie")
+    assert db.queries("INSERT IGNORE INTO answered_mentions")
+    assert db.queries("DELETE FROM pending_replies")
+    db.executed.clear()
+    assert dedup_store.is_answered(7, "pytanie")
+    assert db.executed == []
+
+
+def test_mark_answered_remembers_locally_when_the_insert_fails(db):
+    db.on("INSERT IGNORE INTO answered_mentions", RuntimeError("db down"))
+    dedup_store.mark_answered(7, "pytanie")
+    assert dedup_store.is_answered(7, "pytanie")
+
+
+def test_cache_is_bounded(db, monkeypatch):
+    monkeypatch.setattr(dedup_store, "DEDUP_CACHE_SIZE", 2)
+    for i in range(5):
+        dedup_store.mark_answered(i, "pytanie")
+    assert len(dedup_store._cache) == 2
@@ -0,0 +1,36 @@
+# tests/test_html_templates.py
+import pytest
+
+from html_templates import Template, escape, format_reply
+
+
+def test_render_fills_fields():
+    template = Template('<p class="{cls}">{body}</p>')
+    assert template.fields == ("cls", "body")
+    assert template.render(cls="x", body="tekst") == '<p class="x">tekst</p>'
+
+
+def test_doubled_braces_are_literal():
+    template = Template("<style>p {{ color: red; }}</style>{body}")
+    assert template.render(body="ok") == "<style>p { color: red; }</style>ok"
+
+
+def test_values_are_not_evaluated():
+    template = Template("{body}")
+    assert template.render(body="{__import__('os')}") == "{__import__('os')}"
+
+
+@pytest.mark.parametrize("source", ["{a.b}", "{a[0]}", "{a!r}", "{a:>10}", "{0}"])
+def test_unsupported_fields_are_rejected(source):
+    with pytest.raises(ValueError):
+        Template(source)
+
+
+def test_missing_field_raises():
+    with pytest.raises(KeyError):
+        Template("{a}{b}").render(a=1)
+
+
+def test_format_reply_escaping_is_left_to_caller():
+    assert format_reply("a\nb") == '<div><p style="text-align: justify;">a<br>b</p></div>'
+    assert escape("<b>&") == "&lt;b&gt;&amp;"
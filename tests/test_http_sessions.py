@@ -0,0 +1,69 @@
+# tests/test_http_sessions.py
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import http_sessions
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path == "/slow":
+            time.sleep(0.5)
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def sessions():
+    http_sessions._sessions.clear()
+    yield
+    for session in http_sessions._sessions.values():
+        session.close()
+    http_sessions._sessions.clear()
+
+
+def test_one_session_per_host():
+    first = http_sessions.get_session("https://api.x.ai/v1/chat/completions", 30)
+    assert http_sessions.get_session("https://api.x.ai/v1/other", 30) is first
+    assert http_sessions.get_session("https://forum.wrestling.pl/api", 30) is not first
+
+
+def test_default_timeout_applies_unless_overridden(server):
+    session = http_sessions.get_session(server, 0.1)
+    assert session.timeout == (http_sessions.HTTP_CONNECT_TIMEOUT, 0.1)
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        session.get(f"{server}/slow")
+    assert session.get(f"{server}/slow", timeout=5).text == "ok"
+
+
+def test_connections_are_kept_alive_and_reused(server):
+    session = http_sessions.get_session(server, 5)
+    for _ in range(3):
+        assert session.get(f"{server}/").text == "ok"
+    host = server.split("://", 1)[1]
+    stats = http_sessions.stats()[host]
+    assert stats["requests"] == 3
+    assert stats["connections_opened"] == 1
+    assert stats["reused_requests"] == 2
@@ -0,0 +1,146 @@
+# tests/test_job_queue.py
+import time
+
+import pytest
+
+from job_queue import JobQueue, QueueFullError
+from rate_limiter import CircuitOpenError, RateLimitTimeout
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"), max_size=3, lease_seconds=60, base_backoff=0.01, max_backoff=0.01)
+    yield queue
+    queue.close()
+
+
+def test_jobs_are_leased_in_order_and_acked(queue):
+    queue.put("a", 1)
+    queue.put("b", 2)
+    first = queue.lease()
+    second = queue.lease()
+    assert (first.args, second.args) == (["a", 1], ["b", 2])
+    assert queue.lease() is None
+    queue.ack(first)
+    queue.ack(second)
+    assert queue.qsize() == 0
+
+
+def test_put_fails_when_full(queue):
+    for i in range(3):
+        queue.put(i)
+    with pytest.raises(QueueFullError):
+        queue.put(3)
+
+
+def test_failed_job_is_retried_then_buried(queue):
+    queue.max_attempts = 2
+    queue.put("x")
+    job = queue.lease()
+    queue.fail(job, RuntimeError("first"))
+    time.sleep(0.02)
+    job = queue.lease()
+    assert job.attempts == 1
+    queue.fail(job, RuntimeError("second"))
+    time.sleep(0.02)
+    assert queue.lease() is None
+    assert queue.stats()["dead"] == 1
+    assert queue.qsize() == 0
+
+
+def test_upstream_rejections_do_not_use_attempts(queue):
+    queue.max_attempts = 2
+    queue.put("x")
+    for error in (CircuitOpenError("open", retry_after=0.01), RateLimitTimeout("slow", retry_after=0.01)) * 2:
+        job = queue.lease()
+        queue.fail(job, error)
+        assert queue.lease() is None
+        time.sleep(0.03)
+    job = queue.lease()
+    assert job.attempts == 0
+    assert queue.stats()["dead"] == 0
+
+
+def test_rejected_job_waits_for_retry_after(queue):
+    queue.put("x")
+    queue.fail(queue.lease(), CircuitOpenError("open", retry_after=0.2))
+    time.sleep(0.05)
+    assert queue.lease() is None
+    time.sleep(0.2)
+    assert queue.lease() is not None
+
+
+def test_lease_skips_full_lanes_and_keeps_their_order(queue):
+    queue.put("busy-1", lane="busy")
+    queue.put("other", lane="other")
+    queue.put("busy-2", lane="busy")
+    job = queue.lease(skip_lanes=["busy"])
+    assert job.args == ["other"] and job.lane == "other"
+    assert queue.lease(skip_lanes=["busy"]) is None
+    assert queue.lease().args == ["busy-1"]
+    assert queue.lease().args == ["busy-2"]
+
+
+def test_touch_renews_lease(queue):
+    queue.put("x")
+    job = queue.lease()
+    leased_until = job.leased_until
+    time.sleep(0.01)
+    assert queue.touch(job)
+    assert job.leased_until > leased_until
+
+
+def test_touch_fails_after_lease_was_lost(queue):
+    queue.lease_seconds = 0
+    queue.put("x")
+    stale = queue.lease()
+    time.sleep(0.01)
+    queue.lease_seconds = 60
+    fresh = queue.lease()
+    assert fresh.id == stale.id
+    assert not queue.touch(stale)
+    assert queue.touch(fresh)
+
+
+def test_recover_releases_leases_of_a_dead_process(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    crashed = JobQueue(path)
+    crashed.put("x")
+    crashed.lease()
+    crashed.close()
+    queue = JobQueue(path)
+    try:
+        assert queue.recover() == 1
+        assert queue.lease().args == ["x"]
+    finally:
+        queue.close()
+
+
+def test_second_consumer_cannot_release_live_leases(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    first = JobQueue(path)
+    second = JobQueue(path)
+    try:
+        first.recover()
+        first.put("x")
+        job = first.lease()
+        with pytest.raises(RuntimeError):
+            second.recover()
+        assert second.lease() is None
+        first.ack(job)
+    finally:
+        first.close()
+        second.close()
+
+
+def test_consumer_lock_is_released_on_close(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    first = JobQueue(path)
+    first.recover()
+    first.put("x")
+    first.close()
+    second = JobQueue(path)
+    try:
+        assert second.recover() == 1
+    finally:
+        second.close()
@@ -0,0 +1,68 @@
+# tests/test_leaderboard.py
+import random
+
+from xQuiz.leaderboard import Leaderboard
+
+
+def brute_force_top(scores, n):
+    ordered = sorted(scores.items(), key=lambda item: (-max(item[1], 0), item[0]))
+    rows = []
+    for name, score in ordered[:n]:
+        rank = 1 + sum(1 for other in scores.values() if max(other, 0) > max(score, 0))
+        rows.append({"user_name": name, "score": score, "rank": rank})
+    return rows
+
+
+def test_ties_share_rank_and_are_alphabetical():
+    board = Leaderboard()
+    board.load([{"user_name": "kane", "score": 5}, {"user_name": "edge", "score": 5}, {"user_name": "sting", "score": 2}])
+    assert board.top(3) == [
+        {"user_name": "edge", "score": 5, "rank": 1},
+        {"user_name": "kane", "score": 5, "rank": 1},
+        {"user_name": "sting", "score": 2, "rank": 3},
+    ]
+    assert board.entry("sting")["rank"] == 3
+    assert board.entry("nobody") is None
+
+
+def test_scores_above_capacity_resize_the_tree():
+    board = Leaderboard(capacity=4)
+    board.load([])
+    board.add("cena", 100)
+    board.add("orton", 3)
+    assert board.top(2)[0] == {"user_name": "cena", "score": 100, "rank": 1}
+    assert board.entry("orton")["rank"] == 2
+
+
+def test_version_changes_with_every_update():
+    board = Leaderboard()
+    board.load([])
+    version = board.version
+    board.add("punk", 1)
+    assert board.version > version
+    version = board.version
+    board.add("punk", 6)
+    assert board.version > version and board.entry("punk")["score"] == 7
+
+
+def test_matches_brute_force_ranking():
+    rng = random.Random(7)
+    board = Leaderboard(capacity=8)
+    scores = {f"user{i}": rng.randint(0, 20) for i in range(50)}
+    board.load([{"user_name": name, "score": score} for name, score in scores.items()])
+    for _ in range(2000):
+        name = f"user{rng.randint(0, 70)}"
+        if rng.random() < 0.8:
+            points = rng.randint(-3, 15)
+            scores[name] = scores.get(name, 0) + points
+            board.add(name, points)
+        else:
+            # Duży skok wyniku wymusza powiększenie drzewa
+            target = rng.randint(0, 200)
+            board.add(name, target - scores.get(name, 0))
+            scores[name] = target
+        n = rng.randint(1, 15)
+        assert board.top(n) == brute_force_top(scores, n)
+    assert len(board) == len(scores)
+    ranks = {row["user_name"]: row["rank"] for row in brute_force_top(scores, len(scores))}
+    assert all(board.entry(name)["rank"] == rank for name, rank in ranks.items())
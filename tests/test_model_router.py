@@ -0,0 +1,78 @@
+# tests/test_model_router.py
+import time
+
+import pytest
+
+from model_router import EVENT_PATTERN, FAST, NO_SEARCH, SEARCH, ModelRouter
+
+
+@pytest.mark.parametrize("question", [
+    "Kto wygrał wczoraj RAW?",
+    "Jaki był wynik walki o pas?",
+    "Kto jest mistrzem WWE?",
+    "Co się działo na ostatniej gali?",
+    "Karta walk na WrestleManię",
+    "who won the title last night",
+    "Czy Punk odzyska pasy?",
+])
+def test_event_questions_match(question):
+    assert EVENT_PATTERN.search(question)
+
+
+@pytest.mark.parametrize("question", [
+    "Lubisz pastę z pomidorami?",
+    "Opowiedz o galaktyce",
+    "Ten show był nudny, prawda?",
+    "Czy to win-win?",
+    "Pasażer na gapę",
+    "Co sądzisz o pastelach?",
+    "Zagrajmy w karty",
+])
+def test_ordinary_questions_do_not_match(question):
+    assert not EVENT_PATTERN.search(question)
+
+
+def router(probe_interval=60):
+    return ModelRouter(p95_threshold=1.0, min_samples=3, window=600, long_query_chars=50,
+                       deep_conversation=4, probe_interval=probe_interval)
+
+
+def test_classify_by_features():
+    r = router()
+    assert r.classify("Kto wygrał?") == SEARCH
+    assert r.classify("Opowiedz coś " * 10) == NO_SEARCH
+    assert r.classify("Cześć", depth=5) == NO_SEARCH
+    assert r.classify("Cześć") == FAST
+
+
+def test_slow_route_is_demoted():
+    r = router()
+    for _ in range(3):
+        r.record(SEARCH, 5.0)
+    assert r.choose("Kto wygrał?") == NO_SEARCH
+    assert r.stats()["demoted"] == 1
+
+
+def test_probe_restores_route_once_it_is_fast_again():
+    r = router(probe_interval=0.05)
+    for _ in range(3):
+        r.record(SEARCH, 5.0)
+    assert r.choose("Kto wygrał?") == NO_SEARCH
+    time.sleep(0.06)
+    assert r.choose("Kto wygrał?") == SEARCH  # probe
+    assert r.choose("Kto wygrał?") == NO_SEARCH  # one probe at a time
+    r.record(SEARCH, 0.2)
+    assert r.choose("Kto wygrał?") == SEARCH
+    assert r.stats()["recovered"] == 1
+
+
+def test_slow_probe_keeps_route_demoted():
+    r = router(probe_interval=0.05)
+    for _ in range(3):
+        r.record(SEARCH, 5.0)
+    r.choose("Kto wygrał?")
+    time.sleep(0.06)
+    assert r.choose("Kto wygrał?") == SEARCH
+    r.record(SEARCH, 5.0)
+    assert r.choose("Kto wygrał?") == NO_SEARCH
+    assert r.stats()["probes"] == 1
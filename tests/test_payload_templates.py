@@ -0,0 +1,34 @@
+# tests/test_payload_templates.py
+import json
+
+from payload_templates import PayloadTemplate
+
+MESSAGES = [{"role": "user", "content": "Kto wygrał \"Royal Rumble\"?\nOdpowiedz krótko."}]
+
+
+def test_render_matches_build():
+    template = PayloadTemplate("grok-3", system_prompt="Jesteś kibicem wrestlingu.", temperature=0.2,
+                               search_parameters={"mode": "on"})
+    body = template.render(MESSAGES, stream=True)
+    assert isinstance(body, bytes)
+    assert json.loads(body) == template.build(MESSAGES, stream=True)
+
+
+def test_system_prompt_bytes_are_identical_across_calls():
+    template = PayloadTemplate("grok-3", system_prompt="Zażółć gęślą jaźń")
+    first = template.render([{"role": "user", "content": "a"}])
+    second = template.render([{"role": "user", "content": "bb"}], stream=False)
+    system = json.dumps({"role": "system", "content": "Zażółć gęślą jaźń"}, ensure_ascii=False, separators=(",", ":"))
+    prefix = ('{"messages":[' + system).encode("utf-8")
+    assert first.startswith(prefix) and second.startswith(prefix)
+
+
+def test_without_system_prompt_or_messages():
+    template = PayloadTemplate("grok-2", stream=False)
+    assert json.loads(template.render(MESSAGES)) == {"messages": MESSAGES, "model": "grok-2", "stream": False}
+    assert json.loads(template.render([])) == {"messages": [], "model": "grok-2", "stream": False}
+
+
+def test_system_prompt_without_messages():
+    template = PayloadTemplate("grok-2", system_prompt="S")
+    assert json.loads(template.render([])) == template.build([])
@@ -0,0 +1,56 @@
+# tests/test_periodic_task.py
+import time
+
+from periodic_task import PeriodicTask
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+def test_runs_every_interval_until_stopped():
+    results = iter(range(1, 1000))
+    task = PeriodicTask(lambda: next(results), 0.01, "test-task")
+    task.start()
+    try:
+        assert wait_until(lambda: task.stats()["runs"] >= 3)
+    finally:
+        task.stop(timeout=1)
+    runs = task.stats()["runs"]
+    time.sleep(0.05)
+    stats = task.stats()
+    assert stats["runs"] == runs
+    assert stats["total_result"] == sum(range(1, runs + 1))
+    assert stats["last_result"] == runs
+
+
+def test_errors_are_counted_and_do_not_stop_the_task():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("db down")
+        return 2
+
+    task = PeriodicTask(flaky, 0.01, "test-task")
+    assert task.run_once() is None
+    assert task.run_once() == 2
+    stats = task.stats()
+    assert stats["errors"] == 1 and stats["runs"] == 1 and stats["total_result"] == 2
+
+
+def test_start_is_idempotent():
+    task = PeriodicTask(lambda: 0, 10, "test-task")
+    task.start()
+    thread = task._thread
+    task.start()
+    try:
+        assert task._thread is thread
+    finally:
+        task.stop(timeout=1)
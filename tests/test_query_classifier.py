@@ -0,0 +1,42 @@
+# tests/test_query_classifier.py
+from handlers import query_classifier
+
+PHOTO = "<img src='https://forum.wrestling.pl/uploads/monthly/ring.jpg' style='width: 640px;'>"
+SMILEY = ("<img alt=':leo:' data-emoticon='true' "
+          "src='https://forum.wrestling.pl/uploads/emoticons/leo.png' style='width: 40px; height: auto;'>")
+ICON = "<img src='https://example.com/icon.png' width='16' height='16'>"
+
+
+def test_image_question_about_photo_is_image_request():
+    assert query_classifier.classify_locally(f"<p>{PHOTO}</p>", "Kto jest na tym zdjęciu?") is True
+
+
+def test_plain_question_without_images_is_text():
+    assert query_classifier.classify_locally("<p>Kto wygrał WrestleManię 3?</p>", "Kto wygrał WrestleManię 3?") is False
+
+
+def test_smileys_and_icons_are_not_images():
+    content = f"<p>Kto wygrał? {SMILEY} {ICON}</p>"
+    assert query_classifier.classify_locally(content, "Kto wygrał?") is False
+
+
+def test_photo_after_smiley_is_still_seen():
+    assert query_classifier.classify_locally(f"<p>{SMILEY} {PHOTO}</p>", "Co jest na obrazku?") is True
+
+
+def test_linked_image_counts():
+    content = "<p><a href='https://example.com/gala.jpeg'>link</a></p>"
+    assert query_classifier.classify_locally(content, "opisz to") is True
+
+
+def test_disagreeing_features_are_left_to_the_llm():
+    assert query_classifier.classify_locally(f"<p>{PHOTO}</p>", "Kto wygrał?") is None
+    assert query_classifier.classify_locally(f"<p>{SMILEY}</p>", "Co jest na zdjęciu?") is None
+
+
+def test_only_ambiguous_queries_reach_the_llm(monkeypatch):
+    calls = []
+    monkeypatch.setattr(query_classifier, "determine_query_type", lambda question: calls.append(question) or True)
+    assert query_classifier.is_image_query("<p>Kto wygrał?</p>", "Kto wygrał?") is False
+    assert query_classifier.is_image_query(f"<p>{PHOTO}</p>", "Kto wygrał?") is True
+    assert calls == ["Kto wygrał?"]
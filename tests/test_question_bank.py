@@ -0,0 +1,32 @@
+# tests/test_question_bank.py
+import pytest
+
+from conftest import FakeDB
+from xQuiz import question_bank
+
+
+@pytest.fixture
+def categories(monkeypatch):
+    monkeypatch.setattr(question_bank, "QUIZ_BANK_CATEGORIES", ["Wrestling", "WWE", "WWE Attitude Era"])
+
+
+def test_post_naming_a_category_picks_it(categories):
+    assert question_bank.match_category("Poproszę WWE!") == "wwe"
+    assert question_bank.match_category("wwe attitude era") == "wwe attitude era"
+
+
+def test_anything_else_falls_back_to_the_first_category(categories):
+    assert question_bank.match_category("ok") == "wrestling"
+    assert question_bank.match_category("wwes") == "wrestling"
+    assert question_bank.match_category("") == "wrestling"
+
+
+def test_generated_question_is_stored_as_used(monkeypatch):
+    db = FakeDB([("INSERT IGNORE INTO quiz_question_bank", 1)])
+    monkeypatch.setattr(question_bank, "get_db_connection", db.connect)
+    data = {"question": "Kto?", "answer": "Edge", "hints": []}
+    assert question_bank.add_question("wrestling", data, used=True)
+    (_, params), = db.queries("INSERT IGNORE INTO quiz_question_bank")
+    assert params[1] == question_bank.question_hash("kto?") and params[-1] is True
+    db.on("INSERT IGNORE INTO quiz_question_bank", 0)
+    assert not question_bank.add_question("wrestling", data, used=True)
@@ -0,0 +1,81 @@
+# tests/test_question_cache.py
+import time
+
+import pytest
+
+from xQuiz.question_cache import CurrentQuestionCache
+
+QUESTION = {"id": 1, "topic_id": 10, "question": "Kto?", "answer": "Bret Hart", "variants": "Hitman"}
+
+
+class Loader:
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+
+    def __call__(self, topic_id):
+        self.calls += 1
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+def test_question_is_loaded_once_with_matcher():
+    cache = CurrentQuestionCache()
+    load = Loader(QUESTION)
+    first = cache.get_or_load(10, load)
+    assert cache.get_or_load("10", load) is first
+    assert load.calls == 1
+    assert first["matcher"].matches("hitman")
+
+
+def test_topic_without_question_is_remembered():
+    cache = CurrentQuestionCache()
+    load = Loader(None)
+    assert cache.get_or_load(20, load) is None
+    assert cache.get_or_load(20, load) is None
+    assert load.calls == 1
+    assert cache.stats()["missing_entries"] == 1
+
+
+def test_missing_topic_is_reloaded_after_ttl():
+    cache = CurrentQuestionCache(missing_ttl=0.05)
+    assert cache.get_or_load(10, Loader(None)) is None
+    load = Loader(QUESTION)
+    assert cache.get_or_load(10, load) is None
+    time.sleep(0.06)
+    assert cache.get_or_load(10, load)["id"] == 1
+    assert load.calls == 1
+    assert cache.stats()["missing_entries"] == 0
+
+
+def test_invalidate_forgets_missing_topic():
+    cache = CurrentQuestionCache()
+    assert cache.get_or_load(10, Loader(None)) is None
+    cache.invalidate(10)
+    assert cache.get_or_load(10, Loader(QUESTION))["id"] == 1
+
+
+def test_load_error_is_not_cached():
+    cache = CurrentQuestionCache()
+    with pytest.raises(RuntimeError):
+        cache.get_or_load(10, Loader(RuntimeError("db down")))
+    assert cache.get_or_load(10, Loader(QUESTION))["id"] == 1
+
+
+def test_missing_topics_are_bounded():
+    cache = CurrentQuestionCache(max_missing=2)
+    for topic_id in range(5):
+        cache.get_or_load(topic_id, Loader(None))
+    assert cache.stats()["missing_entries"] == 2
+
+
+def test_stale_load_does_not_overwrite_invalidation():
+    cache = CurrentQuestionCache()
+
+    def load(topic_id):
+        cache.invalidate(topic_id)
+        return None
+
+    cache.get_or_load(10, load)
+    assert cache.stats()["missing_entries"] == 0
@@ -0,0 +1,44 @@
+# tests/test_quiz_handler.py
+import pytest
+
+from xQuiz import quiz_handler
+
+QUESTION = {"question": "Kto?", "answer": "Edge", "hints": ["ogólna"]}
+
+
+@pytest.fixture
+def handler(monkeypatch):
+    posts = []
+    monkeypatch.setattr(quiz_handler, "QuizAnswerQueue", lambda: None)
+    monkeypatch.setattr(quiz_handler, "create_new_quiz_game", lambda *args: 5)
+    monkeypatch.setattr(quiz_handler, "next_hint", lambda question_id, question: (1, "ogólna"))
+    monkeypatch.setattr(quiz_handler, "mark_hint_served", lambda question_id, hint_order: None)
+    monkeypatch.setattr(quiz_handler, "post_forum_reply", lambda topic_id, html: posts.append(html))
+    handler = quiz_handler.QuizHandler()
+    handler.posts = posts
+    return handler
+
+
+def test_banked_question_is_used_without_generating(handler, monkeypatch):
+    monkeypatch.setattr(quiz_handler, "take_question", lambda category: dict(QUESTION))
+    monkeypatch.setattr(quiz_handler, "get_random_quiz_question", pytest.fail)
+    assert handler.start_question(3, "wrestling")
+    assert len(handler.posts) == 1
+
+
+def test_generated_repeat_of_a_banked_question_is_regenerated(handler, monkeypatch):
+    generated = iter([dict(QUESTION), dict(QUESTION, question="Kto jeszcze?")])
+    stored = iter([False, True])
+    monkeypatch.setattr(quiz_handler, "take_question", lambda category: None)
+    monkeypatch.setattr(quiz_handler, "get_random_quiz_question", lambda category: next(generated))
+    monkeypatch.setattr(quiz_handler, "add_question", lambda category, data, used=False: used and next(stored))
+    assert handler.start_question(3, "wrestling")
+    assert "Kto jeszcze?" in handler.posts[0]
+
+
+def test_gives_up_when_only_repeats_are_generated(handler, monkeypatch):
+    monkeypatch.setattr(quiz_handler, "take_question", lambda category: None)
+    monkeypatch.setattr(quiz_handler, "get_random_quiz_question", lambda category: dict(QUESTION))
+    monkeypatch.setattr(quiz_handler, "add_question", lambda category, data, used=False: False)
+    assert not handler.start_question(3, "wrestling")
+    assert handler.posts == []
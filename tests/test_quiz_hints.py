@@ -0,0 +1,58 @@
+# tests/test_quiz_hints.py
+import pytest
+
+from conftest import FakeDB, Write
+from xQuiz import quiz_manager
+
+NEXT_HINT = "SELECT q.hints_served + 1 AS hint_order, h.hint_text"
+SERVED_HINTS = "SELECT h.hint_text FROM quiz_hints h"
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeDB([("INSERT INTO quiz_questions", Write(1, lastrowid=5)), ("INSERT INTO quiz_hints", 1)])
+    monkeypatch.setattr(quiz_manager, "get_db_connection", db.connect)
+    return db
+
+
+@pytest.fixture
+def xai_hints(monkeypatch):
+    calls = []
+
+    def get_next_hint(question, posts_history=None, previous_hints=None):
+        calls.append((question, previous_hints))
+        return "podpowiedź z xAI"
+
+    monkeypatch.setattr(quiz_manager, "get_next_hint", get_next_hint)
+    return calls
+
+
+def test_question_and_its_ladder_are_stored_together(db):
+    question_id = quiz_manager.create_new_quiz_game(3, "Kto?", "Edge", ["ogólna", "", "konkretna"], "wrestling")
+    assert question_id == 5
+    assert [params for _, params in db.queries("INSERT INTO quiz_hints")] == [(5, 1, "ogólna"), (5, 3, "konkretna")]
+    assert db.log == ["connect", "begin", "commit", "close"]
+
+
+def test_next_hint_comes_from_the_ladder_without_advancing_it(db, xai_hints):
+    db.on(NEXT_HINT, [{"hint_order": 2, "hint_text": "druga"}])
+    assert quiz_manager.next_hint(5, "Kto?") == (2, "druga")
+    assert xai_hints == []
+    assert not db.queries("UPDATE quiz_questions")
+
+
+def test_exhausted_ladder_asks_xai_and_extends_it(db, xai_hints):
+    db.on(NEXT_HINT, [{"hint_order": 4, "hint_text": None}])
+    db.on(SERVED_HINTS, [{"hint_text": "pierwsza"}, {"hint_text": "druga"}, {"hint_text": "trzecia"}])
+    assert quiz_manager.next_hint(5, "Kto?") == (4, "podpowiedź z xAI")
+    assert xai_hints == [("Kto?", ["pierwsza", "druga", "trzecia"])]
+    (_, params), = db.queries("INSERT INTO quiz_hints")
+    assert params == (5, "podpowiedź z xAI", 4)
+
+
+def test_hint_is_marked_served_idempotently(db):
+    quiz_manager.mark_hint_served(5, 2)
+    (sql, params), = db.queries("UPDATE quiz_questions")
+    assert "GREATEST(hints_served, %s)" in sql and params == (2, 5)
+    quiz_manager.mark_hint_served(5, None)
+    assert len(db.queries("UPDATE quiz_questions")) == 1
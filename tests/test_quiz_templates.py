@@ -0,0 +1,48 @@
+# tests/test_quiz_templates.py
+from xQuiz.leaderboard import Leaderboard
+from xQuiz.quiz_templates import (
+    CORRECT_ANSWER, HEADING, SCORE_GAP, SCORE_TABLE_HEAD, SCORE_TABLE_TAIL, ScoreTableRenderer, score_row,
+)
+
+
+def board(scores):
+    leaderboard = Leaderboard()
+    leaderboard.load([{"user_name": name, "score": score} for name, score in scores.items()])
+    return leaderboard
+
+
+def test_css_braces_survive_rendering():
+    assert "body { font-family: Arial, sans-serif; }" in SCORE_TABLE_HEAD
+    assert "{{" not in SCORE_TABLE_HEAD
+
+
+def test_score_row_styles_podium_and_escapes_names():
+    assert 'color:#e67e22;">1. Bret</span>' in score_row({"rank": 1, "user_name": "Bret", "score": 9})
+    assert score_row({"rank": 7, "user_name": "<Kane>", "score": 2}) == (
+        "<tr><td>7. &lt;Kane&gt;</td><td>Liczba punktów 2</td></tr>"
+    )
+
+
+def test_heading_and_correct_answer():
+    assert HEADING.render(title="Pytanie", body="Kto?").endswith("Kto?")
+    assert "Gratulacje Bret!" in CORRECT_ANSWER.render(user="Bret", question="Kto?", score_table="")
+
+
+def test_top_table_is_cached_until_scores_change():
+    renderer = ScoreTableRenderer()
+    leaderboard = board({"a": 3, "b": 2, "c": 1})
+    first = renderer.render(leaderboard, 2)
+    assert renderer.render(leaderboard, 2) == first
+    assert renderer.stats() == {"hits": 1, "misses": 1}
+    leaderboard.add("c", 5)
+    assert "1. c" in renderer.render(leaderboard, 2)
+    assert renderer.stats()["misses"] == 2
+
+
+def test_player_outside_top_is_appended():
+    renderer = ScoreTableRenderer()
+    leaderboard = board({"a": 3, "b": 2, "c": 1})
+    table = renderer.render(leaderboard, 2, "c")
+    assert table.startswith(SCORE_TABLE_HEAD) and table.endswith(SCORE_TABLE_TAIL)
+    assert SCORE_GAP + score_row({"rank": 3, "user_name": "c", "score": 1}) in table
+    assert SCORE_GAP not in renderer.render(leaderboard, 2, "a")
@@ -0,0 +1,84 @@
+# tests/test_rate_limiter.py
+import time
+
+import pytest
+
+from rate_limiter import CircuitBreaker, CircuitOpenError, RateLimitTimeout, TokenBucket
+
+
+def test_bucket_allows_burst_then_throttles():
+    bucket = TokenBucket(rate=100, capacity=3)
+    for _ in range(3):
+        bucket.acquire()
+    started = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - started >= 0.005
+    assert bucket.stats()["throttled"] == 1
+
+
+def test_bucket_times_out_while_paused():
+    bucket = TokenBucket(rate=100, capacity=1)
+    bucket.pause_until(time.monotonic() + 10)
+    with pytest.raises(RateLimitTimeout):
+        bucket.acquire(timeout=0.01)
+
+
+def open_breaker(reset_timeout=0.05):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=reset_timeout, name="test")
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    return breaker
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = open_breaker(reset_timeout=10)
+    with pytest.raises(CircuitOpenError) as rejected:
+        breaker.before_call()
+    assert breaker.stats()["state"] == CircuitBreaker.OPEN
+    assert 9 < rejected.value.retry_after <= 10
+
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+    breaker.before_call()
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_success()
+    breaker.before_call()
+    breaker.record_failure()
+    breaker.before_call()
+    assert breaker.stats()["state"] == CircuitBreaker.CLOSED
+
+
+def test_half_open_allows_one_trial():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    breaker.before_call()
+    assert breaker.stats()["state"] == CircuitBreaker.CLOSED
+
+
+def test_failed_trial_reopens():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.stats()["times_opened"] == 2
+
+
+def test_abandoned_trial_does_not_block_forever():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    breaker.before_call()  # trial that never reports a result
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.stats()["state"] == CircuitBreaker.CLOSED
@@ -0,0 +1,64 @@
+# tests/test_response_cache.py
+import sqlite3
+import time
+
+from response_cache import ResponseCache, cache_key, normalize_prompt
+
+PARAMS = {"model": "grok-3"}
+
+
+def test_prompt_normalisation():
+    assert normalize_prompt("  Kto  wygrał\tWrestleManię? ") == "kto wygrał wrestlemanię?"
+    assert cache_key("Kto wygrał?", PARAMS) == cache_key("kto   WYGRAŁ?", PARAMS)
+    assert cache_key("Kto wygrał?", PARAMS) != cache_key("Kto wygrał?", {"model": "grok-3-mini"})
+
+
+def test_put_and_get():
+    cache = ResponseCache()
+    assert cache.get("pytanie", PARAMS) is None
+    cache.put("pytanie", PARAMS, "odpowiedź", ttl=60)
+    assert cache.get("Pytanie", PARAMS) == "odpowiedź"
+    assert cache.stats()["hits"] == 1
+
+
+def test_expired_and_zero_ttl_entries():
+    cache = ResponseCache()
+    cache.put("a", PARAMS, "x", ttl=0)
+    assert cache.get("a", PARAMS) is None
+    cache.put("b", PARAMS, "y", ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("b", PARAMS) is None
+
+
+def test_memory_tier_is_bounded():
+    cache = ResponseCache(max_entries=2, max_bytes=10)
+    cache.put("a", PARAMS, "1234", ttl=60)
+    cache.put("b", PARAMS, "1234", ttl=60)
+    cache.put("c", PARAMS, "1234", ttl=60)
+    assert cache.get("a", PARAMS) is None
+    assert cache.stats()["bytes"] <= 10
+    cache.put("big", PARAMS, "x" * 11, ttl=60)
+    assert cache.get("big", PARAMS) is None
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    ResponseCache(disk_path=path).put("pytanie", PARAMS, "odpowiedź", ttl=60)
+    cache = ResponseCache(disk_path=path)
+    assert cache.get("pytanie", PARAMS) == "odpowiedź"
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_purge_expired_empties_both_tiers(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = ResponseCache(disk_path=path)
+    cache.put("stare", PARAMS, "x", ttl=0.01)
+    cache.put("nowe", PARAMS, "y", ttl=60)
+    time.sleep(0.02)
+    assert cache.purge_expired() == 2
+    assert cache.stats()["entries"] == 1
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 1
+    finally:
+        conn.close()
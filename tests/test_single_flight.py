@@ -0,0 +1,93 @@
+# tests/test_single_flight.py
+import threading
+
+import pytest
+
+from single_flight import SingleFlight, SingleFlightTimeout
+
+
+def run_concurrently(flights, key, func, callers, timeout=None):
+    results = [None] * callers
+    errors = [None] * callers
+
+    def call(i):
+        try:
+            results[i] = flights.do(key, func, timeout=timeout)
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def wait_for_followers(flights, count):
+    for _ in range(500):
+        if flights.stats()["waiting_followers"] >= count:
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError("followers did not join")
+
+
+def test_concurrent_callers_share_one_call():
+    flights = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return "odpowiedź"
+
+    threads, results, errors = run_concurrently(flights, "k", slow, 5)
+    wait_for_followers(flights, 4)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert calls == [1]
+    assert results == ["odpowiedź"] * 5
+    assert flights.stats()["leaders"] == 1 and flights.stats()["coalesced"] == 4
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_error_is_shared_and_not_cached():
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise ValueError("xAI down")
+
+    threads, results, errors = run_concurrently(flights, "k", failing, 3)
+    wait_for_followers(flights, 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert all(isinstance(error, ValueError) for error in errors)
+    assert flights.do("k", lambda: "ok") == "ok"
+
+
+def test_different_keys_do_not_coalesce():
+    flights = SingleFlight()
+    assert flights.do("a", lambda: 1) == 1
+    assert flights.do("b", lambda: 2) == 2
+    assert flights.stats()["coalesced"] == 0
+
+
+def test_follower_times_out():
+    flights = SingleFlight()
+    release = threading.Event()
+    leader = threading.Thread(target=flights.do, args=("k", lambda: release.wait(5)))
+    leader.start()
+    try:
+        for _ in range(500):
+            if flights.stats()["in_flight"]:
+                break
+            threading.Event().wait(0.01)
+        with pytest.raises(SingleFlightTimeout):
+            flights.do("k", lambda: None, timeout=0.01)
+        assert flights.stats()["timeouts"] == 1
+    finally:
+        release.set()
+        leader.join()
@@ -0,0 +1,115 @@
+# tests/test_topic_scheduler.py
+import threading
+import time
+
+import pytest
+
+from job_queue import JobQueue
+from topic_scheduler import TopicScheduler
+from worker_pool import WorkerPool
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = TopicScheduler(max_concurrency=4, idle_timeout=60, name="test-lane")
+    scheduler.start()
+    yield scheduler
+    scheduler.stop(timeout=1)
+
+
+def test_lane_runs_tasks_in_submission_order(scheduler):
+    seen = []
+    for i in range(50):
+        scheduler.submit("topic", seen.append, i)
+    assert wait_until(lambda: scheduler.pending() == 0)
+    assert seen == list(range(50))
+
+
+def test_lanes_run_in_parallel_but_one_task_per_lane(scheduler):
+    lock = threading.Lock()
+    running = {}
+    peak = {"lanes": 0, "per_lane": 0}
+
+    def task(key):
+        with lock:
+            running[key] = running.get(key, 0) + 1
+            peak["per_lane"] = max(peak["per_lane"], running[key])
+            peak["lanes"] = max(peak["lanes"], sum(1 for count in running.values() if count))
+        time.sleep(0.02)
+        with lock:
+            running[key] -= 1
+
+    for i in range(5):
+        for key in ("a", "b", "c", "d"):
+            scheduler.submit(key, task, key)
+    assert wait_until(lambda: scheduler.pending() == 0)
+    assert peak["per_lane"] == 1
+    assert peak["lanes"] > 1
+
+
+def test_callbacks_and_failures(scheduler):
+    done = []
+    errors = []
+
+    def boom():
+        raise ValueError("boom")
+
+    scheduler.submit("topic", lambda: None, on_done=lambda: done.append(True))
+    scheduler.submit("topic", boom, on_error=errors.append)
+    assert wait_until(lambda: scheduler.pending() == 0)
+    assert done == [True]
+    assert isinstance(errors[0], ValueError)
+    assert scheduler.stats()["failed"] == 1
+
+
+def test_full_lanes_counts_queued_and_running_tasks(scheduler):
+    release = threading.Event()
+    for _ in range(3):
+        scheduler.submit("busy", release.wait)
+    scheduler.submit("quiet", lambda: None)
+    assert wait_until(lambda: scheduler.stats()["running"] == 1 and scheduler.pending() == 3)
+    assert scheduler.full_lanes(3) == ["busy"]
+    assert scheduler.full_lanes(4) == []
+    release.set()
+    assert wait_until(lambda: scheduler.pending() == 0)
+    assert scheduler.full_lanes(1) == []
+
+
+def test_busy_topic_does_not_block_other_topics(tmp_path):
+    """A topic with a long backlog fills only its own lane; other topics keep being leased."""
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    release = threading.Event()
+    handled = []
+
+    def handler(topic, n):
+        if topic == "busy":
+            release.wait(5)
+        handled.append((topic, n))
+
+    lanes = TopicScheduler(max_concurrency=2, idle_timeout=60, name="test-lane")
+    pool = WorkerPool(handler, queue, poll_interval=0.05, scheduler=lanes,
+                      key_func=lambda topic, n: topic, max_in_flight=100, max_per_lane=2)
+    for n in range(20):
+        pool.submit("busy", n)
+    pool.submit("other", 0)
+    pool.start()
+    try:
+        assert wait_until(lambda: ("other", 0) in handled)
+        assert lanes.stats()["pending"] <= 2
+        release.set()
+        assert wait_until(lambda: len(handled) == 21)
+        assert [n for topic, n in handled if topic == "busy"] == list(range(20))
+        assert queue.qsize() == 0
+    finally:
+        release.set()
+        pool.stop(timeout=1)
+        queue.close()
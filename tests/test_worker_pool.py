@@ -0,0 +1,91 @@
+# tests/test_worker_pool.py
+import threading
+import time
+
+import pytest
+
+from job_queue import JobQueue
+from worker_pool import WorkerPool
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"), base_backoff=0.01, max_backoff=0.01, max_attempts=3)
+    yield queue
+    queue.close()
+
+
+def test_submitted_jobs_run_on_workers_and_are_acked(queue):
+    seen = []
+    pool = WorkerPool(lambda *args: seen.append(args), queue, num_workers=2, poll_interval=0.05)
+    pool.start()
+    try:
+        for i in range(10):
+            pool.submit("event", i)
+        assert wait_until(lambda: queue.qsize() == 0)
+    finally:
+        pool.stop(timeout=1)
+    assert sorted(seen) == [("event", i) for i in range(10)]
+    assert pool.stats()["processed"] == 10
+
+
+def test_submit_returns_before_the_handler_finishes(queue):
+    release = threading.Event()
+    pool = WorkerPool(lambda *args: release.wait(5), queue, num_workers=1, poll_interval=0.05)
+    pool.start()
+    try:
+        started = time.monotonic()
+        pool.submit("slow")
+        assert time.monotonic() - started < 1
+        assert queue.qsize() == 1
+        release.set()
+        assert wait_until(lambda: queue.qsize() == 0)
+    finally:
+        release.set()
+        pool.stop(timeout=1)
+
+
+def test_failing_job_is_retried_until_it_succeeds(queue):
+    calls = []
+
+    def handler(value):
+        calls.append(value)
+        if len(calls) < 2:
+            raise RuntimeError("boom")
+
+    pool = WorkerPool(handler, queue, num_workers=1, poll_interval=0.01)
+    pool.start()
+    try:
+        pool.submit("x")
+        assert wait_until(lambda: queue.qsize() == 0)
+    finally:
+        pool.stop(timeout=1)
+    assert calls == ["x", "x"]
+    assert pool.stats()["failed"] == 1
+
+
+def test_jobs_left_by_a_crash_run_after_restart(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    crashed = JobQueue(path)
+    crashed.put("left", 1)
+    crashed.lease()
+    crashed.close()
+
+    queue = JobQueue(path)
+    seen = []
+    pool = WorkerPool(lambda *args: seen.append(args), queue, num_workers=1, poll_interval=0.05)
+    pool.start()
+    try:
+        assert wait_until(lambda: seen == [("left", 1)])
+    finally:
+        pool.stop(timeout=1)
+        queue.close()
@@ -0,0 +1,64 @@
+# tests/test_xai_stream.py
+import json
+import time
+
+from xai_stream import read_stream
+
+
+class FakeResponse:
+    def __init__(self, lines):
+        self.lines = lines
+        self.closed = False
+
+    def iter_lines(self):
+        for line in self.lines:
+            yield line.encode("utf-8") if isinstance(line, str) else line
+
+    def close(self):
+        self.closed = True
+
+
+def chunk(content=None, finish_reason=None):
+    return "data: " + json.dumps(
+        {"choices": [{"delta": {"content": content} if content else {}, "finish_reason": finish_reason}]},
+        ensure_ascii=False,
+    )
+
+
+def test_complete_stream_is_decoded_as_utf8():
+    response = FakeResponse([chunk("Zażółć "), "", chunk("gęślą jaźń"), chunk(finish_reason="stop"), "data: [DONE]"])
+    text, finished = read_stream(response, "model", time.monotonic())
+    assert text == "Zażółć gęślą jaźń"
+    assert finished
+    assert response.closed
+
+
+def test_done_marker_finishes_stream():
+    text, finished = read_stream(FakeResponse([chunk("ok"), "data: [DONE]"]), "model", time.monotonic())
+    assert (text, finished) == ("ok", True)
+
+
+def test_truncated_stream_is_not_finished():
+    text, finished = read_stream(FakeResponse([chunk("Pół "), chunk("odpo")]), "model", time.monotonic())
+    assert text == "Pół odpo"
+    assert not finished
+
+
+def test_max_chars_stops_reading():
+    response = FakeResponse([chunk("abcdef"), chunk("ghij"), chunk(finish_reason="stop")])
+    text, finished = read_stream(response, "model", time.monotonic(), max_chars=5)
+    assert text == "abcdef"
+    assert not finished
+
+
+def test_deadline_stops_reading():
+    text, finished = read_stream(FakeResponse([chunk("late"), chunk(finish_reason="stop")]), "model",
+                                 time.monotonic() - 10, deadline=1)
+    assert text == "late"
+    assert not finished
+
+
+def test_malformed_chunks_are_skipped():
+    text, finished = read_stream(FakeResponse(["data: {not json", chunk("ok"), "data: [DONE]"]), "model",
+                                 time.monotonic())
+    assert (text, finished) == ("ok", True)
@@ -0,0 +1,177 @@
+# topic_scheduler.py
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger()
+
+
+class _Lane:
+    __slots__ = ("key", "backlog", "scheduled", "in_flight", "last_active", "processed")
+
+    def __init__(self, key):
+        self.key = key
+        self.backlog = deque()
+        self.scheduled = False  # waiting in the ready queue or running
+        self.in_flight = 0  # tasks submitted and not finished yet
+        self.last_active = time.monotonic()
+        self.processed = 0
+
+
+class TopicScheduler:
+    """
+    Actor-style scheduler: every key (a forum topic) has a serial lane, so
+    its tasks run one at a time in submission order, while different lanes
+    run in parallel on `max_concurrency` runner threads. A lane with work is
+    in the ready queue at most once; a runner takes it, runs one task and
+    puts it back at the end if more are waiting, so a busy topic cannot
+    starve the others. Lanes idle for `idle_timeout` seconds are dropped.
+    """
+
+    def __init__(self, max_concurrency=4, idle_timeout=300, name="lanes"):
+        self.max_concurrency = max_concurrency
+        self.idle_timeout = idle_timeout
+        self.name = name
+        self._lanes = {}
+        self._ready = deque()
+        self._lock = threading.Lock()
+        self._work = threading.Condition(self._lock)
+        self._threads = []
+        self._stopping = False
+        self._running = 0
+        self._pending = 0
+        self._processed = 0
+        self._failed = 0
+        self._evicted = 0
+        self._release_listeners = []
+        self._last_sweep = time.monotonic()
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            self._stopping = False
+            for i in range(self.max_concurrency):
+                thread = threading.Thread(target=self._run, name=f"{self.name}-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        logger.info(f"Started {self.name} scheduler with {self.max_concurrency} runners")
+
+    def stop(self, timeout=None):
+        """Stop runners after their current task; tasks still in lanes are not run."""
+        with self._work:
+            self._stopping = True
+            self._work.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, key, func, *args, on_done=None, on_error=None):
+        """
+        Queue func(*args) on the lane for key. on_done() or on_error(exc) is
+        called on the runner thread once the task has finished.
+        """
+        with self._work:
+            lane = self._lanes.get(key)
+            if lane is None:
+                lane = self._lanes[key] = _Lane(key)
+            lane.backlog.append((func, args, on_done, on_error))
+            lane.in_flight += 1
+            self._pending += 1
+            if not lane.scheduled:
+                lane.scheduled = True
+                self._ready.append(lane)
+                self._work.notify()
+
+    def add_release_listener(self, callback):
+        """Call callback() on the runner thread every time a task has finished and left its lane."""
+        self._release_listeners.append(callback)
+
+    def pending(self):
+        """Tasks submitted and not finished yet (queued in lanes or running)."""
+        with self._lock:
+            return self._pending
+
+    def full_lanes(self, limit):
+        """Keys of lanes holding at least limit unfinished tasks."""
+        with self._lock:
+            return [key for key, lane in self._lanes.items() if lane.in_flight >= limit]
+
+    def _run(self):
+        while True:
+            with self._work:
+                while not self._ready and not self._stopping:
+                    self._work.wait(self.idle_timeout)
+                    self._sweep()
+                if self._stopping:
+                    return
+                lane = self._ready.popleft()
+                func, args, on_done, on_error = lane.backlog.popleft()
+                self._running += 1
+
+            failed = False
+            try:
+                func(*args)
+            except Exception as e:
+                failed = True
+                logger.error(f"Error in {self.name} lane {lane.key}: {e}")
+                if on_error is not None:
+                    self._callback(on_error, e)
+            else:
+                if on_done is not None:
+                    self._callback(on_done)
+
+            with self._work:
+                self._running -= 1
+                self._pending -= 1
+                lane.in_flight -= 1
+                self._processed += 1
+                if failed:
+                    self._failed += 1
+                lane.processed += 1
+                lane.last_active = time.monotonic()
+                if lane.backlog:
+                    self._ready.append(lane)
+                    self._work.notify()
+                else:
+                    lane.scheduled = False
+                self._sweep()
+            for listener in self._release_listeners:
+                self._callback(listener)
+
+    def _callback(self, callback, *args):
+        try:
+            callback(*args)
+        except Exception as e:
+            logger.error(f"Error in {self.name} completion callback: {e}")
+
+    def _sweep(self):
+        """Drop lanes idle for longer than idle_timeout. Caller holds the lock."""
+        now = time.monotonic()
+        if now - self._last_sweep < min(self.idle_timeout, 60):
+            return
+        self._last_sweep = now
+        idle = [key for key, lane in self._lanes.items()
+                if not lane.scheduled and now - lane.last_active > self.idle_timeout]
+        for key in idle:
+            del self._lanes[key]
+        self._evicted += len(idle)
+
+    def stats(self, top=10):
+        with self._lock:
+            busiest = sorted(
+                (lane for lane in self._lanes.values() if lane.backlog),
+                key=lambda lane: len(lane.backlog), reverse=True
+            )[:top]
+            return {
+                "runners": len(self._threads),
+                "running": self._running,
+                "pending": self._pending,
+                "lanes": len(self._lanes),
+                "ready_lanes": len(self._ready),
+                "processed": self._processed,
+                "failed": self._failed,
+                "evicted_lanes": self._evicted,
+                "backlog_by_lane": {str(lane.key): len(lane.backlog) for lane in busiest},
+            }
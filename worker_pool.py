@@ -0,0 +1,216 @@
+# worker_pool.py
+import logging
+import threading
+import time
+from job_queue import QueueFullError
+
+logger = logging.getLogger()
+
+__all__ = ["WorkerPool", "QueueFullError"]
+
+
+class WorkerPool:
+    """
+    Fixed-size pool of daemon threads consuming jobs from a durable JobQueue.
+    The webhook enqueues notifications here and returns immediately; the
+    slow part (DB, xAI, forum POST) runs on the workers. A job is acked only
+    after the handler returns, so a crash mid-job leaves it to be replayed.
+
+    With a TopicScheduler and key_func(*args), a single dispatcher thread
+    leases jobs instead and hands them to the scheduler's per-key lanes, so
+    jobs for one key (topic) run in order while keys run in parallel. Each
+    lane holds at most max_per_lane leased jobs (jobs of a full lane are
+    skipped, not blocked on) and all lanes together at most max_in_flight.
+    A job's lease is renewed when it starts running in its lane; if it was
+    lost while the job waited, the job is not run, as it has been leased
+    again and will run from that lease.
+    """
+
+    def __init__(self, handler, job_queue, num_workers=4, poll_interval=1.0, name="worker",
+                 scheduler=None, key_func=None, max_in_flight=64, max_per_lane=4):
+        self.handler = handler
+        self.job_queue = job_queue
+        self.num_workers = num_workers
+        self.poll_interval = poll_interval
+        self.name = name
+        self.scheduler = scheduler
+        self.key_func = key_func
+        self.max_in_flight = max_in_flight
+        self.max_per_lane = max_per_lane
+        self._threads = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._stopping = False
+        self._busy = 0
+        self._busy_seconds = 0.0
+        self._processed = 0
+        self._failed = 0
+        self._lost_leases = 0
+        self._started_at = None
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            self._stopping = False
+            self._started_at = time.monotonic()
+        self.job_queue.recover()
+        if self.scheduler is not None:
+            self.scheduler.add_release_listener(self._lane_released)
+            self.scheduler.start()
+            with self._lock:
+                thread = threading.Thread(target=self._dispatch, name=f"{self.name}-dispatcher", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            logger.info(f"Started {self.name} dispatcher")
+            return
+        with self._lock:
+            for i in range(self.num_workers):
+                thread = threading.Thread(target=self._run, name=f"{self.name}-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        logger.info(f"Started {self.num_workers} {self.name} threads")
+
+    def submit(self, *args):
+        """Persist the job and wake a worker. Raises QueueFullError when the queue is at capacity."""
+        lane = None
+        if self.key_func is not None:
+            lane = self._lane_key(*args)
+        job_id = self.job_queue.put(*args, lane=lane)
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def stop(self, timeout=None):
+        """Stop workers after their current job; unfinished jobs stay in the queue."""
+        with self._wakeup:
+            self._stopping = True
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        if self.scheduler is not None:
+            self.scheduler.stop(timeout)
+
+    def _wait_for_work(self):
+        due_in = self.job_queue.next_due_in()
+        timeout = self.poll_interval if due_in is None else min(due_in, self.poll_interval)
+        with self._wakeup:
+            if not self._stopping:
+                self._wakeup.wait(timeout)
+
+    def _run(self):
+        while not self._stopping:
+            try:
+                job = self.job_queue.lease()
+            except Exception as e:
+                logger.error(f"Error leasing {self.name} job: {e}")
+                job = None
+            if job is None:
+                self._wait_for_work()
+                continue
+            with self._lock:
+                self._busy += 1
+            started = time.monotonic()
+            failed = True
+            try:
+                self.handler(*job.args)
+                failed = False
+            except Exception as e:
+                logger.error(f"Error in {self.name} job {job.id}: {e}")
+                self.job_queue.fail(job, e)
+            else:
+                self.job_queue.ack(job)
+            finally:
+                elapsed = time.monotonic() - started
+                with self._lock:
+                    self._busy -= 1
+                    self._busy_seconds += elapsed
+                    self._processed += 1
+                    if failed:
+                        self._failed += 1
+
+    def _lane_key(self, *args):
+        try:
+            return self.key_func(*args)
+        except Exception as e:
+            logger.error(f"Error routing {self.name} job: {e}")
+            return None
+
+    def _dispatch(self):
+        while not self._stopping:
+            if self.scheduler.pending() >= self.max_in_flight:
+                with self._wakeup:
+                    if not self._stopping:
+                        self._wakeup.wait(self.poll_interval)
+                continue
+            full = self.scheduler.full_lanes(self.max_per_lane)
+            try:
+                job = self.job_queue.lease(skip_lanes=full)
+            except Exception as e:
+                logger.error(f"Error leasing {self.name} job: {e}")
+                job = None
+            if job is None:
+                if full:
+                    # Jobs of full lanes may be due; wait for a lane slot instead of polling
+                    with self._wakeup:
+                        if not self._stopping:
+                            self._wakeup.wait(self.poll_interval)
+                else:
+                    self._wait_for_work()
+                continue
+            key = job.lane if job.lane is not None else self._lane_key(*job.args)
+            self.scheduler.submit(key, self._run_job, job)
+
+    def _run_job(self, job):
+        """Run one job on a scheduler lane, then ack it or schedule a retry."""
+        if not self.job_queue.touch(job):
+            logger.warning(f"Lease on {self.name} job {job.id} was lost while it waited in its lane, skipping")
+            with self._lock:
+                self._lost_leases += 1
+            return
+        with self._lock:
+            self._busy += 1
+        started = time.monotonic()
+        failed = True
+        try:
+            self.handler(*job.args)
+            failed = False
+        except Exception as e:
+            logger.error(f"Error in {self.name} job {job.id}: {e}")
+            self.job_queue.fail(job, e)
+        else:
+            self.job_queue.ack(job)
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self._busy -= 1
+                self._busy_seconds += elapsed
+                self._processed += 1
+                if failed:
+                    self._failed += 1
+
+    def _lane_released(self):
+        """A lane slot is free again; wake the dispatcher."""
+        with self._wakeup:
+            self._wakeup.notify()
+
+    def stats(self):
+        with self._lock:
+            uptime = time.monotonic() - self._started_at if self._started_at else 0.0
+            workers = self.scheduler.max_concurrency if self.scheduler is not None else len(self._threads)
+            capacity = uptime * workers
+            stats = {
+                "workers": workers,
+                "busy_workers": self._busy,
+                "queue_depth": self.job_queue.qsize(),
+                "queue_capacity": self.job_queue.max_size,
+                "processed": self._processed,
+                "failed": self._failed,
+                "lost_leases": self._lost_leases,
+                "utilisation": round(self._busy_seconds / capacity, 4) if capacity else 0.0,
+            }
+        stats["jobs"] = self.job_queue.stats()
+        if self.scheduler is not None:
+            stats["lanes"] = self.scheduler.stats()
+        return stats
@@ -0,0 +1,116 @@
+# answer_batcher.py
+import html
+import logging
+import threading
+from contextlib import contextmanager
+from xQuiz.quiz_manager import QuizAnswerQueue, next_hint, mark_hint_served, get_random_pro_wrestling_joke
+from xQuiz.quiz_templates import HEADING
+from api_calls import post_forum_reply
+
+logger = logging.getLogger(__name__)
+
+
+class AnswerBatcher:
+    """
+    Zbiera błędne odpowiedzi w quiz_answer_queue i odpowiada na nie paczkami:
+    jeden post z jedną podpowiedzią na wszystkie zgadywania z okna, zamiast
+    podpowiedzi (i wywołania xAI) po każdej błędnej odpowiedzi.
+    """
+
+    def __init__(self, answer_queue=None):
+        self.answer_queue = answer_queue or QuizAnswerQueue()
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.answers = 0
+
+    @contextmanager
+    def _locked(self, question_id):
+        """Blokada paczki pytania; znika, gdy nikt jej nie trzyma ani na nią nie czeka."""
+        with self._locks_guard:
+            entry = self._locks.get(question_id)
+            if entry is None:
+                entry = self._locks[question_id] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._locks_guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[question_id]
+
+    def add_wrong_answer(self, topic_id, question, username, guess):
+        """
+        Dodaje błędną odpowiedź do kolejki i od razu przetwarza paczkę, jeśli
+        jest już pełna. Paczki, którym minęło okno, wysyła okresowo
+        main.flush_answer_batches.
+        """
+        self.answer_queue.add_answer(question['id'], username, guess)
+        if self.answer_queue.should_process_answers(question['id']):
+            self.process(topic_id, question)
+
+    def discard(self, question_id):
+        """Porzuca oczekujące odpowiedzi na pytanie, na które padła już poprawna odpowiedź."""
+        with self._locked(question_id):
+            pending = self.answer_queue.get_pending_answers(question_id)
+            self.answer_queue.mark_answers_as_processed([answer['id'] for answer in pending])
+
+    def process(self, topic_id, question):
+        """
+        Odpowiada jednym postem na wszystkie oczekujące odpowiedzi na pytanie.
+        Odpowiedzi są oznaczane jako przetworzone, a podpowiedź jako wydana,
+        dopiero po wysłaniu posta; jeśli wysłanie się nie uda, paczka czeka
+        na kolejne przetworzenie i dostaje wtedy tę samą podpowiedź.
+        """
+        with self._locked(question['id']):
+            pending = self.answer_queue.get_pending_answers(question['id'])
+            if not pending:
+                return 0
+
+            guesses = [{"author": answer['user_name'], "content": answer['answer']} for answer in pending]
+            hint_order, hint = next_hint(question['id'], question['question'], posts_history=guesses)
+            post_forum_reply(topic_id, self._format_reply(guesses, hint))
+            if hint:
+                mark_hint_served(question['id'], hint_order)
+            self.answer_queue.mark_answers_as_processed([answer['id'] for answer in pending])
+
+        with self._stats_lock:
+            self.batches += 1
+            self.answers += len(pending)
+        logger.info(f"Answered {len(pending)} wrong quiz answers with one post - Question ID: {question['id']}")
+        return len(pending)
+
+    def _format_reply(self, guesses, hint):
+        tried = ", ".join(
+            f"<em>{html.escape(guess['content'])}</em> ({html.escape(guess['author'])})" for guess in guesses
+        )
+        response = (
+            "<p style='text-align: justify;'>"
+            f"Niestety to nie jest poprawna odpowiedź: {tried}."
+            "</p>"
+        )
+        if hint:
+            return response + HEADING.render(title="Podpowiedź", body=hint)
+        # Jeśli nie da się wygenerować podpowiedzi, opowiedz żart
+        joke = get_random_pro_wrestling_joke()
+        return response + (
+            "<p style='text-align: justify;'>Na pocieszenie opowiadam kawał:</p>"
+            f"<p style='text-align: justify;'>{joke}&nbsp;"
+            "<img alt=':leo:' data-emoticon='true' loading='lazy' "
+            "src='https://forum.wrestling.pl/uploads/emoticons/leo.png' style='width: 40px; height: auto;' title=':leo:'>"
+            "</p>"
+        )
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "batches": self.batches,
+                "answers": self.answers,
+                "answers_per_batch": round(self.answers / self.batches, 2) if self.batches else 0.0,
+            }
+
+
+answer_batcher = AnswerBatcher()
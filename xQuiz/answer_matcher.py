@@ -0,0 +1,153 @@
+# answer_matcher.py
+import re
+import unicodedata
+
+# Litery, których NFKD nie rozkłada na literę bazową i znak diakrytyczny
+_FOLD = str.maketrans({"ł": "l", "ß": "ss", "ø": "o", "đ": "d", "æ": "ae", "œ": "oe"})
+_NON_WORD = re.compile(r"[\W_]+")
+
+# Słowa, które nie zmieniają odpowiedzi ("The Undertaker", "to chyba Edge")
+STOPWORDS = frozenset("""
+    the a an of and mr mrs ms
+    i w we z ze na do to ten ta jest sa byl byla chyba moze raczej pewnie
+    moim zdaniem wedlug mnie odpowiedz odp
+""".split())
+
+# Najkrótsza forma, dla której dopuszczamy literówki; krótsze muszą się zgadzać dokładnie
+MIN_FUZZY_LENGTH = 4
+
+
+def fold(text):
+    """Małe litery bez polskich znaków i interpunkcji: "Łukasz  Świątek!" -> "lukasz swiatek"."""
+    text = unicodedata.normalize("NFKD", (text or "").casefold().translate(_FOLD))
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return _NON_WORD.sub(" ", text).strip()
+
+def tokenize(text):
+    """
+    Słowa tekstu bez stop-słów. Tekst złożony wyłącznie ze stop-słów (np.
+    odpowiedź "A" albo "Z") zachowuje je, żeby dało się go w ogóle dopasować.
+    """
+    tokens = fold(text).split()
+    kept = tuple(token for token in tokens if token not in STOPWORDS)
+    return kept or tuple(tokens)
+
+def _has_digit(text):
+    return any(char.isdigit() for char in text)
+
+def bounded_distance(a, b, limit):
+    """
+    Odległość edycyjna (z zamianą sąsiednich liter jako jedną operacją)
+    albo limit + 1, gdy przekracza limit. Liczone są tylko komórki w pasie
+    |i - j| <= limit, a liczenie kończy się, gdy cały wiersz przekroczy limit.
+    """
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    over = limit + 1
+    width = len(b) + 1
+    previous2 = None
+    previous = [j if j <= limit else over for j in range(width)]
+    for i in range(1, len(a) + 1):
+        current = [over] * width
+        if i <= limit:
+            current[0] = i
+        row_min = current[0]
+        char = a[i - 1]
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            cost = 0 if char == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 is not None and j > 1 and char == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value if value <= limit else over
+            if value < row_min:
+                row_min = value
+        if row_min > limit:
+            return over
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class AnswerIndex:
+    """
+    Odpowiedź i jej warianty przygotowane do szybkiego sprawdzania zgadywań
+    bez xAI. Budowana raz na pytanie; match() próbuje kolejno:
+    - dokładnej formy po normalizacji (bez znaków diakrytycznych, stop-słów),
+    - formy z limitem literówek zależnym od progu (tylko bez cyfr),
+    - porównania zbiorów słów (kolejność i dodatkowe słowa),
+    - samego nazwiska dla odpowiedzi będących imieniem i nazwiskiem.
+    Zwraca podobieństwo 0..1; matches() porównuje je z progiem.
+    """
+
+    def __init__(self, answers, threshold=0.8):
+        self.threshold = threshold
+        self.forms = {}
+        self.surnames = set()
+        for answer in answers:
+            tokens = tokenize(answer)
+            if not tokens:
+                continue
+            self.forms[" ".join(tokens)] = tokens
+            last = tokens[-1]
+            if 2 <= len(tokens) <= 3 and last.isalpha() and len(last) >= MIN_FUZZY_LENGTH:
+                self.surnames.add(last)
+
+    def _limit(self, length):
+        if length < MIN_FUZZY_LENGTH:
+            return 0
+        return int((1 - self.threshold) * length + 1e-9) or 1
+
+    def _token_similarity(self, guess_token, answer_token):
+        """Podobieństwo dwóch słów albo 0, gdy różnią się bardziej niż pozwala próg."""
+        limit = self._limit(len(answer_token))
+        if answer_token.isdigit() or guess_token.isdigit():
+            limit = 0
+        distance = bounded_distance(guess_token, answer_token, limit)
+        if distance > limit:
+            return 0.0
+        return 1 - distance / max(len(answer_token), len(guess_token))
+
+    def match(self, guess):
+        tokens = tokenize(guess)
+        if not tokens:
+            return 0.0
+        joined = " ".join(tokens)
+        if joined in self.forms:
+            return 1.0
+
+        best = 0.0
+        guess_has_digit = _has_digit(joined)
+        for form, form_tokens in self.forms.items():
+            # Liczby muszą się zgadzać dokładnie ("WrestleMania 12" to nie "WrestleMania 13"),
+            # więc porównanie całego tekstu z literówkami pomijamy, gdy którakolwiek strona ma cyfry
+            if not guess_has_digit and not _has_digit(form):
+                limit = self._limit(len(form))
+                distance = bounded_distance(joined, form, limit)
+                if distance <= limit:
+                    best = max(best, 1 - distance / max(len(form), len(joined)))
+
+            # Każde słowo odpowiedzi musi mieć odpowiednik w zgadywaniu; nadmiarowe słowa obniżają wynik
+            unused = list(tokens)
+            total = 0.0
+            for answer_token in form_tokens:
+                for guess_token in unused:
+                    similarity = self._token_similarity(guess_token, answer_token)
+                    if similarity:
+                        unused.remove(guess_token)
+                        total += similarity
+                        break
+                else:
+                    break
+            else:
+                best = max(best, total / (len(form_tokens) + len(unused)))
+
+        if len(tokens) == 1 and best < self.threshold:
+            for surname in self.surnames:
+                if self._token_similarity(tokens[0], surname):
+                    best = max(best, self.threshold)
+                    break
+        return best
+
+    def matches(self, guess):
+        return self.match(guess) >= self.threshold
@@ -0,0 +1,131 @@
+# leaderboard.py
+import threading
+
+
+class Leaderboard:
+    """
+    Ranking quizu trzymany w pamięci i aktualizowany przyrostowo.
+
+    Drzewo Fenwicka liczy graczy na każdą wartość punktów, więc pozycja
+    gracza i k-ty wynik od góry kosztują O(log M), gdzie M to najwyższy
+    wynik. Gracze z tym samym wynikiem dzielą miejsce i są wypisywani
+    alfabetycznie. Wyniki ujemne są traktowane w drzewie jak zero.
+    """
+
+    def __init__(self, capacity=64):
+        self._scores = {}
+        self._buckets = {}
+        self._capacity = capacity
+        self._tree = [0] * (capacity + 1)
+        self._lock = threading.Lock()
+        self.loaded = False
+        # Zwiększana przy każdej zmianie; po niej poznaje się nieaktualne renderingi
+        self.version = 0
+
+    def load(self, rows):
+        """Zastępuje ranking wierszami {'user_name', 'score'} z quiz_scores."""
+        with self._lock:
+            self._scores = {}
+            self._buckets = {}
+            self._resize(max([row['score'] + 1 for row in rows] + [self._capacity]))
+            for row in rows:
+                self._insert(row['user_name'], row['score'])
+            self.loaded = True
+            self.version += 1
+
+    def add(self, user_name, points):
+        with self._lock:
+            self._set(user_name, self._scores.get(user_name, 0) + points)
+
+    def top(self, n):
+        """Pierwszych n graczy jako wiersze {'user_name', 'score', 'rank'}."""
+        rows = []
+        with self._lock:
+            total = len(self._scores)
+            k = 1
+            while len(rows) < n and k <= total:
+                score = self._kth_best(k)
+                names = sorted(self._buckets[score])
+                rank = k
+                for name in names:
+                    if len(rows) == n:
+                        break
+                    rows.append({"user_name": name, "score": self._scores[name], "rank": rank})
+                k += len(names)
+        return rows
+
+    def entry(self, user_name):
+        """Wiersz gracza {'user_name', 'score', 'rank'} albo None."""
+        with self._lock:
+            score = self._scores.get(user_name)
+            if score is None:
+                return None
+            return {"user_name": user_name, "score": score, "rank": self._rank_of(score)}
+
+    def __len__(self):
+        return len(self._scores)
+
+    # Poniższe metody wołane są z zajętym self._lock
+
+    def _set(self, user_name, score):
+        if user_name in self._scores:
+            self._remove(user_name)
+        if score >= self._capacity:
+            self._resize(score + 1)
+        self._insert(user_name, score)
+        self.version += 1
+
+    def _insert(self, user_name, score):
+        self._scores[user_name] = score
+        self._buckets.setdefault(max(score, 0), set()).add(user_name)
+        self._update(max(score, 0), 1)
+
+    def _remove(self, user_name):
+        key = max(self._scores.pop(user_name), 0)
+        bucket = self._buckets[key]
+        bucket.discard(user_name)
+        if not bucket:
+            del self._buckets[key]
+        self._update(key, -1)
+
+    def _resize(self, max_score):
+        capacity = self._capacity
+        while capacity < max_score:
+            capacity *= 2
+        self._capacity = capacity
+        self._tree = [0] * (capacity + 1)
+        for key, bucket in self._buckets.items():
+            self._update(key, len(bucket))
+
+    def _update(self, key, delta):
+        # Indeks w drzewie to wynik + 1 (drzewo liczy od 1)
+        i = key + 1
+        while i <= self._capacity:
+            self._tree[i] += delta
+            i += i & -i
+
+    def _count_up_to(self, key):
+        """Liczba graczy z wynikiem <= key."""
+        i = min(key + 1, self._capacity)
+        count = 0
+        while i > 0:
+            count += self._tree[i]
+            i -= i & -i
+        return count
+
+    def _rank_of(self, score):
+        return len(self._scores) - self._count_up_to(max(score, 0)) + 1
+
+    def _kth_best(self, k):
+        """Wynik (klucz drzewa) k-tego najlepszego gracza."""
+        # k-ty od góry to (total - k + 1)-ty od dołu
+        remaining = len(self._scores) - k + 1
+        position = 0
+        step = 1 << self._capacity.bit_length()
+        while step:
+            nxt = position + step
+            if nxt <= self._capacity and self._tree[nxt] < remaining:
+                position = nxt
+                remaining -= self._tree[nxt]
+            step >>= 1
+        return position  # indeks position + 1 w drzewie, czyli wynik position
@@ -0,0 +1,154 @@
+# question_bank.py
+import hashlib
+import json
+import logging
+import re
+from config import QUIZ_BANK_CATEGORIES, QUIZ_BANK_TARGET, QUIZ_BANK_MAX_PER_RUN
+from response_cache import normalize_prompt
+from utils import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_category(category):
+    """Kategoria w postaci używanej jako klucz banku."""
+    return normalize_prompt(category or "")[:255] or "wrestling"
+
+def match_category(text):
+    """
+    Kategoria banku wybrana postem gracza: najdłuższa kategoria z
+    QUIZ_BANK_CATEGORIES, której nazwa pada w poście jako osobne słowa,
+    a gdy żadna nie pasuje - pierwsza z konfiguracji. Dowolny tekst
+    ("ok", "dawaj") nie tworzy więc kategorii, dla której bank jest pusty.
+    """
+    text = normalize_prompt(text or "")
+    configured = [normalize_category(c) for c in QUIZ_BANK_CATEGORIES] or [normalize_category(None)]
+    for category in sorted(configured, key=len, reverse=True):
+        if re.search(rf"(?<!\w){re.escape(category)}(?!\w)", text):
+            return category
+    return configured[0]
+
+def question_hash(question):
+    return hashlib.sha256(normalize_prompt(question).encode("utf-8")).hexdigest()
+
+def validate_question(data):
+    """
+    Sprawdza pytanie wygenerowane przez xAI. Zwraca oczyszczony słownik
+    albo None, jeśli pytanie nie nadaje się do banku.
+    """
+    if not isinstance(data, dict):
+        return None
+    question = data.get("question")
+    answer = data.get("answer")
+    hints = data.get("hints") or []
+    if not isinstance(question, str) or not isinstance(answer, str) or not isinstance(hints, list):
+        return None
+    question = question.strip()
+    answer = answer.strip()
+    if not question or not answer or len(answer) > 255:
+        return None
+    if normalize_prompt(answer) in normalize_prompt(question):
+        # Odpowiedź podana w treści pytania
+        return None
+    hints = [hint.strip() for hint in hints if isinstance(hint, str) and hint.strip()]
+    return {"question": question, "answer": answer, "hints": hints}
+
+def add_question(category, data, used=False):
+    """
+    Dodaje pytanie do banku. Zwraca True, jeśli zostało zapisane, False dla
+    duplikatu lub błędu. used=True zapisuje pytanie od razu jako
+    wykorzystane - tak trafiają tu pytania generowane na bieżąco, żeby
+    question_hash odrzucał też ich powtórki.
+    """
+    connection = get_db_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT IGNORE INTO quiz_question_bank (category, question_hash, question, answer, hints, used_at)
+                VALUES (%s, %s, %s, %s, %s, IF(%s, NOW(), NULL))
+            """, (normalize_category(category), question_hash(data['question']), data['question'],
+                  data['answer'], json.dumps(data['hints'], ensure_ascii=False), used))
+            return cursor.rowcount == 1
+    except Exception as e:
+        logger.error(f"Error adding question to bank: {e}")
+        return False
+    finally:
+        connection.close()
+
+def take_question(category):
+    """
+    Pobiera z banku najstarsze niewykorzystane pytanie z kategorii i oznacza
+    je jako wykorzystane. Zwraca słownik jak get_random_quiz_question albo
+    None, gdy bank jest pusty.
+    """
+    category = normalize_category(category)
+    connection = get_db_connection()
+    try:
+        connection.begin()
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT id, question, answer, hints
+                FROM quiz_question_bank
+                WHERE category = %s AND used_at IS NULL
+                ORDER BY id
+                LIMIT 1
+                FOR UPDATE
+            """, (category,))
+            row = cursor.fetchone()
+            if row:
+                cursor.execute("UPDATE quiz_question_bank SET used_at = NOW() WHERE id = %s", (row['id'],))
+        connection.commit()
+    except Exception as e:
+        logger.error(f"Error taking question from bank: {e}")
+        connection.rollback()
+        return None
+    finally:
+        connection.close()
+
+    if not row:
+        logger.info(f"Question bank empty for category '{category}'")
+        return None
+    return {
+        "question": row['question'],
+        "answer": row['answer'],
+        "hints": json.loads(row['hints']) if row['hints'] else [],
+    }
+
+def ready_counts():
+    """Liczba niewykorzystanych pytań w banku dla każdej kategorii."""
+    connection = get_db_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT category, COUNT(*) AS ready
+                FROM quiz_question_bank
+                WHERE used_at IS NULL
+                GROUP BY category
+            """)
+            return {row['category']: row['ready'] for row in cursor.fetchall()}
+    finally:
+        connection.close()
+
+def replenish_question_bank(generate=None, target=QUIZ_BANK_TARGET, max_per_run=QUIZ_BANK_MAX_PER_RUN):
+    """
+    Uzupełnia bank do `target` pytań w każdej kategorii z konfiguracji
+    (tylko o nie gracze mogą prosić, zob. match_category). Wykonuje
+    najwyżej `max_per_run` wywołań xAI. Zwraca liczbę dodanych pytań.
+    """
+    if generate is None:
+        from xQuiz.quiz_manager import get_random_quiz_question as generate
+    categories = [normalize_category(c) for c in QUIZ_BANK_CATEGORIES]
+    counts = ready_counts()
+    added = 0
+    attempts = 0
+    for category in categories:
+        missing = target - counts.get(category, 0)
+        while missing > 0 and attempts < max_per_run:
+            attempts += 1
+            data = validate_question(generate(category))
+            if data and add_question(category, data):
+                added += 1
+                missing -= 1
+    if added:
+        logger.info(f"Question bank replenished with {added} questions ({attempts} xAI calls)")
+    return added
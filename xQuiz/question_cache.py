@@ -0,0 +1,97 @@
+# question_cache.py
+import threading
+import time
+from collections import OrderedDict
+from xQuiz.answer_matcher import AnswerIndex
+
+
+def answer_index(question, threshold):
+    """Indeks odpowiedzi i wariantów (kolumna variants, rozdzielana przecinkami)."""
+    answers = [question.get('answer') or ""]
+    answers.extend((question.get('variants') or "").split(","))
+    return AnswerIndex(answers, threshold)
+
+
+class CurrentQuestionCache:
+    """
+    Aktualne pytanie każdego tematu quizu, trzymane w pamięci procesu razem
+    z indeksem odpowiedzi (klucz 'matcher', xQuiz.answer_matcher), budowanym
+    raz na pytanie. Wpis jest unieważniany,
+    gdy w temacie powstaje nowe pytanie (create_new_quiz_game). Licznik
+    generacji tematu chroni przed zapisaniem pytania wczytanego z bazy tuż
+    przed takim unieważnieniem.
+
+    Zapamiętywane są też tematy bez pytania (max_missing ostatnich, przez
+    missing_ttl sekund), żeby posty w zwykłych tematach nie pytały bazy za
+    każdym razem. Po missing_ttl temat jest sprawdzany ponownie, bo pytanie
+    mógł utworzyć inny proces (start_quiz.py, drugi worker), którego
+    invalidate() tu nie dociera. Błąd wczytywania (wyjątek z load) niczego
+    nie zapamiętuje.
+    """
+
+    def __init__(self, max_entries=256, match_threshold=0.8, max_missing=4096, missing_ttl=30.0):
+        self.max_entries = max_entries
+        self.match_threshold = match_threshold
+        self.max_missing = max_missing
+        self.missing_ttl = missing_ttl
+        self._entries = OrderedDict()
+        self._missing = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load(self, topic_id, load):
+        key = str(topic_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            missing_until = self._missing.get(key)
+            if missing_until is not None:
+                if time.monotonic() < missing_until:
+                    self._missing.move_to_end(key)
+                    self.hits += 1
+                    return None
+                del self._missing[key]
+            self.misses += 1
+            generation = self._generations.get(key, 0)
+
+        question = load(topic_id)
+        if not question:
+            with self._lock:
+                if self._generations.get(key, 0) == generation:
+                    self._missing[key] = time.monotonic() + self.missing_ttl
+                    self._missing.move_to_end(key)
+                    while len(self._missing) > self.max_missing:
+                        self._missing.popitem(last=False)
+            return None
+        entry = dict(question, matcher=answer_index(question, self.match_threshold))
+
+        with self._lock:
+            if self._generations.get(key, 0) == generation:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, topic_id):
+        key = str(topic_id)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._missing.pop(key, None)
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "missing_entries": len(self._missing),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
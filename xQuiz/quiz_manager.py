@@ -1,55 +1,52 @@
+import json
 import logging
 import random
+import re
+import threading
 from datetime import datetime, timedelta
-import pymysql
 from api_calls import send_to_xai
-from config import DB_HOST, DB_USER, DB_PASSWORD, DB_NAME
+from utils import get_db_connection
+from config import XAI_JOKE_CACHE_TTL, QUIZ_BATCH_WINDOW, QUIZ_BATCH_SIZE, QUIZ_QUESTION_CACHE_SIZE, QUIZ_MATCH_THRESHOLD, QUIZ_MISSING_TTL
+from xQuiz.leaderboard import Leaderboard
+from xQuiz.question_cache import CurrentQuestionCache
 
 logger = logging.getLogger(__name__)
 
-def get_db_connection():
-    """Tworzy i zwraca połączenie z bazą danych."""
-    return pymysql.connect(
-        host=DB_HOST,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        database=DB_NAME,
-        charset='utf8mb4',
-        cursorclass=pymysql.cursors.DictCursor
-    )
+leaderboard = Leaderboard()
+current_questions = CurrentQuestionCache(QUIZ_QUESTION_CACHE_SIZE, QUIZ_MATCH_THRESHOLD, missing_ttl=QUIZ_MISSING_TTL)
+_leaderboard_lock = threading.Lock()
 
 class QuizAnswerQueue:
-    def __init__(self):
-        self.connection = get_db_connection()
-    
-    def __del__(self):
-        """Zamyka połączenie z bazą przy usuwaniu obiektu."""
-        if hasattr(self, 'connection') and self.connection.open:
-            self.connection.close()
-    
+    """
+    Kolejka odpowiedzi quizowych. Każda operacja pobiera połączenie z puli
+    i oddaje je po zakończeniu, więc obiekt nie trzyma połączenia na stałe.
+    """
+
     def add_answer(self, question_id, user_name, answer):
         """
         Dodaje odpowiedź do kolejki.
         """
+        connection = get_db_connection()
         try:
-            with self.connection.cursor() as cursor:
+            with connection.cursor() as cursor:
                 cursor.execute("""
                     INSERT INTO quiz_answer_queue (question_id, user_name, answer, timestamp)
                     VALUES (%s, %s, %s, %s)
                 """, (question_id, user_name, answer, datetime.utcnow()))
-                self.connection.commit()
                 return True
         except Exception as e:
             logger.error(f"Error adding answer to queue: {e}")
-            self.connection.rollback()
             return False
+        finally:
+            connection.close()
     
     def get_pending_answers(self, question_id):
         """
         Pobiera listę nieprzetworzonych odpowiedzi dla pytania.
         """
+        connection = get_db_connection()
         try:
-            with self.connection.cursor() as cursor:
+            with connection.cursor() as cursor:
                 cursor.execute("""
                     SELECT id, user_name, answer, timestamp
                     FROM quiz_answer_queue
@@ -61,34 +58,40 @@ class QuizAnswerQueue:
         except Exception as e:
             logger.error(f"Error fetching pending answers: {e}")
             return []
+        finally:
+            connection.close()
     
     def mark_answers_as_processed(self, answer_ids):
         """
-        Oznacza odpowiedzi jako przetworzone.
+        Oznacza odpowiedzi jako przetworzone. Zwraca liczbę odpowiedzi, które
+        faktycznie zmieniły stan (0, jeśli przetworzył je już ktoś inny).
         """
         if not answer_ids:
-            return True
+            return 0
+        connection = get_db_connection()
         try:
             placeholders = ','.join(['%s'] * len(answer_ids))
-            with self.connection.cursor() as cursor:
+            with connection.cursor() as cursor:
                 cursor.execute(f"""
                     UPDATE quiz_answer_queue
                     SET processed = TRUE
                     WHERE id IN ({placeholders})
+                      AND processed = FALSE
                 """, answer_ids)
-                self.connection.commit()
-                return True
+                return cursor.rowcount
         except Exception as e:
             logger.error(f"Error marking answers as processed: {e}")
-            self.connection.rollback()
-            return False
+            return 0
+        finally:
+            connection.close()
     
     def should_process_answers(self, question_id):
         """
         Sprawdza, czy należy przetworzyć odpowiedzi w kolejce.
         """
+        connection = get_db_connection()
         try:
-            with self.connection.cursor() as cursor:
+            with connection.cursor() as cursor:
                 cursor.execute("""
                     SELECT 
                         MIN(timestamp) as first_answer,
@@ -101,10 +104,35 @@ class QuizAnswerQueue:
                 if not result or not result['first_answer']:
                     return False
                 time_passed = datetime.utcnow() - result['first_answer']
-                return time_passed >= timedelta(minutes=1) or result['answer_count'] >= 3
+                return time_passed >= timedelta(seconds=QUIZ_BATCH_WINDOW) or result['answer_count'] >= QUIZ_BATCH_SIZE
         except Exception as e:
             logger.error(f"Error checking if answers should be processed: {e}")
             return False
+        finally:
+            connection.close()
+
+    def get_due_questions(self):
+        """
+        Zwraca pytania, których kolejka odpowiedzi spełnia warunek
+        should_process_answers, razem z tematem i treścią pytania.
+        """
+        connection = get_db_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT q.id, q.topic_id, q.question
+                    FROM quiz_answer_queue a
+                    JOIN quiz_questions q ON q.id = a.question_id
+                    WHERE a.processed = FALSE
+                    GROUP BY q.id, q.topic_id, q.question
+                    HAVING MIN(a.timestamp) <= %s OR COUNT(*) >= %s
+                """, (datetime.utcnow() - timedelta(seconds=QUIZ_BATCH_WINDOW), QUIZ_BATCH_SIZE))
+                return cursor.fetchall()
+        except Exception as e:
+            logger.error(f"Error fetching due answer batches: {e}")
+            return []
+        finally:
+            connection.close()
 
 def create_new_quiz_game(topic_id, question, answer, hints, category):
     """
@@ -112,6 +140,8 @@ def create_new_quiz_game(topic_id, question, answer, hints, category):
     """
     connection = get_db_connection()
     try:
+        # Pytanie i podpowiedzi zapisujemy w jednej transakcji
+        connection.begin()
         with connection.cursor() as cursor:
             cursor.execute("""
                 INSERT INTO quiz_questions (topic_id, question, answer, category)
@@ -127,6 +157,7 @@ def create_new_quiz_game(topic_id, question, answer, hints, category):
                         VALUES (%s, %s, %s)
                     """, (question_id, i, hint))
             connection.commit()
+            current_questions.invalidate(topic_id)
             return question_id
     except Exception as e:
         logger.error(f"Error creating quiz game: {e}")
@@ -155,20 +186,33 @@ def get_quiz_scores():
     finally:
         connection.close()
 
+def loaded_leaderboard():
+    """Ranking w pamięci; przy pierwszym użyciu wczytywany jednym zapytaniem z quiz_scores."""
+    if not leaderboard.loaded:
+        with _leaderboard_lock:
+            if not leaderboard.loaded:
+                leaderboard.load(get_quiz_scores())
+    return leaderboard
+
 def update_user_score(user_name, points):
     """
-    Aktualizuje wynik użytkownika.
+    Aktualizuje wynik użytkownika w bazie i w rankingu w pamięci.
     """
     connection = get_db_connection()
     try:
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                INSERT INTO quiz_scores (user_name, score)
-                VALUES (%s, %s)
-                ON DUPLICATE KEY UPDATE score = score + %s
-            """, (user_name, points, points))
-            connection.commit()
-            return True
+        # Zapis i aktualizacja rankingu pod jedną blokadą, żeby równoległe
+        # wczytanie rankingu nie policzyło punktów dwa razy
+        with _leaderboard_lock:
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    INSERT INTO quiz_scores (user_name, score)
+                    VALUES (%s, %s)
+                    ON DUPLICATE KEY UPDATE score = score + %s
+                """, (user_name, points, points))
+                connection.commit()
+            if leaderboard.loaded:
+                leaderboard.add(user_name, points)
+        return True
     except Exception as e:
         logger.error(f"Error updating user score: {e}")
         connection.rollback()
@@ -176,18 +220,65 @@ def update_user_score(user_name, points):
     finally:
         connection.close()
 
-def get_next_hint(question, posts_history=None):
+def award_correct_answer(topic_id, question_id, user_name, points=1):
+    """
+    Zamyka pytanie pierwszą poprawną odpowiedzią i przyznaje za nią punkty,
+    w jednej transakcji. Zwraca False, jeśli pytanie było już rozwiązane
+    (np. drugi gracz powtórzył tę samą odpowiedź) - wtedy punktów nie ma.
+    Błędy bazy są przekazywane dalej.
+    """
+    connection = get_db_connection()
+    try:
+        with _leaderboard_lock:
+            connection.begin()
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    UPDATE quiz_questions
+                    SET answered_by = %s, answered_at = NOW()
+                    WHERE id = %s AND answered_at IS NULL
+                """, (user_name, question_id))
+                if cursor.rowcount != 1:
+                    connection.rollback()
+                    return False
+                cursor.execute("""
+                    INSERT INTO quiz_scores (user_name, score)
+                    VALUES (%s, %s)
+                    ON DUPLICATE KEY UPDATE score = score + %s
+                """, (user_name, points, points))
+                connection.commit()
+            if leaderboard.loaded:
+                leaderboard.add(user_name, points)
+        return True
+    except Exception as e:
+        logger.error(f"Error awarding correct answer: {e}")
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+        # Następny post w temacie musi zobaczyć pytanie jako rozwiązane
+        current_questions.invalidate(topic_id)
+
+def get_next_hint(question, posts_history=None, previous_hints=None):
+    """
+    Generuje przez xAI kolejną podpowiedź do pytania. Używana dopiero wtedy,
+    gdy drabinka podpowiedzi z quiz_hints się wyczerpała.
+    """
     conversation = ""
     if posts_history:
         conversation = "\n".join(f"{post['author']}: {post['content']}" for post in posts_history)
+    given = ""
+    if previous_hints:
+        given = "Dotychczasowe podpowiedzi:\n" + "\n".join(f"- {hint}" for hint in previous_hints) + "\n"
     prompt = (
         f'Na podstawie tej rozmowy o pytaniu "{question}" wygeneruj jedną kreatywną podpowiedź w formacie JSON:\n'
+        f"{conversation}\n{given}"
+        "Podpowiedź ma być bardziej konkretna niż dotychczasowe.\n"
         '{ "hint": "Twoja podpowiedź tutaj." }\n'
         "Nie dodawaj żadnego komentarza, nie dodawaj tekstu przed ani po JSON."
     )
-    response = send_to_xai(prompt)
+    response = send_to_xai(prompt, bypass_cache=True)
     try:
-        data = json.loads(response)
+        data = parse_json_reply(response)
         return data.get("hint")
     except Exception as e:
         logger.error(f"Błąd parsowania podpowiedzi: {e}, response: {response}")
@@ -195,51 +286,114 @@ def get_next_hint(question, posts_history=None):
 
 def get_next_hint_db(question_id):
     """
-    Pobiera następną zapisaną podpowiedź z bazy danych dla pytania.
-    Używana tylko, gdy podpowiedzi były generowane wcześniej.
+    Zwraca (numer, treść) następnej niewydanej podpowiedzi z drabinki
+    w quiz_hints, bez przesuwania licznika wydanych podpowiedzi - robi to
+    mark_hint_served() po opublikowaniu posta. Treść jest None, gdy
+    drabinka się wyczerpała.
     """
     connection = get_db_connection()
     try:
         with connection.cursor() as cursor:
             cursor.execute("""
-                SELECT hint_text
-                FROM quiz_hints
-                WHERE question_id = %s
-                  AND hint_order = (
-                        SELECT COALESCE(MAX(hint_order), 0) + 1
-                        FROM quiz_hints
-                        WHERE question_id = %s
-                  )
-            """, (question_id, question_id))
+                SELECT q.hints_served + 1 AS hint_order, h.hint_text
+                FROM quiz_questions q
+                LEFT JOIN quiz_hints h ON h.question_id = q.id AND h.hint_order = q.hints_served + 1
+                WHERE q.id = %s
+            """, (question_id,))
             result = cursor.fetchone()
-            return result['hint_text'] if result else None
+            if not result:
+                return None, None
+            return result['hint_order'], result['hint_text']
     except Exception as e:
         logger.error(f"Error getting next hint from DB: {e}")
-        return None
+        return None, None
     finally:
         connection.close()
 
-def get_current_question(topic_id):
+def mark_hint_served(question_id, hint_order):
+    """
+    Zapisuje, że podpowiedź numer hint_order została opublikowana.
+    Ponowne wywołanie dla tej samej podpowiedzi niczego nie zmienia.
+    """
+    if not hint_order:
+        return
+    connection = get_db_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                UPDATE quiz_questions
+                SET hints_served = GREATEST(hints_served, %s)
+                WHERE id = %s
+            """, (hint_order, question_id))
+    finally:
+        connection.close()
+
+def get_served_hints(question_id):
+    """
+    Zwraca treść podpowiedzi już wydanych do pytania, w kolejności.
+    """
+    connection = get_db_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT h.hint_text
+                FROM quiz_hints h
+                JOIN quiz_questions q ON q.id = h.question_id
+                WHERE h.question_id = %s AND h.hint_order <= q.hints_served
+                ORDER BY h.hint_order
+            """, (question_id,))
+            return [row['hint_text'] for row in cursor.fetchall()]
+    except Exception as e:
+        logger.error(f"Error getting served hints: {e}")
+        return []
+    finally:
+        connection.close()
+
+def next_hint(question_id, question, posts_history=None):
     """
-    Pobiera ostatnio dodane pytanie dla danego tematu.
+    Zwraca (numer, treść) następnej podpowiedzi do pytania: najpierw
+    z drabinki zapisanej w quiz_hints, a po jej wyczerpaniu nową z xAI,
+    dopisywaną do drabinki pod tym numerem. Podpowiedź liczy się jako
+    wydana dopiero po mark_hint_served(), więc post, którego nie udało się
+    wysłać, przy ponowieniu dostaje tę samą podpowiedź. Wywołujący
+    odpowiada za to, żeby jedno pytanie nie dostawało podpowiedzi
+    równolegle (xQuiz.answer_batcher blokuje pytanie na czas paczki).
     """
+    hint_order, hint = get_next_hint_db(question_id)
+    if hint:
+        return hint_order, hint
+    hint = get_next_hint(question, posts_history, previous_hints=get_served_hints(question_id))
+    if hint and hint_order:
+        add_hint_to_quiz(question_id, hint, hint_order)
+    return hint_order, hint
+
+def _load_current_question(topic_id):
     connection = get_db_connection()
     try:
         with connection.cursor() as cursor:
             cursor.execute("""
-                SELECT id, question, answer, created_at
+                SELECT id, topic_id, question, answer, variants, answered_by, answered_at, created_at
                 FROM quiz_questions
                 WHERE topic_id = %s
-                ORDER BY created_at DESC
+                ORDER BY created_at DESC, id DESC
                 LIMIT 1
             """, (topic_id,))
             return cursor.fetchone()
-    except Exception as e:
-        logger.error(f"Error getting current question: {e}")
-        return None
     finally:
         connection.close()
 
+def get_current_question(topic_id):
+    """
+    Pobiera ostatnio dodane pytanie dla danego tematu. Pytanie jest
+    trzymane w pamięci (current_questions) razem z kluczem 'matcher' -
+    indeksem odpowiedzi do sprawdzania zgadywań - do utworzenia następnego
+    pytania w temacie. Tematy bez pytania też są zapamiętywane, więc
+    sprawdzenie zwykłego tematu nie odpytuje bazy przy każdym poście.
+    Błąd bazy jest przekazywany dalej, żeby zadanie webhooka zostało
+    powtórzone, zamiast uznać temat za zwykły.
+    """
+    return current_questions.get_or_load(topic_id, _load_current_question)
+
 def add_hint_to_quiz(question_id, hint_text, hint_order=None):
     """
     Dodaje nową podpowiedź do pytania quizowego.
@@ -268,19 +422,39 @@ def add_hint_to_quiz(question_id, hint_text, hint_order=None):
     finally:
         connection.close()
 
-def get_random_quiz_question():
+_JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+
+def parse_json_reply(response):
+    """
+    Parsuje odpowiedź xAI w formacie JSON. Model czasem opakowuje ją w blok
+    ```json ... ``` albo dodaje tekst wokół, więc bierzemy zawartość od
+    pierwszej do ostatniej klamry.
+    """
+    if not response:
+        raise ValueError("empty response")
+    match = _JSON_OBJECT.search(response)
+    return json.loads(match.group(0) if match else response)
+
+def get_random_quiz_question(category=None):
+    """
+    Generuje nowe pytanie przez xAI (opcjonalnie z podanej kategorii).
+    Zwykle pytania pochodzą z banku (xQuiz.question_bank); ta funkcja
+    zasila bank i służy jako zapas, gdy bank jest pusty.
+    """
+    topic = f"o wrestlingu z kategorii \"{category}\"" if category else "o wrestlingu"
     prompt = (
-        "Wygeneruj jedno pytanie quizowe o wrestlingu. Odpowiedz WYŁĄCZNIE w formacie JSON:\n"
+        f"Wygeneruj jedno pytanie quizowe {topic}. Odpowiedz WYŁĄCZNIE w formacie JSON:\n"
         "{\n"
         '  "question": "Pytanie tekstowe tutaj.",\n'
         '  "answer": "Odpowiedź tekstowa tutaj.",\n'
-        '  "hints": []\n'
+        '  "hints": ["Najogólniejsza podpowiedź.", "Bardziej konkretna podpowiedź.", "Prawie zdradzająca odpowiedź podpowiedź."]\n'
         "}\n"
+        "Podpowiedzi uporządkuj od najogólniejszej do najbardziej konkretnej; żadna nie może zawierać odpowiedzi.\n"
         "Nie dodawaj żadnego komentarza, nie dodawaj tekstu przed ani po JSON."
     )
-    response = send_to_xai(prompt)
+    response = send_to_xai(prompt, bypass_cache=True, coalesce=False)
     try:
-        data = json.loads(response)
+        data = parse_json_reply(response)
         assert "question" in data and "answer" in data and "hints" in data
         return data
     except Exception as e:
@@ -292,4 +466,4 @@ def get_random_pro_wrestling_joke():
     Tworzy losowy żart związany z wrestlingiem przy użyciu xAI.
     """
     prompt = "Opowiedz śmieszny żart o pro wrestlingu."
-    return send_to_xai(prompt)
\ No newline at end of file
+    return send_to_xai(prompt, cache_ttl=XAI_JOKE_CACHE_TTL)
\ No newline at end of file
@@ -0,0 +1,111 @@
+# quiz_templates.py
+import threading
+from html_templates import Template, escape
+
+# Nagłówek tabeli wyników; nawiasy klamrowe CSS podwojone dla Template
+SCORE_TABLE_HEAD = Template("""
+<style type="text/css">
+body {{ font-family: Arial, sans-serif; }}
+table {{ max-width: calc(100% - 20px); border-collapse: collapse; margin-left: auto; margin-right: auto; }}
+th, td {{ padding: 8px 10px; text-align: left; border: 1px solid black; }}
+th {{ font-weight: bold; }}
+</style>
+<table>
+    <thead>
+        <tr>
+            <th>User</th>
+            <th>Punkty</th>
+        </tr>
+    </thead>
+    <tbody>
+""").render()
+SCORE_TABLE_TAIL = "</tbody></table>"
+
+# Wiersze dla miejsc 1-3 i pozostałych; zwykłe funkcje z f-stringami, bo
+# wiersz renderowany jest dla każdego gracza w tabeli
+def _first_row(rank, user, score):
+    return f'<tr><td><strong><span style="color:#e67e22;">{rank}. {user}</span></strong></td><td>Liczba punktów {score}</td></tr>'
+
+def _second_row(rank, user, score):
+    return f'<tr><td><strong><span style="color:#7f8c8d;">{rank}. {user}</span></strong></td><td>Liczba punktów {score}</td></tr>'
+
+def _third_row(rank, user, score):
+    return f'<tr><td><span style="color:#330000;"><strong>{rank}. {user}</strong></span></td><td>Liczba punktów {score}</td></tr>'
+
+def _row(rank, user, score):
+    return f'<tr><td>{rank}. {user}</td><td>Liczba punktów {score}</td></tr>'
+
+SCORE_ROWS = {1: _first_row, 2: _second_row, 3: _third_row}
+SCORE_ROW = _row
+SCORE_GAP = '<tr><td colspan="2">&hellip;</td></tr>'
+
+CORRECT_ANSWER = Template(
+    "<p style='text-align: justify;'>"
+    "Gratulacje {user}! Poprawna odpowiedź na pytanie dotyczyła \"{question}\"."
+    "</p>{score_table}"
+    "<p style='text-align: justify;'><strong>Podaj kategorię następnego pytania!</strong><br>"
+    "Możesz wybrać dowolną kategorię związaną z wrestlingiem, np.:<br>"
+    "- Historia konkretnej federacji<br>"
+    "- Biografia wybranego wrestlera<br>"
+    "- Konkretna era wrestlingu<br>"
+    "- Gale pay-per-view<br>"
+    "- Stajnie i tag teamy<br>"
+    "- i wiele innych!"
+    "</p>"
+)
+
+HEADING = Template(
+    "<p style='text-align: center;'>"
+    "<span style='font-size:22px;'><strong>{title}</strong></span><br>&nbsp;</p>"
+    "{body}"
+)
+
+def score_row(entry):
+    row = SCORE_ROWS.get(entry['rank'], SCORE_ROW)
+    return row(entry['rank'], escape(entry['user_name']), entry['score'])
+
+
+class ScoreTableRenderer:
+    """
+    Renderuje tabelę wyników z rankingu w pamięci (xQuiz.leaderboard).
+    Wyrenderowana czołówka jest trzymana do następnej zmiany punktów
+    (Leaderboard.version); przy każdym wywołaniu dokładany jest tylko wiersz
+    odpowiadającego gracza, jeśli jest poza czołówką.
+    """
+
+    def __init__(self):
+        self._cache = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, board, top_n, user_name=None):
+        version = board.version
+        with self._lock:
+            cached = self._cache.get(top_n)
+            if cached is not None and cached[0] == version:
+                self.hits += 1
+                _, top_html, top_names = cached
+            else:
+                cached = None
+                self.misses += 1
+        if cached is None:
+            rows = board.top(top_n)
+            top_html = "".join([SCORE_TABLE_HEAD] + [score_row(row) for row in rows])
+            top_names = frozenset(row['user_name'] for row in rows)
+            with self._lock:
+                self._cache[top_n] = (version, top_html, top_names)
+
+        if user_name is None or user_name in top_names:
+            return top_html + SCORE_TABLE_TAIL
+        entry = board.entry(user_name)
+        if entry is None:
+            return top_html + SCORE_TABLE_TAIL
+        return "".join((top_html, SCORE_GAP, score_row(entry), SCORE_TABLE_TAIL))
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+score_tables = ScoreTableRenderer()
@@ -0,0 +1,132 @@
+# xai_stream.py
+import json
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger()
+
+
+class IncompleteStreamError(Exception):
+    """Raised for a streamed reply that was cut off; `partial` holds the text received."""
+
+    def __init__(self, message, partial=""):
+        super().__init__(message)
+        self.partial = partial
+
+
+class StreamMetrics:
+    """Rolling time-to-first-token and throughput figures for streamed completions."""
+
+    def __init__(self, window=200):
+        self._lock = threading.Lock()
+        self._ttft = deque(maxlen=window)
+        self._tokens_per_second = deque(maxlen=window)
+        self.calls = 0
+        self.aborted = 0
+        self.last = None
+
+    def record(self, model, ttft, total, tokens, aborted):
+        tokens_per_second = tokens / (total - ttft) if ttft is not None and total > ttft else 0.0
+        with self._lock:
+            self.calls += 1
+            if aborted:
+                self.aborted += 1
+            if ttft is not None:
+                self._ttft.append(ttft)
+            self._tokens_per_second.append(tokens_per_second)
+            self.last = {
+                "model": model,
+                "ttft_seconds": ttft,
+                "total_seconds": total,
+                "tokens": tokens,
+                "tokens_per_second": tokens_per_second,
+                "aborted": aborted,
+            }
+        logger.info(
+            f"xAI stream ({model}): ttft={ttft if ttft is None else round(ttft, 3)}s "
+            f"total={total:.3f}s tokens={tokens} rate={tokens_per_second:.1f} tok/s"
+            + (" (aborted)" if aborted else "")
+        )
+
+    def stats(self):
+        with self._lock:
+            ttft = sorted(self._ttft)
+            rates = list(self._tokens_per_second)
+            return {
+                "calls": self.calls,
+                "aborted": self.aborted,
+                "ttft_avg_seconds": sum(ttft) / len(ttft) if ttft else None,
+                "ttft_p95_seconds": ttft[int(0.95 * (len(ttft) - 1))] if ttft else None,
+                "tokens_per_second_avg": sum(rates) / len(rates) if rates else None,
+                "last": self.last,
+            }
+
+
+metrics = StreamMetrics()
+
+def read_stream(response, model, started, deadline=None, max_chars=None):
+    """
+    Assemble the reply from an SSE chat-completions response. Returns
+    (text, finished): finished is True only if the server ended the stream
+    itself (finish_reason or [DONE]).
+
+    `started` is the monotonic time the request was sent. Reading stops early,
+    with finished False, once `deadline` seconds have passed since then or the
+    reply reaches `max_chars` characters; a connection that closes before
+    the end of the stream also leaves it False.
+    """
+    parts = []
+    length = 0
+    tokens = 0
+    usage_tokens = None
+    ttft = None
+    aborted = False
+    finished = False
+    try:
+        # SSE is always UTF-8, but requests would decode text/event-stream
+        # without a charset as ISO-8859-1, so lines are decoded here
+        for raw_line in response.iter_lines():
+            line = raw_line.decode("utf-8", errors="replace")
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                finished = True
+                break
+            try:
+                chunk = json.loads(data)
+            except ValueError:
+                logger.warning(f"Skipping malformed stream chunk: {data[:200]}")
+                continue
+            if chunk.get("usage"):
+                usage_tokens = chunk["usage"].get("completion_tokens", usage_tokens)
+            choice = (chunk.get("choices") or [{}])[0]
+            if choice.get("finish_reason"):
+                finished = True
+            delta = choice.get("delta", {}).get("content")
+            if delta:
+                if ttft is None:
+                    ttft = time.monotonic() - started
+                parts.append(delta)
+                length += len(delta)
+                tokens += 1
+            if deadline is not None and time.monotonic() - started > deadline:
+                logger.warning(f"xAI stream hit the {deadline}s deadline, returning partial reply")
+                aborted = True
+                break
+            if max_chars is not None and length >= max_chars:
+                logger.warning(f"xAI stream reached {max_chars} characters, stopping")
+                aborted = True
+                break
+    finally:
+        response.close()
+    if aborted:
+        finished = False
+    elif not finished:
+        logger.warning("xAI stream ended before the reply was finished")
+        aborted = True
+    total = time.monotonic() - started
+    metrics.record(model, ttft, total, usage_tokens or tokens, aborted)
+    return "".join(parts), finished